@@ -61,6 +61,22 @@ unsigned long last_status_send = 0;
 const unsigned long ANIMATION_DELAY = 300; // Slower animation for better readability
 const unsigned long SENSOR_READ_DELAY = 30; // Faster sensor reading
 const unsigned long STATUS_SEND_DELAY = 100;
+const unsigned long DISPLAY_UPDATE_DELAY = 100; // OLED refresh, independent of the report rate
+
+// Host-negotiated telemetry (MODE:BIN / MODE:TEXT, RATE:ms)
+// In binary mode each status report is a COBS-encoded frame between two 0x00
+// bytes, which never occur in text lines, so command replies stay text.
+// Frame payload, little-endian: type 0x01, flags (bit0 PIR, bit1 ultrasonic),
+// distance u16, millis u32, pir_trigger_count u16, confidence u8,
+// baseline u16, seq u8, then CRC16-CCITT (0x1021, init 0xFFFF) of those bytes
+const unsigned long MIN_STATUS_SEND_DELAY = SENSOR_READ_DELAY; // one new reading per report
+const unsigned long MAX_STATUS_SEND_DELAY = 5000;
+const uint8_t FRAME_STATUS = 0x01;
+const int STATUS_FRAME_SIZE = 16;
+bool binary_telemetry = false;
+uint8_t frame_seq = 0;
+unsigned long status_send_delay = STATUS_SEND_DELAY;
+unsigned long last_display_update = 0;
 
 // Enhanced Debounce Variables
 unsigned long last_pir_change = 0;
@@ -140,10 +156,15 @@ void loop() {
     last_sensor_read = current_time;
   }
   
-  // Update display and send status
-  if (current_time - last_status_send >= STATUS_SEND_DELAY) {
+  // Update display
+  if (current_time - last_display_update >= DISPLAY_UPDATE_DELAY) {
     updateDisplayState();
     updateDisplay();
+    last_display_update = current_time;
+  }
+  
+  // Send status at the negotiated rate
+  if (current_time - last_status_send >= status_send_delay) {
     sendStatus();
     last_status_send = current_time;
   }
@@ -598,7 +619,72 @@ void displayIdleScreen() {
   }
 }
 
+uint16_t crc16(const uint8_t *data, int length) {
+  uint16_t crc = 0xFFFF;
+  for (int i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Consistent Overhead Byte Stuffing: out gets length + 1 bytes, none zero
+int cobsEncode(const uint8_t *data, int length, uint8_t *out) {
+  int code_index = 0;
+  int out_index = 1;
+  uint8_t code = 1;
+  for (int i = 0; i < length; i++) {
+    if (data[i] != 0) {
+      out[out_index++] = data[i];
+      code++;
+    }
+    if (data[i] == 0 || code == 0xFF) {
+      out[code_index] = code;
+      code_index = out_index++;
+      code = 1;
+    }
+  }
+  out[code_index] = code;
+  return out_index;
+}
+
+void sendStatusFrame() {
+  uint8_t frame[STATUS_FRAME_SIZE];
+  int distance = calculateMedianDistance();
+  unsigned long now = millis();
+  
+  frame[0] = FRAME_STATUS;
+  frame[1] = (pir_detected ? 1 : 0) | (ultrasonic_detected ? 2 : 0);
+  frame[2] = distance & 0xFF;
+  frame[3] = (distance >> 8) & 0xFF;
+  for (int i = 0; i < 4; i++) {
+    frame[4 + i] = (now >> (8 * i)) & 0xFF;
+  }
+  frame[8] = pir_trigger_count & 0xFF;
+  frame[9] = (pir_trigger_count >> 8) & 0xFF;
+  frame[10] = detection_confidence;
+  frame[11] = baseline_distance & 0xFF;
+  frame[12] = (baseline_distance >> 8) & 0xFF;
+  frame[13] = frame_seq++;
+  uint16_t crc = crc16(frame, STATUS_FRAME_SIZE - 2);
+  frame[14] = crc & 0xFF;
+  frame[15] = crc >> 8;
+  
+  uint8_t encoded[STATUS_FRAME_SIZE + 3];
+  encoded[0] = 0;
+  int length = cobsEncode(frame, STATUS_FRAME_SIZE, encoded + 1);
+  encoded[length + 1] = 0;
+  Serial.write(encoded, length + 2);
+}
+
 void sendStatus() {
+  if (binary_telemetry) {
+    sendStatusFrame();
+    return;
+  }
+  
   Serial.print("STATUS:");
   Serial.print(pir_detected ? "1" : "0");
   Serial.print(",");
@@ -614,7 +700,8 @@ void sendStatus() {
   Serial.print(",");
   Serial.print(baseline_distance);
   Serial.println();
-  Serial.flush();
+  // No Serial.flush(): waiting for the UART to drain would stall the
+  // sensor loop at higher report rates
 }
 
 void handleSerialCommand() {
@@ -647,6 +734,20 @@ void handleSerialCommand() {
       } else {
         Serial.println("INVALID_THRESHOLD");
       }
+    } else if (command == "MODE:BIN" || command == "MODE:TEXT") {
+      binary_telemetry = (command == "MODE:BIN");
+      frame_seq = 0;
+      Serial.print("MODE_OK:");
+      Serial.println(binary_telemetry ? "BIN" : "TEXT");
+    } else if (command.startsWith("RATE:")) {
+      long new_delay = command.substring(5).toInt();
+      if (new_delay >= (long)MIN_STATUS_SEND_DELAY && new_delay <= (long)MAX_STATUS_SEND_DELAY) {
+        status_send_delay = new_delay;
+        Serial.print("RATE_OK:");
+        Serial.println(new_delay);
+      } else {
+        Serial.println("INVALID_RATE");
+      }
     } else if (command.length() > 0) {
       Serial.print("UNKNOWN_COMMAND:");
       Serial.println(command);
@@ -0,0 +1,414 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from radar_protocol import StatusDecoder, encode_status_frame
+
+# Reproducible benchmarks for the decode, filter, ingest, render and log
+# paths, and for the GUI's startup time.
+#
+#   python radar_bench.py --output bench.json
+#   xvfb-run python radar_bench.py --suite render,log
+#
+# Every benchmark returns a dict of throughput, latency percentiles and the
+# process's peak RSS afterwards; the run is written as one JSON document so
+# results can be compared between commits. render and log need a display
+# (a virtual framebuffer such as Xvfb is fine) and are reported as skipped
+# without one; startup then only reports the import times.
+
+SUITES = ('decode', 'filters', 'ingest', 'render', 'log', 'startup')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def percentiles(samples):
+    if not samples:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    ordered = sorted(samples)
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+            'max_ms': ordered[-1] * 1000}
+
+def status_corpus(count, seed=1, garbage=0.0):
+    # Synthetic STATUS lines shaped like sendStatus() output
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if garbage and rng.random() < garbage:
+            lines.append("STATUS:1,0,%d" % rng.randint(0, 300))
+            continue
+        lines.append("STATUS:%d,%d,%d,%d,%d,%d,%d" % (
+            rng.random() < 0.3, rng.random() < 0.2, rng.randint(2, 200),
+            i * 100, i // 50, rng.randint(0, 8), 120))
+    return lines
+
+def bench_decode(lines=200000, seed=1):
+    corpus = status_corpus(lines, seed, garbage=0.01)
+
+    decoder = StatusDecoder()
+    start = time.perf_counter()
+    for line in corpus:
+        decoder.decode(line)
+    per_line = time.perf_counter() - start
+
+    # decode_batch() imports NumPy on first use; keep that out of the timing
+    StatusDecoder().decode_batch(corpus[:10])
+    batch_decoder = StatusDecoder()
+    start = time.perf_counter()
+    batch = batch_decoder.decode_batch(corpus)
+    batched = time.perf_counter() - start
+
+    # Same records as binary frames (MODE:BIN)
+    records = [record for record in map(StatusDecoder().decode, corpus) if record is not None]
+    frames = [encode_status_frame(record, seq)[1:-1] for seq, record in enumerate(records)]
+    frame_decoder = StatusDecoder()
+    start = time.perf_counter()
+    for frame in frames:
+        frame_decoder.decode_frame(frame)
+    framed = time.perf_counter() - start
+
+    return {
+        'lines': lines,
+        'decoded': decoder.decoded,
+        'malformed': decoder.malformed,
+        'per_line_lines_per_s': lines / per_line,
+        'per_line_ns': per_line / lines * 1e9,
+        'batch_lines_per_s': lines / batched,
+        'batch_records': len(batch),
+        'frame_records_per_s': len(frames) / framed,
+        'text_bytes_per_record': sum(len(line) + 2 for line in corpus) / len(corpus),
+        'frame_bytes_per_record': sum(len(frame) + 2 for frame in frames) / len(frames),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+def bench_filters(records=200000, specs=("gate", "gate,median", "gate,ewma",
+                                          "gate,kalman", "gate,median,kalman"),
+                  batch_sizes=(1, 50, 5000), seed=1):
+    # Records per second through each filter chain, fed in batches the size
+    # of a GUI frame's worth of records at different rates
+    from radar_filters import FilterChain
+    batch = StatusDecoder().decode_batch(status_corpus(records, seed))
+    results = {}
+    for spec in specs:
+        result = {}
+        for size in batch_sizes:
+            chain = FilterChain(spec)
+            count = min(len(batch), size * 2000)
+            start = time.perf_counter()
+            for begin in range(0, count, size):
+                chain.process(batch.distance[begin:begin + size],
+                              batch.baseline[begin:begin + size])
+            elapsed = time.perf_counter() - start
+            result[f'batch_{size}_records_per_s'] = count / elapsed
+        result['ns_per_sample'] = {stage['name']: stage['ns_per_sample']
+                                   for stage in chain.stats()['filters']}
+        results[spec] = result
+    results['peak_rss_kb'] = peak_rss_kb()
+    return results
+
+class MemorySerial:
+    # pyserial-like byte source that releases lines at a fixed rate; rate 0
+    # makes everything available at once
+    def __init__(self, lines, rate, timeout=0.1):
+        self.data = "".join(line + "\r\n" for line in lines).encode('ascii')
+        self.ends = []
+        offset = 0
+        for line in lines:
+            offset += len(line) + 2
+            self.ends.append(offset)
+        self.rate = rate
+        self.timeout = timeout
+        self.position = 0
+        self.started = time.monotonic()
+        self.is_open = True
+
+    def available_end(self):
+        if not self.rate:
+            return len(self.data)
+        due = int((time.monotonic() - self.started) * self.rate)
+        if due <= 0:
+            return 0
+        return self.ends[min(due, len(self.ends)) - 1]
+
+    @property
+    def in_waiting(self):
+        return max(0, self.available_end() - self.position)
+
+    def exhausted(self):
+        return self.position >= len(self.data)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + self.timeout
+        while self.is_open and self.available_end() <= self.position:
+            if self.exhausted() or time.monotonic() >= deadline:
+                return b""
+            time.sleep(min(0.001, 1.0 / self.rate if self.rate else 0.001))
+        if not self.is_open:
+            raise OSError("port closed")
+        end = min(self.available_end(), self.position + max(size, 1))
+        chunk = self.data[self.position:end]
+        self.position = end
+        return chunk
+
+    def close(self):
+        self.is_open = False
+
+def run_engine(engine, source, done, limit):
+    engine.serial_port = source
+    engine.is_connected = True
+    engine.stop_thread = False
+    engine.connected_at = time.monotonic()
+    engine.start_data_thread()
+    deadline = time.monotonic() + limit
+    while not done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    elapsed = time.monotonic() - engine.connected_at
+    engine.disconnect(notify=False)
+    return elapsed
+
+def ingest_result(engine, elapsed, rate, lines):
+    latency = engine.latency.stats()
+    return {
+        'rate': rate or 'unpaced',
+        'lines': lines,
+        'received': engine.lines_received,
+        'decoded': engine.decoder.decoded,
+        'elapsed_s': elapsed,
+        'lines_per_s': engine.lines_received / elapsed if elapsed else None,
+        'device_to_read': latency['device_to_read'],
+        'read_to_decode': latency['read_to_decode'],
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+def bench_ingest(rates=(10, 1000, 5000, 0), duration=3.0, seed=1):
+    from radar_engine import RadarEngine
+
+    results = []
+    for rate in rates:
+        lines = int(rate * duration) if rate else 200000
+        corpus = status_corpus(lines, seed)
+        if rate:
+            # Device millis that match the pacing, for the clock estimator
+            corpus = [line.rsplit(',', 4)[0] + ",%d,0,5,120" % int(i * 1000 / rate)
+                      for i, line in enumerate(corpus)]
+        engine = RadarEngine()
+        source = MemorySerial(corpus, rate)
+        elapsed = run_engine(engine, source,
+                             lambda: source.exhausted() and engine.lines_received >= lines,
+                             duration * 2 + 10)
+        results.append(ingest_result(engine, elapsed, rate, lines))
+    return results
+
+def bench_ingest_pty(rates=(10, 1000, 5000), duration=3.0):
+    # Same as bench_ingest, through the virtual ESP32 on a real pty
+    from radar_emulator import VirtualESP32
+    from radar_engine import RadarEngine
+
+    results = []
+    for rate in rates:
+        # Throughput only: skip the boot and calibration delays
+        emulator = VirtualESP32(rate=rate, calibration_time=0.0, seed=1,
+                                boot_delay=0.0, settle_delay=0.0).start()
+        engine = RadarEngine()
+        try:
+            engine.connect(emulator.port_name)
+            engine.lines_received = 0
+            engine.connected_at = time.monotonic()
+            time.sleep(duration)
+            elapsed = time.monotonic() - engine.connected_at
+            engine.disconnect(notify=False)
+            results.append(ingest_result(engine, elapsed, rate, emulator.status_sent))
+        finally:
+            emulator.stop()
+    return results
+
+def open_display():
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return None, str(e)
+    root.withdraw()
+    return root, None
+
+def bench_render(frames=400, blip_counts=(0, 50, 500)):
+    root, error = open_display()
+    if root is None:
+        return {'skipped': error}
+    import tkinter as tk
+    from radar_gui import RadarRenderer, BlipStore
+
+    colors = {'bg': '#0a0a0a', 'primary': '#00ff00', 'secondary': '#ff6600',
+              'warning': '#ff0000', 'text': '#ffffff', 'grid': '#1a1a1a'}
+    results = []
+    try:
+        for count in blip_counts:
+            top = tk.Toplevel(root)
+            canvas = tk.Canvas(top, width=500, height=500, bg=colors['bg'], highlightthickness=0)
+            canvas.pack()
+            renderer = RadarRenderer(canvas, colors)
+            store = BlipStore(colors, lifetime=3600.0)
+            rng = random.Random(count)
+            now = time.monotonic()
+            for i in range(count):
+                store.add(rng.uniform(0, 360), rng.uniform(0.1, 1.0),
+                          rng.random() < 0.5, rng.random() < 0.5, now - rng.uniform(0, 3000))
+            root.update()
+
+            times = []
+            start = time.perf_counter()
+            for frame in range(frames):
+                began = time.perf_counter()
+                renderer.draw(frame * 2 % 360, store, True)
+                root.update_idletasks()
+                times.append(time.perf_counter() - began)
+            elapsed = time.perf_counter() - start
+            result = {'blips': count, 'frames': frames, 'fps': frames / elapsed,
+                      'peak_rss_kb': peak_rss_kb()}
+            result.update(percentiles(times))
+            results.append(result)
+            top.destroy()
+    finally:
+        root.destroy()
+    return results
+
+def bench_log(bursts=200, burst_size=200, repeat_ratio=0.5, seed=1):
+    root, error = open_display()
+    if root is None:
+        return {'skipped': error}
+    import tkinter as tk
+    from radar_gui import LogBuffer
+
+    text = tk.Text(root)
+    log = LogBuffer()
+    log.attach(text)
+    rng = random.Random(seed)
+    times = []
+    try:
+        start = time.perf_counter()
+        for burst in range(bursts):
+            for i in range(burst_size):
+                if rng.random() < repeat_ratio:
+                    log.add("ESP32: CALIBRATION_START")
+                else:
+                    log.add(f"ESP32: message {burst}/{i}")
+            began = time.perf_counter()
+            log.flush()
+            root.update_idletasks()
+            times.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        result = {'bursts': bursts, 'burst_size': burst_size,
+                  'messages_per_s': bursts * burst_size / elapsed,
+                  'peak_rss_kb': peak_rss_kb()}
+        result.update(log.stats())
+        result.update(percentiles(times))
+        return result
+    finally:
+        root.destroy()
+
+def import_times(module):
+    # (module, self ms, cumulative ms) from python -X importtime, run in a
+    # fresh interpreter so nothing is cached
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True, timeout=60)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if not fields[0].isdigit():
+            continue
+        times.append((fields[2], int(fields[0]) / 1000, int(fields[1]) / 1000))
+    return times
+
+def bench_startup(module='radar_gui', top=10):
+    times = import_times(module)
+    total = next((cumulative for name, _, cumulative in times if name == module), None)
+    slowest = sorted(times, key=lambda entry: entry[1], reverse=True)[:top]
+    result = {
+        'module': module,
+        'import_ms': total,
+        'slowest_self_ms': [{'module': name, 'self_ms': own, 'cumulative_ms': cumulative}
+                            for name, own, cumulative in slowest],
+    }
+    # Time to first frame needs a display
+    try:
+        run = subprocess.run([sys.executable, os.path.join(HERE, 'radar_gui.py'),
+                              '--startup-report'],
+                             cwd=HERE, capture_output=True, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        result['first_frame'] = {'skipped': 'timed out'}
+        return result
+    report = run.stdout.strip().splitlines()
+    if run.returncode != 0 or not report:
+        error = run.stderr.strip().splitlines()
+        result['first_frame'] = {'skipped': error[-1] if error else f"exit {run.returncode}"}
+        return result
+    result['first_frame'] = json.loads(report[-1])
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ESP32 radar benchmarks")
+    parser.add_argument('--suite', default=",".join(SUITES),
+                        help="comma separated benchmarks to run: " + ", ".join(SUITES))
+    parser.add_argument('--output', help="write the JSON results to this file")
+    parser.add_argument('--quick', action='store_true', help="smaller workloads for a smoke run")
+    parser.add_argument('--pty', action='store_true',
+                        help="also run the ingest benchmark through the virtual ESP32 (Linux)")
+    args = parser.parse_args(argv)
+
+    suites = [name.strip() for name in args.suite.split(",") if name.strip()]
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite: {', '.join(unknown)}")
+
+    scale = 0.1 if args.quick else 1.0
+    duration = 1.0 if args.quick else 3.0
+    report = {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    for name in suites:
+        print(f"running {name}...", file=sys.stderr, flush=True)
+        if name == 'decode':
+            result = bench_decode(int(200000 * scale))
+        elif name == 'filters':
+            result = bench_filters(int(200000 * scale))
+        elif name == 'ingest':
+            result = bench_ingest(duration=duration)
+            if args.pty and hasattr(os, 'openpty'):
+                report['results']['ingest_pty'] = bench_ingest_pty(duration=duration)
+        elif name == 'render':
+            result = bench_render(frames=max(20, int(400 * scale)))
+        elif name == 'startup':
+            result = bench_startup()
+        else:
+            result = bench_log(bursts=max(10, int(200 * scale)))
+        report['results'][name] = result
+    report['peak_rss_kb'] = peak_rss_kb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
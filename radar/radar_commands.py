@@ -0,0 +1,288 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from radar_latency import LatencyHistogram
+
+# Request/response channel for the commands handled by handleSerialCommand()
+# in "radar beta.ino".
+#
+# Callers get a concurrent.futures.Future straight away; the command is
+# written by the channel's own thread, so neither the Tk thread nor the
+# reader thread ever waits on the port. The firmware answers commands in
+# the order it reads them and its replies carry no request id, so a reply is
+# matched to the oldest in-flight request that expects it:
+#   PING          -> PONG
+#   STATUS        -> the next STATUS line (resolves to its StatusRecord)
+#   RESET         -> RESET_OK
+#   SET_THRESHOLD -> THRESHOLD_SET:n, or INVALID_THRESHOLD as an error
+#   MODE          -> MODE_OK:BIN or MODE_OK:TEXT
+#   RATE          -> RATE_OK:ms, or INVALID_RATE as an error
+#   anything      -> UNKNOWN_COMMAND:command as an error
+# A request that is not answered within its timeout is written again up to
+# `retries` times before it fails with CommandTimeout. Round-trip times of
+# retried requests are not sampled, since a late reply to the first write
+# cannot be told apart from the reply to the second (Karn's rule).
+
+COMMAND_TIMEOUT = 1.0
+COMMAND_RETRIES = 2
+
+# Requests written but not yet answered, across all commands
+MAX_IN_FLIGHT = 8
+
+# Smoothing of the running RTT estimate, as in TCP's SRTT
+RTT_SMOOTHING = 0.125
+
+# Reply token -> (command it answers, whether it is an error)
+REPLIES = {
+    'PONG': ('PING', False),
+    'STATUS': ('STATUS', False),
+    'RESET_OK': ('RESET', False),
+    'THRESHOLD_SET': ('SET_THRESHOLD', False),
+    'INVALID_THRESHOLD': ('SET_THRESHOLD', True),
+    'MODE_OK': ('MODE', False),
+    'RATE_OK': ('RATE', False),
+    'INVALID_RATE': ('RATE', True),
+}
+
+class CommandError(Exception):
+    pass
+
+class CommandTimeout(CommandError):
+    pass
+
+class CommandReply:
+    __slots__ = ('command', 'line', 'payload', 'rtt', 'attempts')
+
+    def __init__(self, command, line, payload, rtt, attempts):
+        self.command = command
+        self.line = line
+        self.payload = payload
+        self.rtt = rtt
+        self.attempts = attempts
+
+class CommandRequest:
+    __slots__ = ('command', 'name', 'future', 'timeout', 'retries', 'attempts',
+                 'sent_at', 'deadline')
+
+    def __init__(self, command, timeout, retries):
+        self.command = command
+        self.name = command.partition(':')[0]
+        self.future = Future()
+        self.timeout = timeout
+        self.retries = retries
+        self.attempts = 0
+        self.sent_at = None
+        self.deadline = None
+
+class CommandChannel:
+    def __init__(self, engine, timeout=COMMAND_TIMEOUT, retries=COMMAND_RETRIES,
+                 max_in_flight=MAX_IN_FLIGHT):
+        self.engine = engine
+        self.timeout = timeout
+        self.retries = retries
+        self.max_in_flight = max_in_flight
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.in_flight = []
+        self.thread = None
+        self.probe_interval = None
+        self.next_probe = 0.0
+        self.probe_pending = False
+
+        self.rtt = LatencyHistogram()
+        self.srtt = None
+        self.last_rtt = None
+        self.last_reply_at = None
+        self.sent = 0
+        self.replied = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.unmatched = 0
+        engine.subscribe(self.on_event)
+
+    def request(self, command, timeout=None, retries=None):
+        # Queue command for writing, returns a Future of its CommandReply
+        request = CommandRequest(command, self.timeout if timeout is None else timeout,
+                                 self.retries if retries is None else retries)
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.queue.append(request)
+            self.cond.notify()
+        return request.future
+
+    def ping(self, **kwargs):
+        return self.request("PING", **kwargs)
+
+    def status(self, **kwargs):
+        return self.request("STATUS", **kwargs)
+
+    def reset(self, **kwargs):
+        return self.request("RESET", **kwargs)
+
+    def set_threshold(self, centimeters, **kwargs):
+        return self.request(f"SET_THRESHOLD:{int(centimeters)}", **kwargs)
+
+    def set_mode(self, binary, **kwargs):
+        return self.request("MODE:BIN" if binary else "MODE:TEXT", **kwargs)
+
+    def set_rate(self, interval_ms, **kwargs):
+        return self.request(f"RATE:{int(interval_ms)}", **kwargs)
+
+    def start_probe(self, interval):
+        # PING every interval seconds while the ESP32 reads commands, None stops
+        with self.cond:
+            self.probe_interval = interval
+            self.next_probe = time.monotonic()
+            if self.thread is None and interval:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def run(self):
+        # Writer and timeout thread
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                self.expire(now)
+                self.queue_probe(now)
+                batch = []
+                while self.queue and len(self.in_flight) + len(batch) < self.max_in_flight:
+                    batch.append(self.queue.popleft())
+                if not batch:
+                    self.cond.wait(self.next_wakeup(now))
+                    continue
+            for request in batch:
+                self.write(request)
+
+    def write(self, request):
+        # In flight before the write: the reply can be read before send()
+        # returns
+        now = time.monotonic()
+        with self.cond:
+            request.attempts += 1
+            request.sent_at = now
+            request.deadline = now + request.timeout
+            self.in_flight.append(request)
+        try:
+            self.engine.send(request.command)
+        except Exception as e:
+            with self.cond:
+                if request not in self.in_flight:
+                    return
+                self.in_flight.remove(request)
+            self.errors += 1
+            request.future.set_exception(CommandError(f"{request.command}: {e}"))
+            return
+        self.sent += 1
+
+    def expire(self, now):
+        for request in [r for r in self.in_flight if r.deadline <= now]:
+            self.in_flight.remove(request)
+            if request.attempts <= request.retries:
+                self.retransmits += 1
+                self.queue.appendleft(request)
+            else:
+                self.timeouts += 1
+                request.future.set_exception(CommandTimeout(
+                    f"{request.command}: no reply after {request.attempts} attempts"))
+
+    def queue_probe(self, now):
+        if not self.probe_interval or self.probe_pending or now < self.next_probe:
+            return
+        self.next_probe = now + self.probe_interval
+        if not self.engine.listening or self.engine.offline:
+            return
+        request = CommandRequest("PING", self.timeout, 0)
+        request.future.add_done_callback(self.on_probe_done)
+        self.probe_pending = True
+        self.queue.append(request)
+
+    def on_probe_done(self, future):
+        self.probe_pending = False
+        if isinstance(future.exception(), CommandTimeout):
+            self.engine.log("PING probe: no reply")
+
+    def next_wakeup(self, now):
+        deadlines = [request.deadline for request in self.in_flight]
+        if self.probe_interval:
+            deadlines.append(self.next_probe)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def on_event(self, kind, line, payload, received_at):
+        # Engine subscriber, reader thread
+        if kind == 'state':
+            if line != 'connected':
+                self.fail_all(f"connection {line}")
+            return
+        if kind not in ('status', 'message') or not self.in_flight:
+            return
+        token, _, rest = line.partition(':')
+        if token == 'UNKNOWN_COMMAND':
+            self.complete(lambda request: request.command == rest, line, payload,
+                          received_at, True)
+        elif token == 'HUB_READ_ONLY':
+            # A radar_hub viewer that may not send commands
+            self.complete(lambda request: True, line, payload, received_at, True)
+        elif token in REPLIES:
+            name, error = REPLIES[token]
+            self.complete(lambda request: request.name == name, line, payload,
+                          received_at, error)
+
+    def complete(self, matches, line, payload, received_at, error):
+        with self.cond:
+            request = next((r for r in self.in_flight if matches(r)), None)
+            if request is None:
+                if not line.startswith("STATUS:"):
+                    self.unmatched += 1
+                return
+            self.in_flight.remove(request)
+            self.cond.notify()
+        rtt = max(0.0, received_at - request.sent_at)
+        if request.attempts == 1:
+            self.rtt.record(rtt)
+            self.last_rtt = rtt
+            self.srtt = rtt if self.srtt is None else self.srtt + RTT_SMOOTHING * (rtt - self.srtt)
+        self.last_reply_at = received_at
+        if error:
+            self.errors += 1
+            request.future.set_exception(CommandError(line))
+        else:
+            self.replied += 1
+            request.future.set_result(CommandReply(request.command, line, payload, rtt,
+                                                   request.attempts))
+
+    def fail_all(self, reason):
+        with self.cond:
+            requests = self.in_flight + list(self.queue)
+            self.in_flight = []
+            self.queue.clear()
+        for request in requests:
+            self.errors += 1
+            request.future.set_exception(CommandError(f"{request.command}: {reason}"))
+
+    def stats(self):
+        def ms(value):
+            return None if value is None else value * 1000
+        stats = {
+            'sent': self.sent,
+            'replied': self.replied,
+            'retransmits': self.retransmits,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'unmatched': self.unmatched,
+            'queued': len(self.queue),
+            'in_flight': len(self.in_flight),
+            'last_rtt_ms': ms(self.last_rtt),
+            'srtt_ms': ms(self.srtt),
+            'last_reply_age_s': (None if self.last_reply_at is None
+                                 else time.monotonic() - self.last_reply_at),
+        }
+        stats['rtt'] = self.rtt.summary()
+        return stats
\ No newline at end of file
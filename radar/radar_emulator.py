@@ -0,0 +1,322 @@
+import argparse
+import math
+import os
+import random
+import select
+import sys
+import threading
+import time
+
+from radar_protocol import StatusRecord, encode_status_frame
+
+# Virtual ESP32 speaking the "radar beta.ino" serial protocol on a Linux
+# pseudo-terminal, for load testing the ingest path without hardware.
+#
+#   python radar_emulator.py --rate 1000 --garbage 0.01
+#
+# prints the pty path (e.g. /dev/pts/3) that the GUI, the headless engine or
+# anything else using pyserial can open like a real port.
+
+FIRMWARE_RATE = 10          # STATUS_SEND_DELAY = 100 ms
+CALIBRATION_DURATION = 3.0  # CALIBRATION_DURATION = 3000 ms
+BOOT_DELAY = 5.0            # setup(): startup screen, PIR power-up and stabilization
+SETTLE_DELAY = 2.0          # delay(2000) after CALIBRATION_COMPLETE
+DETECTION_THRESHOLD = 50
+MAX_DISTANCE = 200
+MAX_CONFIDENCE = 8
+# RATE:ms bounds, MIN_STATUS_SEND_DELAY and MAX_STATUS_SEND_DELAY
+MIN_REPORT_INTERVAL = 30
+MAX_REPORT_INTERVAL = 5000
+
+# Unsent output kept while nobody reads the port, like a full UART FIFO
+MAX_PENDING_OUTPUT = 64 * 1024
+
+class VirtualESP32:
+    def __init__(self, rate=FIRMWARE_RATE, garbage=0.0, baseline=120,
+                 calibration_time=CALIBRATION_DURATION, seed=None,
+                 boot_delay=BOOT_DELAY, settle_delay=SETTLE_DELAY):
+        self.rate = float(rate)
+        self.garbage = garbage
+        self.baseline = baseline
+        self.calibration_time = calibration_time
+        self.boot_delay = boot_delay
+        self.settle_delay = settle_delay
+        self.random = random.Random(seed)
+
+        self.master, self.slave = os.openpty()
+        try:
+            import tty
+            tty.setraw(self.slave)
+        except Exception:
+            pass
+        os.set_blocking(self.master, False)
+        self.port_name = os.ttyname(self.slave)
+
+        self.pending = bytearray()
+        self.command_buffer = bytearray()
+        self.thread = None
+        self.stopped = False
+        self.boot_time = time.monotonic()
+        self.calibrating_until = None
+
+        # Firmware state
+        self.pir_detected = False
+        self.ultrasonic_detected = False
+        self.pir_trigger_count = 0
+        self.detection_confidence = 0
+        self.binary = False
+        self.frame_seq = 0
+
+        # Counters for load tests
+        self.status_sent = 0
+        self.garbage_sent = 0
+        self.commands_received = 0
+        self.bytes_dropped = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def millis(self):
+        return int((time.monotonic() - self.boot_time) * 1000) & 0xFFFFFFFF
+
+    def delay(self, seconds):
+        # Like the firmware's delay(): nothing is sent or read meanwhile,
+        # commands wait in the pty
+        deadline = time.monotonic() + seconds
+        while not self.stopped and time.monotonic() < deadline:
+            time.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+
+    def println(self, text):
+        self.pending += text.encode('ascii') + b"\r\n"
+
+    def flush_output(self):
+        if not self.pending:
+            return
+        try:
+            written = os.write(self.master, self.pending)
+            del self.pending[:written]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            # Nobody has the port open yet
+            pass
+        if len(self.pending) > MAX_PENDING_OUTPUT:
+            self.bytes_dropped += len(self.pending)
+            self.pending.clear()
+
+    def start_calibration(self):
+        self.calibrating_until = time.monotonic() + self.calibration_time
+        self.println("CALIBRATION_START")
+
+    def finish_calibration(self):
+        self.calibrating_until = None
+        self.baseline = max(20, min(MAX_DISTANCE, self.baseline + self.random.randint(-3, 3)))
+        self.println(f"CALIBRATION_COMPLETE:{self.baseline}")
+        self.flush_output()
+        self.delay(self.settle_delay)
+        self.handle_buffered_commands()
+
+    def simulate(self, now):
+        # Someone walks up to the sensor and away again every 20 seconds
+        phase = (now - self.boot_time) % 20.0
+        approach = max(0.0, math.sin(phase / 20.0 * 2 * math.pi))
+        distance = int(self.baseline - approach * (self.baseline - 15))
+        distance += self.random.randint(-2, 2)
+        distance = max(2, min(MAX_DISTANCE, distance))
+
+        pir = approach > 0.3
+        if pir and not self.pir_detected:
+            self.pir_trigger_count += 1
+        self.pir_detected = pir
+
+        if distance < DETECTION_THRESHOLD:
+            self.detection_confidence = min(MAX_CONFIDENCE, self.detection_confidence + 1)
+        else:
+            self.detection_confidence = max(0, self.detection_confidence - 1)
+        self.ultrasonic_detected = self.detection_confidence >= 3
+        return distance
+
+    def send_status(self, now):
+        distance = self.simulate(now)
+        if self.binary:
+            record = StatusRecord(self.pir_detected, self.ultrasonic_detected, distance,
+                                  self.millis(), self.pir_trigger_count,
+                                  self.detection_confidence, self.baseline)
+            self.pending += encode_status_frame(record, self.frame_seq)
+            self.frame_seq = (self.frame_seq + 1) & 0xFF
+        else:
+            self.println(f"STATUS:{int(self.pir_detected)},{int(self.ultrasonic_detected)},"
+                         f"{distance},{self.millis()},{self.pir_trigger_count},"
+                         f"{self.detection_confidence},{self.baseline}")
+        self.status_sent += 1
+
+    def send_garbage(self):
+        if self.random.random() < 0.5:
+            # A line cut short, as after a UART overrun
+            self.pending += b"STATUS:1,0," + str(self.random.randint(0, 300)).encode() + b"\r\n"
+        else:
+            self.pending += bytes(self.random.randint(1, 255) for _ in range(self.random.randint(1, 24)))
+            self.pending += b"\r\n"
+        self.garbage_sent += 1
+
+    def handle_command(self, command):
+        self.commands_received += 1
+        if command == "PING":
+            self.println("PONG")
+        elif command == "RESET":
+            self.pir_detected = False
+            self.ultrasonic_detected = False
+            self.pir_trigger_count = 0
+            self.detection_confidence = 0
+            self.println("RESET_OK")
+        elif command == "CALIBRATE":
+            self.start_calibration()
+        elif command == "STATUS":
+            self.send_status(time.monotonic())
+        elif command.startswith("SET_THRESHOLD:"):
+            try:
+                threshold = int(command[14:])
+            except ValueError:
+                threshold = 0
+            if 10 < threshold < 200:
+                self.println(f"THRESHOLD_SET:{threshold}")
+            else:
+                self.println("INVALID_THRESHOLD")
+        elif command in ("MODE:BIN", "MODE:TEXT"):
+            self.binary = command == "MODE:BIN"
+            self.frame_seq = 0
+            self.println(f"MODE_OK:{command[5:]}")
+        elif command.startswith("RATE:"):
+            try:
+                interval = int(command[5:])
+            except ValueError:
+                interval = 0
+            if MIN_REPORT_INTERVAL <= interval <= MAX_REPORT_INTERVAL:
+                self.rate = 1000.0 / interval
+                self.println(f"RATE_OK:{interval}")
+            else:
+                self.println("INVALID_RATE")
+        elif command:
+            self.println(f"UNKNOWN_COMMAND:{command}")
+
+    def read_commands(self):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return
+        self.command_buffer += data
+        self.handle_buffered_commands()
+
+    def handle_buffered_commands(self):
+        # The firmware does not read serial while it is calibrating; what
+        # arrives meanwhile waits in the UART and is answered afterwards
+        while self.calibrating_until is None:
+            end = self.command_buffer.find(b'\n')
+            if end < 0:
+                break
+            command = self.command_buffer[:end].decode('ascii', 'replace').strip()
+            del self.command_buffer[:end + 1]
+            self.handle_command(command)
+
+    def run(self):
+        # Same order as setup(): a few seconds of delay() after the reset,
+        # then calibration starts before SYSTEM_READY
+        self.delay(self.boot_delay)
+        self.start_calibration()
+        self.println("SYSTEM_READY")
+        next_status = time.monotonic()
+
+        while not self.stopped:
+            now = time.monotonic()
+            if self.calibrating_until is not None:
+                timeout = self.calibrating_until - now
+            else:
+                timeout = next_status - now
+            timeout = min(max(timeout, 0.0), 0.05)
+            if self.pending:
+                timeout = min(timeout, 0.005)
+            try:
+                readable, _, _ = select.select([self.master], [], [], timeout)
+            except (OSError, ValueError):
+                break
+            if readable:
+                self.read_commands()
+
+            now = time.monotonic()
+            if self.calibrating_until is not None:
+                if now >= self.calibrating_until:
+                    self.finish_calibration()
+                    next_status = now
+            elif now >= next_status:
+                interval = 1.0 / self.rate
+                # Emit every line that is due in one write; never more than
+                # a tenth of a second's worth when we fall behind
+                due = min(int((now - next_status) / interval) + 1, max(1, int(self.rate / 10)))
+                for _ in range(due):
+                    if self.garbage and self.random.random() < self.garbage:
+                        self.send_garbage()
+                    self.send_status(now)
+                next_status += due * interval
+                if next_status < now - 0.1:
+                    next_status = now
+            self.flush_output()
+
+    def stats(self):
+        return {
+            'port': self.port_name,
+            'status_sent': self.status_sent,
+            'garbage_sent': self.garbage_sent,
+            'commands_received': self.commands_received,
+            'bytes_dropped': self.bytes_dropped,
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Virtual ESP32 radar on a pseudo-terminal")
+    parser.add_argument('--rate', type=float, default=FIRMWARE_RATE,
+                        help="STATUS lines per second")
+    parser.add_argument('--garbage', type=float, default=0.0,
+                        help="probability of injecting a garbage line before each STATUS")
+    parser.add_argument('--baseline', type=int, default=120, help="calibrated baseline distance in cm")
+    parser.add_argument('--calibration-time', type=float, default=CALIBRATION_DURATION,
+                        help="seconds spent calibrating at start and on CALIBRATE")
+    parser.add_argument('--boot-delay', type=float, default=BOOT_DELAY,
+                        help="seconds from opening the port to CALIBRATION_START, as after a reset")
+    parser.add_argument('--settle-delay', type=float, default=SETTLE_DELAY,
+                        help="seconds of silence after CALIBRATION_COMPLETE")
+    parser.add_argument('--seed', type=int, help="random seed for a reproducible stream")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'openpty'):
+        print("The emulator needs a platform with pseudo-terminals (Linux)", file=sys.stderr)
+        return 1
+
+    emulator = VirtualESP32(args.rate, args.garbage, args.baseline,
+                            args.calibration_time, args.seed,
+                            args.boot_delay, args.settle_delay).start()
+    print(f"Virtual ESP32 on {emulator.port_name}", flush=True)
+    try:
+        while True:
+            time.sleep(5)
+            print(emulator.stats(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,849 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+import serial
+
+from radar_protocol import FRAME_DELIMITER, MAX_FRAME_LENGTH, STATUS_PREFIX, StatusDecoder
+from radar_recorder import SessionRecorder, SessionReplay
+from radar_latency import LatencyTracker
+from radar_perf import PerfMonitor, StackSampler, write_json
+
+# Serial ingestion engine, independent of tkinter.
+#
+# The engine owns the port, the reader thread and the decoder. Everything it
+# produces is handed to subscribers as (kind, line, payload, received_at)
+# events on the reader thread:
+#   'status'  - payload is a StatusRecord
+#   'invalid' - a STATUS line that failed to decode
+#   'message' - any other line from the ESP32
+#   'log'     - a notice from the engine itself
+#   'state'   - connection state change, line is the new state and payload
+#               the port or a detail such as the reconnect delay
+#
+# Connection states: 'connecting' (opening the port), 'waiting' (open, no
+# SYSTEM_READY or valid STATUS seen yet), 'connected' (the ESP32 is talking),
+# 'reconnecting' (backing off before the next attempt) and 'disconnected'.
+#
+# The command channel (radar_commands), episodes (radar_episodes) and the
+# fan-out hub (radar_hub) are imported when first used; most sessions only
+# read.
+
+BAUDRATE = 115200
+
+# Longest line the reader buffers before giving up on finding a newline
+MAX_LINE_LENGTH = 4096
+
+# Seconds to wait for SYSTEM_READY or a valid STATUS after opening the port,
+# and again after every protocol line while still waiting. Opening the port
+# resets the ESP32: setup() spends about 5 s in delay() before SYSTEM_READY,
+# and the first STATUS follows calibration and another 2 s delay(), at ~10 s.
+READY_TIMEOUT = 15.0
+
+# Reconnect backoff, doubling from RECONNECT_MIN up to RECONNECT_MAX seconds
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 10.0
+
+# How often a backoff checks whether an unplugged USB device is back
+ENUM_POLL_INTERVAL = 0.5
+
+# Telemetry negotiation waits for the first STATUS: SYSTEM_READY comes
+# before calibration, and the ESP32 reads no commands until that is over.
+# The replies can still queue behind a burst of STATUS lines.
+NEGOTIATE_TIMEOUT = 2.0
+
+# Lines that belong to the radar protocol (STATUS:..., SYSTEM_READY, PONG);
+# anything else before readiness is boot ROM output from the ESP32 reset
+PROTOCOL_LINE = re.compile(r'[A-Z_]+(:|$)')
+
+# Background port enumeration: how often the hotplug signature is checked,
+# and how often to rescan anyway where there is no signature to watch
+PORT_POLL_INTERVAL = 1.0
+PORT_RESCAN_INTERVAL = 5.0
+
+# Directories whose mtime changes when a serial device is plugged or unplugged
+HOTPLUG_PATHS = ('/dev', '/dev/serial/by-id', '/sys/class/tty')
+
+# Fan-out hub settings, kept here so the command line can offer them
+# without importing radar_hub
+HUB_POLICIES = ('drop-oldest', 'latest-only')
+HUB_QUEUE_SIZE = 1024
+
+def comports():
+    # serial.tools.list_ports is only imported when ports are enumerated
+    import serial.tools.list_ports
+    return serial.tools.list_ports.comports()
+
+def list_ports():
+    return [port.device for port in comports()]
+
+def hotplug_signature():
+    # None where none of HOTPLUG_PATHS exist (Windows, macOS without /dev)
+    signature = []
+    for path in HOTPLUG_PATHS:
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature) if any(value is not None for value in signature) else None
+
+class PortWatcher:
+    # Enumerates serial ports on a background thread and calls
+    # callback(ports) whenever the list changes. comports() can take seconds
+    # with many USB or Bluetooth serial devices, so nobody else should call
+    # it on a UI thread; the last result is kept in self.ports.
+    def __init__(self, callback, interval=PORT_POLL_INTERVAL, rescan=PORT_RESCAN_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.rescan = rescan
+        self.ports = None
+        self.enumerations = 0
+        self.last_duration = None
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def refresh(self):
+        # Enumerate again now, e.g. from a Refresh button
+        self.wake.set()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def run(self):
+        signature = None
+        last_scan = None
+        forced = True
+        while not self.stopped:
+            current = hotplug_signature()
+            now = time.monotonic()
+            due = current is None and (last_scan is None or now - last_scan >= self.rescan)
+            if forced or due or current != signature:
+                signature = current
+                last_scan = now
+                self.scan(forced)
+            forced = self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def scan(self, forced):
+        started = time.perf_counter()
+        try:
+            ports = list_ports()
+        except Exception:
+            ports = []
+        self.last_duration = time.perf_counter() - started
+        self.enumerations += 1
+        if forced or ports != self.ports:
+            self.ports = ports
+            if not self.stopped:
+                self.callback(ports)
+
+class RadarEngine:
+    def __init__(self, baudrate=BAUDRATE):
+        self.baudrate = baudrate
+        self.port_name = None
+        self.serial_port = None
+        self.is_connected = False
+        self.stop_thread = False
+        self.serial_thread = None
+        self.session = None
+        self.state = 'disconnected'
+        self.ready = False
+        self.ready_event = threading.Event()
+        self.ready_deadline = None
+        # Set by the first STATUS after connecting: the ESP32 reads commands
+        self.listening = False
+        self.auto_reconnect = False
+        self.port_identity = None
+        self.last_error = None
+        self.reconnects = 0
+        self.boot_lines = 0
+        self.write_lock = threading.Lock()
+        self.buffer = bytearray()
+        self.framed = False
+        self.subscribers = []
+
+        self.decoder = StatusDecoder()
+        self.latency = LatencyTracker()
+        # Timers for the reader loop and decoding, see radar_perf; feed
+        # includes decoding and the subscribers
+        self.perf = PerfMonitor()
+        self.feed_timer = self.perf.timer('feed')
+        self.decode_timer = self.perf.timer('decode')
+        # Created by the first use of commands
+        self.command_channel = None
+        self.command_lock = threading.Lock()
+        # Requested (binary, report interval ms), renegotiated on every
+        # connect since the ESP32 resets to text at 10 Hz
+        self.telemetry = None
+        self.binary = False
+        self.latest_status = None
+        self.lines_received = 0
+        self.bytes_received = 0
+        self.connected_at = None
+        self.recorder = None
+        self.replay = None
+        self.replay_thread = None
+        self.episodes = None
+
+    @property
+    def commands(self):
+        # Correlated PING/STATUS/RESET/SET_THRESHOLD requests, see radar_commands
+        if self.command_channel is None:
+            with self.command_lock:
+                if self.command_channel is None:
+                    from radar_commands import CommandChannel
+                    self.command_channel = CommandChannel(self)
+        return self.command_channel
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, kind, line, payload, received_at):
+        for callback in self.subscribers:
+            callback(kind, line, payload, received_at)
+
+    def log(self, message):
+        self.publish('log', message, None, time.monotonic())
+
+    def set_state(self, state, detail=None):
+        self.state = state
+        self.publish('state', state, self.port_name if detail is None else detail,
+                     time.monotonic())
+
+    @property
+    def running(self):
+        # True while connected or while a connection is still being retried
+        return self.is_connected or (self.session is not None and not self.session.is_set())
+
+    @property
+    def offline(self):
+        # True while a recording is replayed: there is no ESP32 to command
+        return self.replay is not None
+
+    def open_port(self, port, timeout=1):
+        # Raises serial.SerialException when the port cannot be opened.
+        # socket://host:port and unix:///path attach to a radar_hub instead
+        # of a serial port.
+        if port.startswith("unix://"):
+            from radar_hub import UnixSocketSerial
+            self.serial_port = UnixSocketSerial(port, baudrate=self.baudrate, timeout=timeout)
+            return self.serial_port
+        if "://" in port:
+            self.serial_port = serial.serial_for_url(port, baudrate=self.baudrate, timeout=timeout)
+            return self.serial_port
+        self.serial_port = serial.Serial(
+            port=port,
+            baudrate=self.baudrate,
+            timeout=timeout,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE
+        )
+        return self.serial_port
+
+    def mark_connected(self, port_name):
+        # Reset the counters for a freshly opened source; it counts as
+        # 'connected' once the ESP32 is heard from
+        self.port_name = port_name
+        self.buffer.clear()
+        self.lines_received = 0
+        self.bytes_received = 0
+        self.boot_lines = 0
+        self.connected_at = time.monotonic()
+        self.ready = False
+        self.ready_event.clear()
+        self.ready_deadline = self.connected_at + READY_TIMEOUT
+        self.listening = False
+        self.is_connected = True
+        self.stop_thread = False
+        self.set_state('waiting')
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_event.set()
+        self.binary = False
+        self.set_state('connected')
+
+    def request_telemetry(self, binary=False, interval_ms=None):
+        # Ask for binary frames and/or another report interval; firmware
+        # that does not know MODE or RATE keeps sending text at 10 Hz
+        self.telemetry = (binary, interval_ms)
+        if self.listening and not self.offline:
+            self.negotiate_telemetry()
+
+    def negotiate_telemetry(self):
+        binary, interval_ms = self.telemetry
+        if interval_ms:
+            self.commands.set_rate(interval_ms, timeout=NEGOTIATE_TIMEOUT).add_done_callback(
+                self.on_rate_reply)
+        if binary:
+            self.commands.set_mode(True, timeout=NEGOTIATE_TIMEOUT).add_done_callback(
+                self.on_mode_reply)
+
+    def on_mode_reply(self, future):
+        error = future.exception()
+        if error is not None:
+            self.binary = False
+            self.log(f"Mode biner tidak didukung firmware ({error}), tetap teks")
+            return
+        self.binary = future.result().line == "MODE_OK:BIN"
+        # The frame sequence restarts with the mode
+        self.decoder.last_seq = None
+        self.log(f"Telemetri {'biner' if self.binary else 'teks'} aktif")
+
+    def on_rate_reply(self, future):
+        error = future.exception()
+        if error is not None:
+            self.log(f"Interval laporan tidak diubah ({error})")
+        else:
+            self.log(f"Interval laporan {future.result().line[8:]} ms")
+
+    def start(self, port, auto_reconnect=True):
+        # Opens the port on a background thread and returns immediately;
+        # progress is published as 'state' events
+        self.disconnect(notify=False)
+        self.join_replay()
+        self.auto_reconnect = auto_reconnect
+        self.port_name = port
+        self.last_error = None
+        self.ready_event.clear()
+        self.session = threading.Event()
+        self.serial_thread = threading.Thread(target=self.run_connection,
+                                              args=(port, self.session), daemon=True)
+        self.serial_thread.start()
+
+    def connect(self, port, timeout=READY_TIMEOUT, auto_reconnect=False):
+        # Blocking variant of start() for scripts: returns once the ESP32 is
+        # ready, raises serial.SerialException if it does not get there
+        self.start(port, auto_reconnect)
+        deadline = time.monotonic() + timeout
+        thread = self.serial_thread
+        while not self.ready_event.wait(0.05):
+            if not thread.is_alive() or time.monotonic() >= deadline:
+                error = self.last_error or "ESP32 not ready"
+                self.disconnect(notify=False)
+                raise serial.SerialException(f"{port}: {error}")
+
+    def run_connection(self, port, session):
+        # Connection state machine: open, read until the port fails, then
+        # back off and try again while auto_reconnect is set
+        delay = RECONNECT_MIN
+        while not session.is_set():
+            self.set_state('connecting', port)
+            try:
+                self.open_port(port)
+                # Whatever was buffered before the reset is stale
+                self.serial_port.reset_input_buffer()
+                self.serial_port.reset_output_buffer()
+            except Exception as e:
+                self.last_error = e
+                self.close_port()
+                self.log(f"Gagal membuka {port}: {e}")
+            else:
+                if session.is_set():
+                    self.close_port()
+                    return
+                self.remember_identity(port)
+                self.mark_connected(port)
+                self.read_data()
+                self.is_connected = False
+                self.close_port()
+                if self.ready:
+                    delay = RECONNECT_MIN
+                self.ready = False
+                self.listening = False
+
+            if session.is_set():
+                return
+            if not self.auto_reconnect:
+                break
+            self.reconnects += 1
+            self.set_state('reconnecting', f"{port} in {delay:.1f}s")
+            port = self.wait_for_port(port, delay, session)
+            if port is None:
+                return
+            delay = min(delay * 2, RECONNECT_MAX)
+
+        session.set()
+        self.set_state('disconnected', port)
+
+    def remember_identity(self, port):
+        # USB vid/pid/serial of the port, to find it again if it re-enumerates
+        # under another name (ttyUSB0 -> ttyUSB1, COM3 -> COM5)
+        for info in comports():
+            if info.device == port and info.vid is not None:
+                self.port_identity = (info.vid, info.pid, info.serial_number)
+                return
+
+    def find_port(self, port):
+        # Current name of the device that was opened as port, None while it
+        # is unplugged
+        ports = comports()
+        if os.path.exists(port) or any(info.device == port for info in ports):
+            return port
+        if self.port_identity is not None:
+            for info in ports:
+                if (info.vid, info.pid, info.serial_number) == self.port_identity:
+                    return info.device
+        return None
+
+    def wait_for_port(self, port, delay, session):
+        # Sleeps out the backoff, but retries at once when an unplugged USB
+        # device shows up again. Returns the port to try next, None when the
+        # session was stopped.
+        deadline = time.monotonic() + delay
+        present = self.find_port(port) is not None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self.find_port(port) or port
+            if session.wait(min(remaining, ENUM_POLL_INTERVAL)):
+                return None
+            found = self.find_port(port)
+            if found is None:
+                if present:
+                    self.log(f"{port} dicabut, menunggu perangkat kembali")
+                present = False
+            elif not present:
+                if found != port:
+                    self.log(f"{port} muncul kembali sebagai {found}")
+                return found
+
+    def start_replay(self, path, speed=1.0, offset=None):
+        # Feed a recording through the same pipeline as the serial reader.
+        # offset is in seconds from the start of the recording.
+        self.disconnect(notify=False)
+        self.join_replay()
+        replay = SessionReplay(path)
+        start = 0
+        if offset is not None and replay.slots:
+            start = replay.seek(replay.start_time() + offset)
+
+        self.replay = replay
+        # Like a connection, the replay runs until its session is set, by
+        # disconnect() or the next start()/start_replay()
+        self.session = threading.Event()
+        self.mark_connected(f"replay:{path}")
+        self.serial_thread = self.replay_thread = threading.Thread(
+            target=self.run_replay, args=(replay, speed, start, self.session), daemon=True)
+        self.serial_thread.start()
+
+    def run_replay(self, replay, speed, start, session):
+        try:
+            replay.play(self.handle_line, speed, start, session.is_set)
+        except Exception as e:
+            self.log(f"Error replaying {replay.path}: {e}")
+        finally:
+            replay.close()
+            if self.replay is replay:
+                self.replay = None
+                if not session.is_set():
+                    self.log(f"Replay finished ({replay.played} lines)")
+                    self.disconnect()
+
+    def join_replay(self):
+        # A stopped replay may still be between two lines; it has to be gone
+        # before the next source starts, or it would feed that one
+        thread, self.replay_thread = self.replay_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def start_recording(self, path):
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+        self.subscribe(self.recorder.on_event)
+        self.log(f"Recording to {path}")
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.unsubscribe(self.recorder.on_event)
+            self.recorder.close()
+            self.log(f"Recorded {self.recorder.records} lines to {self.recorder.path}")
+            self.recorder = None
+
+    def start_episodes(self, path=None):
+        # Detection episodes from the STATUS stream, kept in an episode
+        # store at path or only in memory
+        from radar_episodes import EpisodeStore, EpisodeTracker
+        self.stop_episodes()
+        self.episodes = EpisodeTracker(self, EpisodeStore(path))
+        self.subscribe(self.episodes.on_event)
+
+    def stop_episodes(self):
+        if self.episodes is not None:
+            self.unsubscribe(self.episodes.on_event)
+            self.episodes.detector.flush()
+            self.episodes.store.close()
+            self.episodes = None
+
+    def open_source(self, args):
+        # Connect to --replay or --port and start --record, as given on
+        # the command line
+        if args.record:
+            self.start_recording(args.record)
+        if args.episodes:
+            self.start_episodes(args.episodes)
+        if args.replay:
+            self.start_replay(args.replay, args.speed, args.replay_from)
+        else:
+            self.start(args.port, auto_reconnect=not args.no_reconnect)
+
+    def close_port(self):
+        if self.serial_port:
+            try:
+                self.serial_port.close()
+            except Exception:
+                pass
+            self.serial_port = None
+
+    def disconnect(self, notify=True):
+        was_running = self.running
+        if self.session is not None:
+            self.session.set()
+        self.is_connected = False
+        self.ready = False
+        self.listening = False
+        self.ready_event.clear()
+        self.stop_thread = True
+        self.close_port()
+        if notify and was_running:
+            self.set_state('disconnected')
+        else:
+            self.state = 'disconnected'
+
+    def send(self, command):
+        # Raises when the port is closed or the write fails
+        if self.offline:
+            raise serial.SerialException("replaying a recording")
+        if not self.is_connected or not self.serial_port:
+            raise serial.SerialException("not connected")
+        with self.write_lock:
+            self.serial_port.write(command.encode('ascii') + b"\n")
+            self.serial_port.flush()
+
+    def start_data_thread(self):
+        # Reader for a port opened by the caller, without reconnects
+        self.serial_thread = threading.Thread(target=self.run_reader, daemon=True)
+        self.serial_thread.start()
+
+    def run_reader(self):
+        self.read_data()
+        if not self.stop_thread:
+            self.disconnect()
+
+    def read_data(self):
+        # Blocking bulk reads on the reader thread; returns when the port
+        # fails, is closed or the ESP32 stays silent past READY_TIMEOUT
+        port = self.serial_port
+        read_timer = self.perf.timer('read')
+        while self.is_connected and not self.stop_thread and port is self.serial_port:
+            try:
+                began = time.perf_counter()
+                chunk = port.read(port.in_waiting or 1)
+                read_timer.add(time.perf_counter() - began)
+                if chunk:
+                    self.feed(chunk, time.monotonic())
+                elif (not self.ready and self.ready_deadline is not None
+                      and time.monotonic() > self.ready_deadline):
+                    self.last_error = "no SYSTEM_READY or STATUS received"
+                    self.log(f"ESP32 di {self.port_name} tidak merespons")
+                    break
+            except Exception as e:
+                if self.is_connected and not self.stop_thread:
+                    self.last_error = e
+                    self.log(f"Error reading data: {e}")
+                break
+
+        self.log("Data thread stopped")
+
+    def feed(self, chunk, received_at):
+        # Frames raw bytes into lines in one reusable buffer; complete lines
+        # are parsed and published as they are found
+        began = time.perf_counter()
+        self.bytes_received += len(chunk)
+        self.buffer += chunk
+        if self.framed or 0 in chunk:
+            # Binary frames seen, see radar_protocol
+            self.framed = True
+            self.feed_frames(received_at)
+        else:
+            self.feed_lines(received_at)
+        self.feed_timer.add(time.perf_counter() - began)
+
+    def feed_lines(self, received_at):
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line = buffer[start:end].decode('utf-8', 'replace').strip()
+            start = end + 1
+            if line:
+                self.handle_line(line, received_at)
+        del buffer[:start]
+
+        # Drop runaway garbage that never terminates a line
+        if len(buffer) > MAX_LINE_LENGTH:
+            buffer.clear()
+
+    def feed_frames(self, received_at):
+        # Text lines and 0x00-delimited frames mixed in one stream. A newline
+        # before the next delimiter ends a text line; otherwise whatever sits
+        # between two delimiters is a frame. Two adjacent delimiters make the
+        # second one an opening delimiter again, and a "frame" longer than
+        # MAX_FRAME_LENGTH means the delimiter was a stray one (the closing
+        # delimiter of a frame whose start was lost) in front of text.
+        buffer = self.buffer
+        length = len(buffer)
+        start = 0
+        while start < length:
+            zero = buffer.find(FRAME_DELIMITER, start)
+            newline = buffer.find(b'\n', start, length if zero < 0 else zero)
+            if newline >= 0:
+                line = buffer[start:newline].decode('utf-8', 'replace').strip()
+                start = newline + 1
+                if line:
+                    self.handle_line(line, received_at)
+                continue
+            if zero < 0:
+                break
+            end = buffer.find(FRAME_DELIMITER, zero + 1, zero + MAX_FRAME_LENGTH + 2)
+            if end < 0:
+                if length - zero > MAX_FRAME_LENGTH + 1:
+                    start = zero + 1
+                    continue
+                start = zero
+                break
+            if end > zero + 1:
+                self.handle_frame(bytes(buffer[zero + 1:end]), received_at)
+            start = end if end == zero + 1 else end + 1
+        del buffer[:start]
+
+        if len(buffer) > MAX_LINE_LENGTH:
+            buffer.clear()
+
+    def handle_frame(self, frame, received_at):
+        self.lines_received += 1
+        began = time.perf_counter()
+        record = self.decoder.decode_frame(frame)
+        self.decode_timer.add(time.perf_counter() - began)
+        if record is None:
+            self.publish('invalid', "FRAME:" + frame.hex(), None, received_at)
+            return
+        # Subscribers (hub viewers, recordings) still get the text line
+        self.accept_status(record.as_line(), record, received_at)
+
+    def accept_status(self, line, record, received_at):
+        record.received_at = received_at
+        record.decoded_at = time.monotonic()
+        self.latency.on_decoded(record)
+        self.latest_status = record
+        if not self.ready:
+            self.mark_ready()
+        if not self.listening:
+            self.listening = True
+            if self.telemetry is not None and not self.offline:
+                self.negotiate_telemetry()
+        self.publish('status', line, record, received_at)
+
+    def handle_line(self, line, received_at):
+        self.lines_received += 1
+        if line.startswith(STATUS_PREFIX):
+            began = time.perf_counter()
+            record = self.decoder.decode(line)
+            self.decode_timer.add(time.perf_counter() - began)
+            if record is None:
+                self.publish('invalid', line, None, received_at)
+                return
+            self.accept_status(line, record, received_at)
+        elif self.ready or PROTOCOL_LINE.match(line):
+            if not self.ready:
+                # CALIBRATION_START and the like: the ESP32 is booting
+                self.ready_deadline = time.monotonic() + READY_TIMEOUT
+            self.publish('message', line, None, received_at)
+            if line == "SYSTEM_READY" and not self.ready:
+                self.mark_ready()
+        else:
+            # Boot ROM output after the ESP32 reset on open
+            self.boot_lines += 1
+
+    def stats(self):
+        uptime = time.monotonic() - self.connected_at if self.connected_at else 0.0
+        stats = {
+            'port': self.port_name,
+            'connected': self.is_connected,
+            'uptime': uptime,
+            'lines': self.lines_received,
+            'bytes': self.bytes_received,
+            'lines_per_second': self.lines_received / uptime if uptime > 0 else 0.0,
+            'state': self.state,
+            'reconnects': self.reconnects,
+            'boot_lines': self.boot_lines,
+            'binary': self.binary,
+        }
+        stats.update(self.decoder.stats())
+        if self.command_channel is not None:
+            stats['commands'] = self.command_channel.stats()
+        return stats
+
+def serve_hub(engine, args):
+    # radar_hub.start_hub(), importing the hub only when a listener is wanted
+    if not (args.serve_tcp or args.serve_unix or args.serve_ws):
+        return None
+    from radar_hub import start_hub
+    return start_hub(engine, args)
+
+def run_headless(args):
+    # Ingest without a display, printing statistics every stats_interval seconds
+    engine = RadarEngine(args.baud)
+
+    def on_event(kind, line, payload, received_at):
+        if kind in ('log', 'state') or line == "SYSTEM_READY":
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {kind}: {line}", flush=True)
+
+    engine.subscribe(on_event)
+    sampler = StackSampler().start() if args.profile else None
+    try:
+        hub = serve_hub(engine, args)
+        engine.open_source(args)
+        if args.binary or args.report_interval:
+            engine.request_telemetry(args.binary, args.report_interval)
+        if args.ping_interval:
+            engine.commands.start_probe(args.ping_interval)
+    except Exception as e:
+        print(f"Gagal terhubung: {e}", file=sys.stderr)
+        engine.stop_recording()
+        engine.stop_episodes()
+        return 1
+
+    try:
+        while engine.running:
+            time.sleep(args.stats_interval)
+            stats = engine.stats()
+            record = engine.latest_status
+            if args.json:
+                stats['status'] = record.as_tuple() if record else None
+                stats['latency'] = engine.latency.stats()
+                if hub is not None:
+                    stats['hub'] = hub.stats()
+                if engine.episodes is not None:
+                    stats['episodes'] = engine.episodes.stats()
+                stats['perf'] = engine.perf.snapshot()
+                print(json.dumps(stats), flush=True)
+            else:
+                state = "--"
+                if record is not None:
+                    state = (f"pir={int(record.pir)} us={int(record.ultrasonic)} "
+                             f"dist={record.distance} conf={record.confidence}")
+                rtt = stats['commands']['srtt_ms'] if 'commands' in stats else None
+                if rtt is not None:
+                    state += f" rtt={rtt:.1f}ms"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] lines={stats['lines']} "
+                      f"status={stats['decoded']} bad={stats['malformed']} "
+                      f"rate={stats['lines_per_second']:.1f}/s {state}", flush=True)
+            if args.latency_dump:
+                engine.latency.export(args.latency_dump)
+            if args.perf_dump:
+                write_json(args.perf_dump, {'time': time.time(), 'perf': engine.perf.snapshot()})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.disconnect()
+        engine.stop_recording()
+        engine.stop_episodes()
+        if hub is not None:
+            hub.close()
+        if sampler is not None:
+            print(f"Profile: {sampler.write(args.profile)} samples in {args.profile}",
+                  file=sys.stderr)
+    return 0
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="ESP32 radar serial ingestion")
+    parser.add_argument('--headless', action='store_true',
+                        help="run without the GUI and print periodic statistics")
+    parser.add_argument('--port', help="serial port of the ESP32")
+    parser.add_argument('--ports', metavar='PORT,PORT',
+                        help="comma separated serial ports of several ESP32 devices")
+    parser.add_argument('--baud', type=int, default=BAUDRATE, help="serial baudrate")
+    parser.add_argument('--no-reconnect', action='store_true',
+                        help="give up when the port fails instead of reconnecting")
+    parser.add_argument('--stats-interval', type=float, default=5.0,
+                        help="seconds between headless statistics lines and --perf-dump writes")
+    parser.add_argument('--json', action='store_true',
+                        help="print headless statistics as JSON lines")
+    parser.add_argument('--latency-dump', metavar='FILE',
+                        help="write latency statistics as JSON to FILE periodically")
+    parser.add_argument('--perf-dump', metavar='FILE',
+                        help="write timers and counters as JSON to FILE every stats interval")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="sample every thread's stack and write folded stacks to FILE on exit")
+    parser.add_argument('--binary', action='store_true',
+                        help="ask the ESP32 for binary STATUS frames, text if it cannot")
+    parser.add_argument('--report-interval', type=int, metavar='MS',
+                        help="ask the ESP32 for a STATUS every MS milliseconds (30-5000)")
+    parser.add_argument('--ping-interval', type=float, metavar='SECONDS',
+                        help="PING the ESP32 this often as a health and round-trip probe")
+    parser.add_argument('--record', metavar='FILE',
+                        help="record every received line to a session file")
+    parser.add_argument('--episodes', metavar='FILE',
+                        help="store detection episodes in FILE (query with radar_episodes.py)")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="replay a recorded session instead of opening a port")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="replay speed as a multiple of real time, 0 for as fast as possible")
+    parser.add_argument('--replay-from', type=float, metavar='SECONDS',
+                        help="start the replay this many seconds into the recording")
+    parser.add_argument('--filters', metavar='SPEC',
+                        help="distance filters, e.g. gate,median:5,kalman:4:25 "
+                             "(gate,median by default in the GUI, none with --ports)")
+    parser.add_argument('--phosphor', action='store_true',
+                        help="GUI: start with the raster phosphor display (Ctrl+R toggles)")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="GUI: print startup timings as JSON after the first frame and exit")
+    parser.add_argument('--serve-tcp', metavar='[HOST:]PORT',
+                        help="share the data with viewers connecting to socket://HOST:PORT")
+    parser.add_argument('--serve-unix', metavar='PATH',
+                        help="share the data with viewers connecting to unix://PATH")
+    parser.add_argument('--serve-ws', metavar='[HOST:]PORT',
+                        help="share decoded STATUS records as JSON over WebSocket")
+    parser.add_argument('--hub-policy', choices=HUB_POLICIES, default='drop-oldest',
+                        help="what a slow viewer loses when its queue is full")
+    parser.add_argument('--hub-queue', type=int, default=HUB_QUEUE_SIZE,
+                        help="lines queued per viewer")
+    parser.add_argument('--hub-commands', action='store_true',
+                        help="forward commands from viewers to the ESP32")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.ports:
+        from radar_multi import run_multi_headless
+        return run_multi_headless(args)
+    if not args.port and not args.replay:
+        ports = list_ports()
+        if not ports:
+            print("No serial ports found, use --port", file=sys.stderr)
+            return 1
+        args.port = ports[0]
+    return run_headless(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
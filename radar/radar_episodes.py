@@ -0,0 +1,364 @@
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+# Detection episodes: one row per intrusion instead of a log line per
+# STATUS transition.
+#
+# EpisodeDetector turns the STATUS stream into episodes with hysteresis: an
+# episode opens once PIR or ultrasonic detection has been active for
+# OPEN_AFTER seconds and closes once both have been quiet for CLOSE_AFTER
+# seconds, so a flickering sensor gives one long episode rather than many
+# short ones.
+#
+# EpisodeStore appends closed episodes to a file of fixed-width records in
+# start order. Start and end times, and a running total of durations, are
+# kept in memory as the time index, so a range query is two bisections plus
+# a read of just the matching records, and counts and durations of any
+# range (a day, say) come from the prefix sums without reading the file.
+
+OPEN_AFTER = 0.5
+CLOSE_AFTER = 3.0
+
+# The firmware's no-echo distance; 0 means no echo as well. An episode
+# without a real echo keeps MAX_DISTANCE as its min_distance.
+MAX_DISTANCE = 200
+
+MAGIC = b'RDREPI01'
+VERSION = 1
+HEADER = struct.Struct('<8sHHd4x')
+# start, end (wall-clock seconds), samples, min distance, peak confidence, flags
+EPISODE = struct.Struct('<ddIHBB')
+
+FLAG_PIR = 1
+FLAG_ULTRASONIC = 2
+
+class EpisodeStoreError(Exception):
+    pass
+
+class Episode:
+    __slots__ = ('start', 'end', 'samples', 'min_distance', 'peak_confidence', 'pir',
+                 'ultrasonic')
+
+    def __init__(self, start, end, samples=0, min_distance=MAX_DISTANCE, peak_confidence=0,
+                 pir=False, ultrasonic=False):
+        self.start = start
+        self.end = end
+        self.samples = samples
+        self.min_distance = min_distance
+        self.peak_confidence = peak_confidence
+        self.pir = pir
+        self.ultrasonic = ultrasonic
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def add(self, timestamp, record):
+        self.end = timestamp
+        self.samples += 1
+        if 0 < record.distance < self.min_distance:
+            self.min_distance = record.distance
+        if record.confidence > self.peak_confidence:
+            self.peak_confidence = record.confidence
+        self.pir = self.pir or record.pir
+        self.ultrasonic = self.ultrasonic or record.ultrasonic
+
+    def pack(self):
+        flags = (FLAG_PIR if self.pir else 0) | (FLAG_ULTRASONIC if self.ultrasonic else 0)
+        return EPISODE.pack(self.start, self.end, self.samples, min(self.min_distance, 0xFFFF),
+                            min(self.peak_confidence, 0xFF), flags)
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        start, end, samples, distance, confidence, flags = EPISODE.unpack_from(data, offset)
+        return cls(start, end, samples, distance, confidence, bool(flags & FLAG_PIR),
+                   bool(flags & FLAG_ULTRASONIC))
+
+    def __repr__(self):
+        return ("Episode(%s, %.1fs, min_distance=%d, peak_confidence=%d, pir=%r, "
+                "ultrasonic=%r)" % (datetime.fromtimestamp(self.start).isoformat(' ', 'seconds'),
+                                   self.duration, self.min_distance, self.peak_confidence,
+                                   self.pir, self.ultrasonic))
+
+def format_distance(distance):
+    return f"{distance} cm" if 0 < distance < MAX_DISTANCE else "--"
+
+class EpisodeDetector:
+    # Feed STATUS records in time order; on_episode(episode) is called for
+    # every episode when it closes
+    def __init__(self, on_episode, open_after=OPEN_AFTER, close_after=CLOSE_AFTER):
+        self.on_episode = on_episode
+        self.open_after = open_after
+        self.close_after = close_after
+        self.candidate = None
+        self.is_open = False
+
+    @property
+    def current(self):
+        # The episode in progress, None between episodes
+        return self.candidate if self.is_open else None
+
+    def feed(self, record, timestamp):
+        candidate = self.candidate
+        if record.pir or record.ultrasonic:
+            if candidate is None:
+                candidate = self.candidate = Episode(timestamp, timestamp)
+            candidate.add(timestamp, record)
+            if not self.is_open and candidate.duration >= self.open_after:
+                self.is_open = True
+        elif candidate is not None:
+            if not self.is_open:
+                # Too short to count
+                self.candidate = None
+            elif timestamp - candidate.end >= self.close_after:
+                self.flush()
+
+    def flush(self):
+        # Close the episode in progress, e.g. when the link goes down
+        candidate, is_open = self.candidate, self.is_open
+        self.candidate = None
+        self.is_open = False
+        if candidate is not None and is_open:
+            self.on_episode(candidate)
+
+class EpisodeStore:
+    # Append-only episode file with an in-memory time index; path None keeps
+    # the episodes in memory only
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.starts = array('d')
+        self.ends = array('d')
+        # durations[i] is the total duration of the first i episodes
+        self.durations = array('d', [0.0])
+        self.memory = [] if path is None else None
+        self.file = None
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.write(HEADER.pack(MAGIC, VERSION, EPISODE.size, time.time()))
+            self.file.flush()
+            return
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            self.file.close()
+            raise EpisodeStoreError(f"{path}: not an episode store")
+        magic, version, record_size, created = HEADER.unpack(header)
+        if magic != MAGIC or record_size != EPISODE.size:
+            self.file.close()
+            raise EpisodeStoreError(f"{path}: not an episode store")
+        data = self.file.read()
+        # A partially written trailing record is dropped
+        count = len(data) // EPISODE.size
+        total = 0.0
+        for start, end, _, _, _, _ in EPISODE.iter_unpack(data[:count * EPISODE.size]):
+            self.starts.append(start)
+            self.ends.append(end)
+            total += end - start
+            self.durations.append(total)
+        self.file.truncate(HEADER.size + count * EPISODE.size)
+        self.file.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, episode):
+        with self.lock:
+            # The index needs start order; a wall clock stepping back is
+            # folded into the previous episode's end
+            if self.ends and episode.start < self.ends[-1]:
+                episode.start = self.ends[-1]
+                episode.end = max(episode.end, episode.start)
+            self.starts.append(episode.start)
+            self.ends.append(episode.end)
+            self.durations.append(self.durations[-1] + episode.duration)
+            if self.file is not None:
+                self.file.write(episode.pack())
+                self.file.flush()
+            else:
+                self.memory.append(episode)
+
+    def span(self, start, end):
+        # Index range of the episodes overlapping [start, end)
+        return bisect_right(self.ends, start), bisect_left(self.starts, end)
+
+    def count(self, start, end):
+        with self.lock:
+            first, stop = self.span(start, end)
+        return max(0, stop - first)
+
+    def total_duration(self, start, end):
+        with self.lock:
+            first, stop = self.span(start, end)
+            if stop <= first:
+                return 0.0
+            return self.durations[stop] - self.durations[first]
+
+    def read(self, first, stop):
+        if self.file is None:
+            return self.memory[first:stop]
+        self.file.seek(HEADER.size + first * EPISODE.size)
+        data = self.file.read((stop - first) * EPISODE.size)
+        self.file.seek(0, os.SEEK_END)
+        return [Episode.unpack(data, offset)
+                for offset in range(0, len(data) - EPISODE.size + 1, EPISODE.size)]
+
+    def query(self, start, end):
+        # Episodes overlapping [start, end), oldest first
+        with self.lock:
+            first, stop = self.span(start, end)
+            if stop <= first:
+                return []
+            return self.read(first, stop)
+
+    def rollup(self, day):
+        # Summary of the episodes that started on a local calendar day
+        start = datetime.combine(day, datetime.min.time()).timestamp()
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        with self.lock:
+            first = bisect_left(self.starts, start)
+            stop = bisect_left(self.starts, end)
+            episodes = self.read(first, stop) if stop > first else []
+            total = self.durations[stop] - self.durations[first]
+        return {
+            'day': day.isoformat(),
+            'episodes': len(episodes),
+            'total_s': total,
+            'longest_s': max((episode.duration for episode in episodes), default=0.0),
+            'peak_confidence': max((episode.peak_confidence for episode in episodes), default=0),
+            'min_distance': min((episode.min_distance for episode in episodes
+                                 if 0 < episode.min_distance < MAX_DISTANCE), default=None),
+            'pir': sum(episode.pir for episode in episodes),
+            'ultrasonic': sum(episode.ultrasonic for episode in episodes),
+        }
+
+    def daily(self, first_day, last_day):
+        days = []
+        day = first_day
+        while day <= last_day:
+            days.append(self.rollup(day))
+            day += timedelta(days=1)
+        return days
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+def start_of_day(timestamp):
+    return datetime.combine(datetime.fromtimestamp(timestamp).date(),
+                            datetime.min.time()).timestamp()
+
+class EpisodeTracker:
+    # Engine subscriber feeding an EpisodeDetector and storing what it closes
+    def __init__(self, engine, store, open_after=OPEN_AFTER, close_after=CLOSE_AFTER):
+        self.engine = engine
+        self.store = store
+        self.detector = EpisodeDetector(self.on_episode, open_after, close_after)
+        # Episodes are stored with wall-clock times; events carry
+        # time.monotonic() stamps
+        self.wall_offset = time.time() - time.monotonic()
+        self.closed = 0
+
+    def timestamp(self, received_at):
+        # A replay's lines happened when they were recorded
+        replay = self.engine.replay
+        if replay is not None and replay.current_time is not None:
+            return replay.current_time
+        return received_at + self.wall_offset
+
+    def on_event(self, kind, line, payload, received_at):
+        if kind == 'status':
+            self.detector.feed(payload, self.timestamp(received_at))
+        elif kind == 'state' and line in ('reconnecting', 'disconnected'):
+            self.detector.flush()
+
+    def on_episode(self, episode):
+        self.store.append(episode)
+        self.closed += 1
+        self.engine.log(f"Episode selesai: {episode.duration:.1f} s, "
+                        f"jarak min {format_distance(episode.min_distance)}, "
+                        f"confidence {episode.peak_confidence}")
+
+    def today(self, now=None):
+        # Episodes started today, including one still in progress
+        now = time.time() if now is None else now
+        midnight = start_of_day(now)
+        with self.store.lock:
+            count = len(self.store.starts) - bisect_left(self.store.starts, midnight)
+        current = self.detector.current
+        if current is not None and current.start >= midnight:
+            count += 1
+        return count
+
+    def stats(self):
+        current = self.detector.current
+        return {
+            'stored': len(self.store),
+            'closed': self.closed,
+            'today': self.today(),
+            'in_progress': None if current is None else current.duration,
+        }
+
+def parse_time(value):
+    # "2026-10-17 02:00", "02:00" (today) or seconds since the epoch
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        clock = datetime.strptime(value, "%H:%M").time()
+        return datetime.combine(datetime.now().date(), clock).timestamp()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a radar episode store")
+    parser.add_argument('path', help="episode file written with --episodes")
+    parser.add_argument('--from', dest='start', help="start time, e.g. '2026-10-17 02:00'")
+    parser.add_argument('--to', dest='end', help="end time, default now")
+    parser.add_argument('--daily', type=int, metavar='DAYS',
+                        help="print a rollup for each of the last DAYS days")
+    args = parser.parse_args(argv)
+
+    try:
+        store = EpisodeStore(args.path)
+    except (OSError, EpisodeStoreError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if args.daily:
+            today = datetime.now().date()
+            for rollup in store.daily(today - timedelta(days=args.daily - 1), today):
+                distance = "--" if rollup['min_distance'] is None else rollup['min_distance']
+                print(f"{rollup['day']}  {rollup['episodes']:4d} episodes  "
+                      f"{rollup['total_s']:8.1f} s total  longest {rollup['longest_s']:.1f} s  "
+                      f"min distance {distance}")
+            return 0
+        end = parse_time(args.end) if args.end else time.time()
+        start = parse_time(args.start) if args.start else start_of_day(end)
+        episodes = store.query(start, end)
+        for episode in episodes:
+            print(f"{datetime.fromtimestamp(episode.start).isoformat(' ', 'seconds')}  "
+                  f"{episode.duration:7.1f} s  min {format_distance(episode.min_distance):>6}  "
+                  f"confidence {episode.peak_confidence}  "
+                  f"{'PIR ' if episode.pir else ''}{'US' if episode.ultrasonic else ''}")
+        print(f"{len(episodes)} episodes, {store.total_duration(start, end):.1f} s")
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
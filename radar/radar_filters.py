@@ -0,0 +1,311 @@
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Host-side filter stage for the STATUS distance, between decoding and
+# display.
+#
+# A FilterChain runs a batch of distances (and the baselines reported with
+# them) through its filters in order, each one a NumPy pass over the whole
+# batch, and keeps whatever state it needs to carry on with the next batch,
+# so feeding records one at a time or 5000 at a time gives the same result:
+#   gate          - rejects readings the ESP32 cannot mean: no echo (0 or
+#                   MAX_DISTANCE), or further away than the empty room's
+#                   baseline_distance plus a margin
+#   median[:n]    - running median of the last n readings
+#   ewma[:alpha]  - exponentially weighted moving average
+#   kalman[:q:r]  - 1-D Kalman filter on a random-walk distance with
+#                   process variance q and measurement variance r (cm^2)
+# Rejected readings come out as NaN. The chain holds its last estimate over
+# up to HOLD_SAMPLES of them, so a single stray echo does not move the blip;
+# after a longer gap the target is gone and the smoothers start over.
+#
+# Every filter times itself, see FilterChain.stats().
+
+MAX_DISTANCE = 200
+GATE_MARGIN = 20
+HOLD_SAMPLES = 5
+DEFAULT_FILTERS = "gate,median"
+
+def limited_ffill(values, last, missing, hold):
+    # Carry the last finite value over at most hold NaNs. last/missing are
+    # the value and the NaN run length left over from the previous batch.
+    valid = ~np.isnan(values)
+    positions = np.arange(len(values))
+    source = np.maximum.accumulate(np.where(valid, positions, -1))
+    age = np.where(source >= 0, positions - source, positions + 1 + missing)
+    carried = np.where(source >= 0, values[np.maximum(source, 0)], last)
+    return np.where(age <= hold, carried, np.nan)
+
+def recurrence(values, gains, start):
+    # y[n] = y[n-1] + gains[n] * (values[n] - y[n-1]) with y[-1] = start.
+    # Unrolled as y[n] = A[n] * (start + sum(gains[k] * values[k] / A[k]))
+    # with A the running product of (1 - gains), in blocks short enough that
+    # A stays representable.
+    gains = np.clip(gains, 0.0, 1.0 - 1e-9)
+    decay = 1.0 - gains
+    step = max(1, int(250 / -np.log10(decay.min())))
+    out = np.empty(len(values))
+    for begin in range(0, len(values), step):
+        end = begin + step
+        product = np.cumprod(decay[begin:end])
+        out[begin:end] = product * (start + np.cumsum(gains[begin:end] * values[begin:end] / product))
+        start = out[min(end, len(values)) - 1]
+    return out
+
+class Filter:
+    name = None
+
+    def __init__(self):
+        self.samples = 0
+        self.seconds = 0.0
+
+    def reset(self):
+        pass
+
+    def process(self, distance, baseline):
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'samples': self.samples,
+            'ms': self.seconds * 1000,
+            'ns_per_sample': self.seconds / self.samples * 1e9 if self.samples else None,
+        }
+
+class Gate(Filter):
+    name = 'gate'
+
+    def __init__(self, margin=GATE_MARGIN):
+        super().__init__()
+        self.margin = margin
+        self.rejected = 0
+
+    def process(self, distance, baseline):
+        reject = (distance <= 0) | (distance >= MAX_DISTANCE)
+        reject |= (baseline > 0) & (distance > baseline + self.margin)
+        self.rejected += int(np.count_nonzero(reject))
+        return np.where(reject, np.nan, distance)
+
+    def stats(self):
+        stats = super().stats()
+        stats['rejected'] = self.rejected
+        return stats
+
+class Smoother(Filter):
+    # Runs smooth() over the finite readings only. A run of more than hold
+    # NaNs, within a batch or across batches, resets the state first.
+    def __init__(self, hold=HOLD_SAMPLES):
+        super().__init__()
+        self.hold = hold
+        self.missing = 0
+        self.restarts = 0
+
+    def process(self, distance, baseline):
+        out = np.full(len(distance), np.nan)
+        index = np.flatnonzero(~np.isnan(distance))
+        if not len(index):
+            self.missing += len(distance)
+            return out
+        gaps = np.diff(np.concatenate(([-1 - self.missing], index))) - 1
+        restarts = np.flatnonzero(gaps > self.hold)
+        values = distance[index]
+        smoothed = np.empty(len(values))
+        bounds = [0] + [int(i) for i in restarts if i > 0] + [len(values)]
+        for begin, end in zip(bounds, bounds[1:]):
+            if begin or (len(restarts) and restarts[0] == 0):
+                self.restarts += 1
+                self.reset()
+            smoothed[begin:end] = self.smooth(values[begin:end])
+        out[index] = smoothed
+        self.missing = len(distance) - 1 - int(index[-1])
+        return out
+
+    def smooth(self, values):
+        raise NotImplementedError
+
+class Median(Smoother):
+    name = 'median'
+
+    def __init__(self, window=5, hold=HOLD_SAMPLES):
+        super().__init__(hold)
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        self.tail = np.empty(0)
+
+    def smooth(self, values):
+        series = np.concatenate((self.tail, values))
+        out = np.empty(len(values))
+        # Readings right after a reset only have a partial window
+        partial = min(len(values), max(0, self.window - 1 - len(self.tail)))
+        for i in range(partial):
+            out[i] = np.median(series[:len(self.tail) + i + 1])
+        if len(series) >= self.window and partial < len(values):
+            windows = sliding_window_view(series, self.window)
+            out[partial:] = np.median(windows[len(windows) - (len(values) - partial):], axis=1)
+        self.tail = series[-(self.window - 1):] if self.window > 1 else np.empty(0)
+        return out
+
+class Ewma(Smoother):
+    name = 'ewma'
+
+    def __init__(self, alpha=0.3, hold=HOLD_SAMPLES):
+        super().__init__(hold)
+        if not 0 < alpha <= 1:
+            raise ValueError("ewma alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def smooth(self, values):
+        start = values[0] if self.value is None else self.value
+        out = recurrence(values, np.full(len(values), self.alpha), start)
+        self.value = out[-1]
+        return out
+
+class Kalman(Smoother):
+    name = 'kalman'
+
+    def __init__(self, q=4.0, r=25.0, hold=HOLD_SAMPLES):
+        super().__init__(hold)
+        if q <= 0 or r <= 0:
+            raise ValueError("kalman variances must be positive")
+        self.q = q
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.variance = None
+
+    def gains(self, count):
+        # The gain sequence does not depend on the readings; it settles
+        # within a few dozen steps, after which it is constant
+        gains = np.empty(count)
+        variance = self.variance
+        previous = None
+        for i in range(count):
+            predicted = variance + self.q
+            gain = predicted / (predicted + self.r)
+            variance = (1.0 - gain) * predicted
+            if previous is not None and abs(gain - previous) < 1e-12:
+                gains[i:] = gain
+                break
+            gains[i] = gain
+            previous = gain
+        self.variance = variance
+        return gains
+
+    def smooth(self, values):
+        out = np.empty(len(values))
+        if self.value is None:
+            # The first reading is the estimate, with the sensor's variance
+            self.value = values[0]
+            self.variance = self.r
+            out[0] = values[0]
+            values = values[1:]
+        if len(values):
+            out[len(out) - len(values):] = recurrence(values, self.gains(len(values)), self.value)
+            self.value = out[-1]
+        return out
+
+FILTERS = {
+    'gate': Gate,
+    'median': Median,
+    'ewma': Ewma,
+    'kalman': Kalman,
+}
+
+def parse_filters(spec):
+    # "gate,median:5,kalman:4:25" -> list of filters; "" or "none" -> []
+    filters = []
+    for item in (spec or "").split(","):
+        name, *params = [part.strip() for part in item.split(":")]
+        if not name or name == 'none':
+            continue
+        if name not in FILTERS:
+            raise ValueError(f"unknown filter {name}, expected one of {', '.join(FILTERS)}")
+        try:
+            filters.append(FILTERS[name](*(float(param) for param in params)))
+        except TypeError:
+            raise ValueError(f"too many parameters for filter {name}")
+    return filters
+
+class FilterChain:
+    def __init__(self, spec=DEFAULT_FILTERS, hold=HOLD_SAMPLES):
+        self.spec = spec
+        self.filters = parse_filters(spec)
+        self.hold = hold
+        self.last = np.nan
+        self.missing = 0
+        self.records = 0
+        self.batches = 0
+
+    def process(self, distance, baseline):
+        # Filtered distances as float64, NaN where there is no estimate
+        values = np.asarray(distance, dtype=np.float64)
+        baseline = np.asarray(baseline, dtype=np.float64)
+        if not len(values):
+            return values
+        for stage in self.filters:
+            began = time.perf_counter()
+            values = stage.process(values, baseline)
+            stage.seconds += time.perf_counter() - began
+            stage.samples += len(values)
+        # The hold counts from the last estimate the filters made, not from
+        # the last one it carried over
+        finite = np.flatnonzero(~np.isnan(values))
+        held = limited_ffill(values, self.last, self.missing, self.hold)
+        if len(finite):
+            self.last = values[finite[-1]]
+            self.missing = len(values) - 1 - int(finite[-1])
+        else:
+            self.missing += len(values)
+        self.records += len(values)
+        self.batches += 1
+        return held
+
+    def process_records(self, records):
+        # StatusRecords, e.g. what the GUI dequeued in one frame
+        count = len(records)
+        distance = np.fromiter((record.distance for record in records), np.float64, count)
+        baseline = np.fromiter((record.baseline for record in records), np.float64, count)
+        return self.process(distance, baseline)
+
+    def process_batch(self, batch):
+        # A StatusBatch from StatusDecoder.decode_batch()
+        return self.process(batch.distance, batch.baseline)
+
+    def stats(self):
+        return {
+            'spec': self.spec,
+            'records': self.records,
+            'batches': self.batches,
+            'filters': [stage.stats() for stage in self.filters],
+        }
+
+def combined_stats(chains):
+    # One entry per filter, summed over the chains of several devices
+    chains = list(chains)
+    filters = []
+    for position, stage in enumerate(chains[0].filters if chains else []):
+        stats = [chain.filters[position].stats() for chain in chains]
+        merged = {'name': stage.name, 'samples': sum(s['samples'] for s in stats),
+                  'ms': sum(s['ms'] for s in stats)}
+        merged['ns_per_sample'] = (merged['ms'] / merged['samples'] * 1e6
+                                   if merged['samples'] else None)
+        if 'rejected' in stats[0]:
+            merged['rejected'] = sum(s['rejected'] for s in stats)
+        filters.append(merged)
+    return {
+        'devices': len(chains),
+        'records': sum(chain.records for chain in chains),
+        'batches': sum(chain.batches for chain in chains),
+        'filters': filters,
+    }
\ No newline at end of file
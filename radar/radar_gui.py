@@ -1,13 +1,438 @@
+import time
+# Taken before anything heavy is imported, for the startup metrics
+STARTED = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import serial.tools.list_ports
-import threading
-import time
+import sys
 import math
 import json
 from datetime import datetime
 import queue
+from collections import deque, defaultdict
+import radar_engine
+from radar_engine import RadarEngine, PortWatcher, NEGOTIATE_TIMEOUT, build_arg_parser, serve_hub
+from radar_perf import StackSampler, TkProbe, write_json
+
+# NumPy, the telemetry history and the views built on them (radar_views) are
+# imported after the first frame is on screen, see load_views(). Check what
+# is still imported up front with
+#   python -X importtime radar_gui.py --startup-report
+
+# Milliseconds from process start to the first drawn frame before the
+# startup is logged as slow
+STARTUP_BUDGET_MS = 500
+
+# Trend chart windows (label, seconds)
+TREND_WINDOWS = (('1m', 60), ('10m', 600), ('1h', 3600))
+
+# Detection log keeps at most this many lines in the Text widget
+LOG_MAX_LINES = 1000
+
+# Blips live for BLIP_LIFETIME seconds and fade through FADE_STEPS colors
+BLIP_LIFETIME = 5.0
+FADE_STEPS = 8
+
+# Blip kinds, indexed by (pir, ultrasonic)
+BLIP_IDLE, BLIP_PIR, BLIP_ULTRASONIC, BLIP_BOTH = range(4)
+BLIP_SIZES = (4, 6, 6, 8)
+
+# Whole-degree trig lookup tables
+COS_TABLE = [math.cos(math.radians(angle)) for angle in range(360)]
+SIN_TABLE = [math.sin(math.radians(angle)) for angle in range(360)]
+
+def fade_ramp(color, background, steps):
+    # List of `steps` hex colors going from color towards background
+    start = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+    end = [int(background[i:i + 2], 16) for i in (1, 3, 5)]
+    ramp = []
+    for step in range(steps):
+        t = step / float(steps)
+        ramp.append('#%02x%02x%02x' % tuple(int(a + (b - a) * t) for a, b in zip(start, end)))
+    return ramp
+
+class Blip:
+    # Unit-circle position is computed once when the blip is added
+    __slots__ = ('dx', 'dy', 'kind', 'timestamp')
+
+    def __init__(self, dx, dy, kind, timestamp):
+        self.dx = dx
+        self.dy = dy
+        self.kind = kind
+        self.timestamp = timestamp
+
+class BlipStore:
+    # Blips are kept in arrival order, so expiring them is a popleft() from
+    # the head and the per-frame cost is a table lookup per live blip.
+    def __init__(self, colors, lifetime=BLIP_LIFETIME, steps=FADE_STEPS):
+        self.lifetime = lifetime
+        self.steps = steps
+        self.fade_rate = steps / lifetime
+        self.blips = deque()
+        base = (colors['text'], colors['primary'], colors['secondary'], colors['warning'])
+        self.palettes = [fade_ramp(color, colors['bg'], steps) for color in base]
+
+    def __len__(self):
+        return len(self.blips)
+
+    def __iter__(self):
+        return iter(self.blips)
+
+    def add(self, angle, distance_ratio, pir, ultrasonic, now):
+        index = int(angle) % 360
+        kind = (BLIP_PIR if pir else BLIP_IDLE) | (BLIP_ULTRASONIC if ultrasonic else BLIP_IDLE)
+        self.blips.append(Blip(COS_TABLE[index] * distance_ratio,
+                               SIN_TABLE[index] * distance_ratio, kind, now))
+
+    def expire(self, now):
+        oldest = now - self.lifetime
+        blips = self.blips
+        while blips and blips[0].timestamp <= oldest:
+            blips.popleft()
+
+    def style(self, blip, now):
+        # Faded color and size for a live blip
+        step = int((now - blip.timestamp) * self.fade_rate)
+        if step >= self.steps:
+            step = self.steps - 1
+        return self.palettes[blip.kind][step], BLIP_SIZES[blip.kind]
+
+class LogBuffer:
+    # Detection log that is written to the Text widget once per frame.
+    # add() may be called from any thread; flush() runs on the Tk thread,
+    # collapses identical consecutive messages into one "(xN)" line, does a
+    # single insert for the whole batch and trims the oldest lines in bulk.
+    def __init__(self, max_lines=LOG_MAX_LINES):
+        self.max_lines = max_lines
+        self.trim_slack = max(1, max_lines // 10)
+        self.pending = deque(maxlen=max_lines)
+        self.widget = None
+        self.last_message = None
+        self.last_timestamp = None
+        self.last_count = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.trimmed = 0
+
+    def attach(self, widget):
+        self.widget = widget
+
+    def add(self, message):
+        if len(self.pending) == self.max_lines:
+            self.dropped += 1
+        self.pending.append((time.time(), message))
+
+    def format_line(self, timestamp, message, count):
+        text = f"[{datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')}] {message}"
+        if count > 1:
+            text += f" (x{count})"
+        return text + "\n"
+
+    def flush(self):
+        if self.widget is None or not self.pending:
+            return
+
+        # Collapse repeats, including repeats of the line already shown
+        lines = []
+        rewrite_tail = False
+        pending = self.pending
+        while pending:
+            timestamp, message = pending.popleft()
+            if lines and lines[-1][1] == message:
+                lines[-1][0] = timestamp
+                lines[-1][2] += 1
+                self.coalesced += 1
+            elif not lines and message == self.last_message:
+                self.last_timestamp = timestamp
+                self.last_count += 1
+                self.coalesced += 1
+                rewrite_tail = True
+            else:
+                lines.append([timestamp, message, 1])
+
+        text = ''.join(self.format_line(*line) for line in lines)
+        widget = self.widget
+        try:
+            if rewrite_tail:
+                widget.delete("end-2l", "end-1l")
+                text = self.format_line(self.last_timestamp, self.last_message,
+                                        self.last_count) + text
+            widget.insert(tk.END, text)
+
+            # Trim the oldest lines in one go once past the slack
+            line_count = int(widget.index("end-1c").split('.')[0]) - 1
+            if line_count > self.max_lines + self.trim_slack:
+                excess = line_count - self.max_lines
+                widget.delete("1.0", f"{excess + 1}.0")
+                self.trimmed += excess
+            widget.see(tk.END)
+        except tk.TclError:
+            # Widget has been destroyed
+            self.widget = None
+            return
+
+        if lines:
+            self.last_timestamp, self.last_message, self.last_count = lines[-1]
+
+    def clear(self):
+        self.pending.clear()
+        self.last_message = None
+        self.last_count = 0
+        if self.widget is not None:
+            self.widget.delete(1.0, tk.END)
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'trimmed': self.trimmed,
+        }
+
+class RadarRenderer:
+    # Retained-mode radar renderer: the grid, labels and status text are
+    # created once (and rebuilt only when the canvas is resized), the sweep
+    # line is moved with coords() and blips reuse a pool of ovals, so the
+    # per-frame Tcl work only grows with the blips that actually changed.
+    def __init__(self, canvas, colors):
+        self.canvas = canvas
+        self.colors = colors
+        self.width = int(canvas['width'])
+        self.height = int(canvas['height'])
+
+        self.sweep_item = None
+        self.status_item = None
+        self.overlay_item = None
+        self.status_online = None
+        self.blip_pool = []
+        self.blip_state = []
+        self.visible_blips = 0
+        self.phosphor = None
+
+        self.update_geometry()
+        self.build_scene()
+        canvas.bind('<Configure>', self.on_resize)
+
+    def update_geometry(self):
+        self.center_x = self.width // 2
+        self.center_y = self.height // 2
+        self.max_radius = max(min(self.width, self.height) // 2 - 20, 10)
+
+    def build_scene(self):
+        canvas = self.canvas
+        canvas.delete("grid", "overlay")
+        cx, cy, max_radius = self.center_x, self.center_y, self.max_radius
+
+        # Range rings and spokes, kept below everything else
+        for i in range(1, 5):
+            radius = (max_radius * i) // 4
+            canvas.create_oval(cx - radius, cy - radius, cx + radius, cy + radius,
+                               outline=self.colors['grid'], width=1, tags=("grid",))
+        for angle in range(0, 360, 30):
+            rad = math.radians(angle)
+            canvas.create_line(cx, cy, cx + max_radius * math.cos(rad),
+                               cy + max_radius * math.sin(rad),
+                               fill=self.colors['grid'], width=1, tags=("grid",))
+        canvas.tag_lower("grid")
+
+        # Sweep line is created once and only moved afterwards
+        if self.sweep_item is None:
+            self.sweep_item = canvas.create_line(cx, cy, cx, cy,
+                                                 fill=self.colors['primary'], width=2)
+
+        # Center point and angle labels, kept above the blips
+        canvas.create_oval(cx - 3, cy - 3, cx + 3, cy + 3,
+                           fill=self.colors['primary'], outline=self.colors['primary'],
+                           tags=("overlay",))
+        canvas.create_text(cx, cy - max_radius, text="0°", fill=self.colors['text'], tags=("overlay",))
+        canvas.create_text(cx, cy + max_radius, text="180°", fill=self.colors['text'], tags=("overlay",))
+        canvas.create_text(cx - max_radius, cy, text="270°", fill=self.colors['text'], tags=("overlay",))
+        canvas.create_text(cx + max_radius, cy, text="90°", fill=self.colors['text'], tags=("overlay",))
+
+        # Connection status indicator
+        if self.status_item is None:
+            self.status_item = canvas.create_text(0, 0, text="", tags=("status",))
+        canvas.coords(self.status_item, 50, self.height - 30)
+        canvas.tag_raise("overlay")
+        canvas.tag_raise("status")
+
+        # Every pooled blip has to be repositioned against the new geometry
+        self.blip_state = [None] * len(self.blip_pool)
+
+        # The raster sits under everything, grid included
+        if self.phosphor is not None:
+            self.phosphor.resize(cx, cy, max_radius)
+            canvas.tag_lower("phosphor")
+
+    def set_phosphor(self, enabled):
+        # Raster afterglow mode; blips are then drawn into the raster
+        if enabled and self.phosphor is None:
+            from radar_views import PhosphorLayer
+            self.phosphor = PhosphorLayer(self.canvas, self.colors, BLIP_SIZES)
+            self.phosphor.resize(self.center_x, self.center_y, self.max_radius)
+            self.canvas.tag_lower("phosphor")
+        if self.phosphor is not None:
+            self.phosphor.show(enabled)
+
+    def set_overlay(self, text):
+        # Optional text block in the top-left corner, None hides it
+        if text is None:
+            if self.overlay_item is not None:
+                self.canvas.itemconfig(self.overlay_item, state='hidden')
+            return
+        if self.overlay_item is None:
+            self.overlay_item = self.canvas.create_text(8, 8, anchor='nw', text=text,
+                                                        font=('Courier', 8),
+                                                        fill=self.colors['text'],
+                                                        tags=("status",))
+        else:
+            self.canvas.itemconfig(self.overlay_item, text=text, state='normal')
+            
+    def on_resize(self, event):
+        if event.width == self.width and event.height == self.height:
+            return
+        self.width = event.width
+        self.height = event.height
+        self.update_geometry()
+        self.build_scene()
+
+    def acquire_blip_item(self, index):
+        while len(self.blip_pool) <= index:
+            item = self.canvas.create_oval(0, 0, 0, 0, state='hidden', tags=("blip",))
+            self.canvas.tag_lower(item, "overlay")
+            self.blip_pool.append(item)
+            self.blip_state.append(None)
+        return self.blip_pool[index]
+
+    def draw(self, sweep_angle, blips, is_connected, now=None):
+        canvas = self.canvas
+        cx, cy, max_radius = self.center_x, self.center_y, self.max_radius
+
+        # Sweep line
+        sweep_rad = math.radians(sweep_angle)
+        canvas.coords(self.sweep_item, cx, cy,
+                      cx + max_radius * math.cos(sweep_rad),
+                      cy + max_radius * math.sin(sweep_rad))
+
+        # Detection blips, only touching pooled items whose look changed
+        if now is None:
+            now = time.monotonic()
+        blips.expire(now)
+        count = 0
+        raster = self.phosphor is not None and self.phosphor.visible
+        if raster:
+            self.phosphor.draw(sweep_angle, blips, now)
+        for blip in (() if raster else blips):
+            x = int(cx + blip.dx * max_radius)
+            y = int(cy + blip.dy * max_radius)
+            color, size = blips.style(blip, now)
+
+            item = self.acquire_blip_item(count)
+            state = (x, y, size, color)
+            previous = self.blip_state[count]
+            if previous != state:
+                if previous is None or previous[:3] != state[:3]:
+                    canvas.coords(item, x - size, y - size, x + size, y + size)
+                if previous is None or previous[3] != color:
+                    canvas.itemconfig(item, fill=color, outline=color)
+                self.blip_state[count] = state
+            if count >= self.visible_blips:
+                canvas.itemconfig(item, state='normal')
+            count += 1
+
+        # Hide pooled items that are no longer needed
+        for index in range(count, self.visible_blips):
+            canvas.itemconfig(self.blip_pool[index], state='hidden')
+        self.visible_blips = count
+
+        # Connection status only changes on connect/disconnect
+        if self.status_online != is_connected:
+            if is_connected:
+                canvas.itemconfig(self.status_item, text="● ONLINE", fill=self.colors['primary'])
+            else:
+                canvas.itemconfig(self.status_item, text="● OFFLINE", fill=self.colors['warning'])
+            self.status_online = is_connected
+
+class FrameScheduler:
+    # Drives the animation from the Tk thread with root.after(). Each tick
+    # measures the real frame cost; when a frame overruns, the missed frame
+    # slots are merged into the next one and counted as dropped instead of
+    # piling up in the event queue. The target rate drops to idle_fps while
+    # nothing is being detected.
+    def __init__(self, root, callback, fps=20, idle_fps=8, history=600):
+        self.root = root
+        self.callback = callback
+        self.active_fps = fps
+        self.idle_fps = idle_fps
+        self.target_fps = fps
+        self.frame_times = deque(maxlen=history)
+        self.frames = 0
+        self.dropped = 0
+        self.after_id = None
+        self.running = False
+        self.last_tick = None
+        self.next_due = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.last_tick = time.perf_counter()
+        self.next_due = self.last_tick
+        self.after_id = self.root.after(0, self.tick)
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+            self.after_id = None
+
+    def set_idle(self, idle):
+        self.target_fps = self.idle_fps if idle else self.active_fps
+
+    def tick(self):
+        self.after_id = None
+        if not self.running:
+            return
+        start = time.perf_counter()
+        dt = start - self.last_tick
+        self.last_tick = start
+        try:
+            self.callback(dt)
+        except tk.TclError:
+            # Window has been destroyed
+            self.running = False
+            return
+        end = time.perf_counter()
+        self.frame_times.append(end - start)
+        self.frames += 1
+
+        # Schedule on the frame grid; skip slots we are already late for
+        interval = 1.0 / self.target_fps
+        self.next_due += interval
+        if self.next_due < end:
+            missed = int((end - self.next_due) / interval) + 1
+            self.dropped += missed
+            self.next_due += missed * interval
+        delay_ms = max(1, int((self.next_due - end) * 1000))
+        self.after_id = self.root.after(delay_ms, self.tick)
+
+    def stats(self):
+        times = sorted(self.frame_times)
+        if times:
+            p50 = times[len(times) // 2]
+            p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+        else:
+            p50 = p99 = 0.0
+        return {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'target_fps': self.target_fps,
+            'p50_ms': p50 * 1000,
+            'p99_ms': p99 * 1000,
+        }
 
 class RadarDetectionGUI:
     def __init__(self, root):
@@ -16,24 +441,43 @@ class RadarDetectionGUI:
         self.root.geometry("1200x800")
         self.root.configure(bg='#0a0a0a')
         
-        # Serial communication
-        self.serial_port = None
-        self.is_connected = False
+        # Serial communication, the GUI only subscribes to the engine
+        self.engine = RadarEngine()
+        self.engine.subscribe(self.on_engine_event)
         self.data_queue = queue.Queue()
-        self.serial_thread = None
-        self.stop_thread = False
+        self.data_counter = 0
+        
+        # Extra ESP32 devices, see attach_devices(); device 0 is self.engine
+        # and drives the status panel
+        self.manager = None
+        self.device_names = []
+        # PING once the ESP32 sends STATUS, see update_connection_display()
+        self.ping_on_status = False
+        self.device_status = {}
+        self.device_distance = {}
         
         # Detection states
         self.pir_active = False
         self.ultrasonic_active = False
-        self.distance = 0
+        # Filtered distance, None while there is no estimate
+        self.distance = None
+        self.device_millis = 0
+        self.pir_trigger_count = 0
+        self.confidence = 0
+        self.baseline_distance = 0
         self.last_update = datetime.now()
+        # Created by load_views() once the window is up
+        self.history = None
+        self.trend = None
+        # device -> FilterChain, see filter_distances(); --filters sets the spec
+        self.filters = None
+        self.filter_spec = None
+        self.startup = {'budget_ms': STARTUP_BUDGET_MS}
         
         # Animation variables
         self.radar_angle = 0
         self.sweep_angle = 0
         self.detection_history = []
-        self.radar_blips = []
         
         # Colors
         self.colors = {
@@ -45,11 +489,48 @@ class RadarDetectionGUI:
             'grid': '#1a1a1a'
         }
         
+        # Detection blips, needs the colors for its fade palettes
+        self.radar_blips = BlipStore(self.colors)
+        
         # Initialize log_text to None first
         self.log_text = None
+        self.log = LogBuffer()
         
         self.setup_ui()
+        
+        # Ctrl+L toggles the latency overlay, Ctrl+E exports latency stats,
+        # Ctrl+R toggles the raster phosphor display, Ctrl+P the performance
+        # panel and Ctrl+Shift+P the stack sampler
+        self.show_latency = False
+        self.show_phosphor = False
+        self.pending_draw = None
+        self.root.bind('<Control-l>', self.toggle_latency_overlay)
+        self.root.bind('<Control-e>', self.export_latency_stats)
+        self.root.bind('<Control-r>', self.toggle_phosphor)
+        self.root.bind('<Control-p>', self.toggle_perf_panel)
+        self.root.bind('<Control-P>', self.toggle_profiler)
+        
+        # GUI timers go next to the engine's reader and decode timers;
+        # --perf-dump writes them all out every perf_dump_interval seconds
+        self.perf = self.engine.perf
+        self.perf_panel = None
+        self.perf_dump = None
+        self.perf_dump_interval = 5.0
+        self.last_perf_dump = time.perf_counter()
+        self.sampler = None
+        self.profile_path = None
+        
+        # Serial ports are enumerated off the Tk thread, results arrive in
+        # pending_ports and are applied on the next frame
+        self.pending_ports = None
+        self.port_watcher = PortWatcher(self.on_ports_changed).start()
+        
         self.start_animation()
+        self.tk_probe = TkProbe(self.root, self.perf).start()
+        
+    @property
+    def is_connected(self):
+        return self.engine.is_connected
         
     def setup_ui(self):
         # Main container
@@ -94,9 +575,6 @@ class RadarDetectionGUI:
         self.port_combo = ttk.Combobox(conn_frame, textvariable=self.port_var, width=10)
         self.port_combo.pack(side=tk.LEFT, padx=5)
         
-        # Now it's safe to refresh ports since log_text exists
-        self.refresh_ports()
-        
         # Buttons
         self.connect_btn = tk.Button(conn_frame, text="Connect", 
                                    command=self.toggle_connection,
@@ -148,7 +626,23 @@ class RadarDetectionGUI:
         # Canvas for radar
         self.radar_canvas = tk.Canvas(radar_frame, width=500, height=500, 
                                     bg=self.colors['bg'], highlightthickness=0)
-        self.radar_canvas.pack(pady=10)
+        self.radar_canvas.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.renderer = RadarRenderer(self.radar_canvas, self.colors)
+        
+        # Distance trend with a selectable window
+        trend_bar = tk.Frame(radar_frame, bg=self.colors['bg'])
+        trend_bar.pack(fill=tk.X)
+        tk.Label(trend_bar, text="Trend:", fg=self.colors['text'], 
+                bg=self.colors['bg']).pack(side=tk.LEFT)
+        self.trend_window_var = tk.IntVar(value=TREND_WINDOWS[0][1])
+        for label, seconds in TREND_WINDOWS:
+            tk.Radiobutton(trend_bar, text=label, variable=self.trend_window_var, value=seconds,
+                           command=self.change_trend_window, indicatoron=0,
+                           fg=self.colors['text'], bg=self.colors['bg'],
+                           selectcolor=self.colors['grid']).pack(side=tk.LEFT, padx=2)
+        self.trend_canvas = tk.Canvas(radar_frame, width=500, height=140, 
+                                    bg=self.colors['bg'], highlightthickness=0)
+        self.trend_canvas.pack(fill=tk.X)
         
         # Detection info
         self.detection_info = tk.Label(radar_frame, text="Sistem Idle - Memindai Area", 
@@ -174,12 +668,46 @@ class RadarDetectionGUI:
                                       fg=self.colors['text'], bg=self.colors['bg'])
         self.timestamp_label.pack(pady=5)
         
+        self.sensor_info_label = tk.Label(data_frame, text="Confidence: -- | Baseline: -- cm", 
+                                        fg=self.colors['text'], bg=self.colors['bg'])
+        self.sensor_info_label.pack(pady=5)
+        
+        # Windowed statistics from the telemetry history
+        self.history_label = tk.Label(data_frame, text="1 menit: --", 
+                                    font=('Courier', 8), 
+                                    fg=self.colors['text'], bg=self.colors['bg'])
+        self.history_label.pack(pady=5)
+        
+        # Detection episodes since midnight, see radar_episodes
+        self.episodes_label = tk.Label(data_frame, text="Episode hari ini: 0", 
+                                     font=('Arial', 10, 'bold'), 
+                                     fg=self.colors['text'], bg=self.colors['bg'])
+        self.episodes_label.pack(pady=5)
+        
         # Raw data display
         self.raw_data_label = tk.Label(data_frame, text="Raw: --", 
                                      font=('Courier', 8), 
                                      fg=self.colors['text'], bg=self.colors['bg'])
         self.raw_data_label.pack(pady=5)
         
+        # One line per device when several are attached
+        self.devices_label = tk.Label(data_frame, text="", font=('Courier', 8), 
+                                    justify=tk.LEFT,
+                                    fg=self.colors['text'], bg=self.colors['bg'])
+        self.devices_label.pack(pady=5)
+        
+        # Frame timing stats
+        self.frame_stats_label = tk.Label(data_frame, text="Frame: --", 
+                                        font=('Courier', 8), 
+                                        fg=self.colors['text'], bg=self.colors['bg'])
+        self.frame_stats_label.pack(pady=5)
+        
+        # Cost of the distance filters
+        self.filter_stats_label = tk.Label(data_frame, text="Filter: --", 
+                                         font=('Courier', 8), 
+                                         fg=self.colors['text'], bg=self.colors['bg'])
+        self.filter_stats_label.pack(pady=5)
+        
         # Detection log
         log_frame = tk.LabelFrame(status_frame, text="Log Deteksi", 
                                 fg=self.colors['text'], bg=self.colors['bg'])
@@ -193,6 +721,7 @@ class RadarDetectionGUI:
         self.log_text.configure(yscrollcommand=scrollbar.set)
         
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.log.attach(self.log_text)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Control buttons
@@ -209,163 +738,280 @@ class RadarDetectionGUI:
                                 bg=self.colors['primary'], fg='black')
         send_ping_btn.pack(side=tk.LEFT, padx=2)
         
+        self.log_stats_label = tk.Label(btn_frame, text="", font=('Courier', 8), 
+                                      fg=self.colors['text'], bg=self.colors['bg'])
+        self.log_stats_label.pack(side=tk.LEFT, padx=2)
+        
     def refresh_ports(self):
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        self.port_watcher.refresh()
+        
+    def on_ports_changed(self, ports):
+        # Port watcher thread
+        self.pending_ports = ports
+        
+    def apply_ports(self):
+        ports = self.pending_ports
+        self.pending_ports = None
         self.port_combo['values'] = ports
-        if ports:
+        if ports and self.port_var.get() not in ports and not self.engine.running:
             self.port_combo.set(ports[0])
-        # Only add log if log_text widget exists
-        if self.log_text is not None:
-            self.add_log(f"Found {len(ports)} ports: {', '.join(ports)}")
-            
+        self.add_log(f"Found {len(ports)} ports: {', '.join(ports)}")
+        
+    def load_views(self):
+        # Deferred imports: NumPy and the NumPy-backed views
+        began = time.perf_counter()
+        from radar_history import TelemetryHistory
+        from radar_views import TrendChart
+        from radar_filters import DEFAULT_FILTERS, FilterChain, parse_filters
+        self.history = TelemetryHistory()
+        spec = self.filter_spec or DEFAULT_FILTERS
+        try:
+            parse_filters(spec)
+        except ValueError as e:
+            self.add_log(f"Filter {spec}: {e}, pakai {DEFAULT_FILTERS}")
+            spec = DEFAULT_FILTERS
+        self.filter_spec = spec
+        self.filters = defaultdict(lambda: FilterChain(spec))
+        self.trend = TrendChart(self.trend_canvas, self.colors, self.history,
+                                self.trend_window_var.get())
+        now = time.perf_counter()
+        self.startup['views_ms'] = (now - began) * 1000
+        self.startup['views_ready_ms'] = (now - STARTED) * 1000
+        
+    def on_first_frame(self):
+        self.startup['first_frame_ms'] = (time.perf_counter() - STARTED) * 1000
+        self.root.after(1, self.load_views)
+        message = f"Startup: first frame after {self.startup['first_frame_ms']:.0f} ms"
+        if self.startup['first_frame_ms'] > STARTUP_BUDGET_MS:
+            message += f", over the {STARTUP_BUDGET_MS} ms budget"
+        self.add_log(message)
+        
     def toggle_connection(self):
-        if not self.is_connected:
+        if self.engine.state == 'disconnected' and self.manager is None:
             self.connect_serial()
         else:
             self.disconnect_serial()
             
     def connect_serial(self):
-        try:
-            port = self.port_var.get()
-            if not port:
-                messagebox.showerror("Error", "Pilih port serial terlebih dahulu!")
-                return
+        port = self.port_var.get()
+        if not port:
+            messagebox.showerror("Error", "Pilih port serial terlebih dahulu!")
+            return
+            
+        self.add_log(f"Mencoba koneksi ke {port}...")
+        
+        # Opens and reconnects on the engine's thread, the UI only renders
+        # the state events
+        self.data_counter = 0
+        self.engine.start(port)
                 
+    def attach_devices(self, ports, baudrate):
+        # Several ESP32s on one asyncio loop; each gets a sector of the radar
+        from radar_multi import DeviceManager
+        
+        self.manager = DeviceManager(baudrate).start_in_thread()
+        self.device_names = ports
+        self.data_counter = 0
+        for index, port in enumerate(ports):
+            if index == 0:
+                engine = self.engine
+            else:
+                engine = RadarEngine(baudrate)
+                engine.subscribe(lambda kind, line, payload, received_at, index=index:
+                                 self.on_device_event(index, kind, line, payload, received_at))
             self.add_log(f"Mencoba koneksi ke {port}...")
+            future = self.manager.submit(self.manager.add_device(port, port, engine))
+            future.add_done_callback(lambda future, port=port: self.on_device_added(port, future))
             
-            # Close existing connection
-            if self.serial_port and self.serial_port.is_open:
-                self.serial_port.close()
-                
-            self.serial_port = serial.Serial(
-                port=port, 
-                baudrate=115200, 
-                timeout=1,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE
-            )
+    def on_device_added(self, port, future):
+        # Called on the device manager's thread; success shows up as a
+        # 'connected' state event
+        error = future.exception()
+        if error is not None:
+            self.add_log(f"Gagal terhubung ke {port}: {error}")
             
-            time.sleep(2)  # Wait for ESP32 to initialize
+    def disconnect_serial(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+            self.device_names = []
+            self.device_status.clear()
+            self.device_distance.clear()
+            self.devices_label.config(text="")
+        else:
+            self.engine.disconnect()
+        
+    def on_engine_event(self, kind, line, payload, received_at):
+        self.on_device_event(0, kind, line, payload, received_at)
+        
+    def on_device_event(self, device, kind, line, payload, received_at):
+        # Called on the engine's reader thread or the device manager's loop
+        if kind == 'log':
+            self.add_log(line if device == 0 else f"[{self.device_names[device]}] {line}")
+        else:
+            self.data_queue.put((device, kind, line, payload, received_at))
             
-            # Clear any existing data
-            self.serial_port.flushInput()
-            self.serial_port.flushOutput()
+    def update_connection_display(self, state, detail):
+        if state == 'disconnected':
+            self.connect_btn.config(text="Connect", bg=self.colors['primary'])
+            self.conn_status.config(text="● DISCONNECTED", fg=self.colors['warning'])
+            self.add_log("Koneksi terputus")
+            self.ping_on_status = False
+            return
             
-            self.is_connected = True
-            self.stop_thread = False
-            self.connect_btn.config(text="Disconnect", bg=self.colors['warning'])
+        # Any other state can be cancelled with the same button
+        self.connect_btn.config(text="Disconnect", bg=self.colors['warning'])
+        if state == 'connected':
             self.conn_status.config(text="● CONNECTED", fg=self.colors['primary'])
-            
-            # Start data reading thread
-            self.start_data_thread()
-            self.add_log(f"Koneksi berhasil ke {port}")
-            
-            # Send initial ping
-            self.root.after(1000, self.send_ping)
-                
-        except Exception as e:
-            self.add_log(f"Gagal terhubung: {str(e)}")
-            messagebox.showerror("Connection Error", f"Gagal terhubung: {str(e)}")
-            if self.serial_port:
-                try:
-                    self.serial_port.close()
-                except:
-                    pass
-                self.serial_port = None
-                
-    def disconnect_serial(self):
-        self.is_connected = False
-        self.stop_thread = True
+            self.add_log(f"Koneksi berhasil ke {detail}")
+            # SYSTEM_READY comes before calibration, and the ESP32 reads no
+            # commands until it is over; its first STATUS means it is
+            # listening again. A replay has no ESP32 to answer.
+            self.ping_on_status = not self.engine.offline
+        elif state == 'reconnecting':
+            self.conn_status.config(text="● RECONNECTING", fg=self.colors['secondary'])
+            self.add_log(f"Koneksi terputus, mencoba lagi: {detail}")
+        else:
+            self.conn_status.config(text="● CONNECTING", fg=self.colors['secondary'])
         
-        if self.serial_port:
+    def process_data_queue(self):
+        # Runs once per frame on the Tk thread: apply only the latest
+        # status and aggregate everything else
+        dequeued_at = time.monotonic()
+        latency = self.engine.latency
+        latest_status = None
+        statuses = defaultdict(list)
+        received = 0
+        last_line = None
+        while True:
             try:
-                self.serial_port.close()
-            except:
-                pass
-            self.serial_port = None
+                device, kind, line, payload, received_at = self.data_queue.get_nowait()
+            except queue.Empty:
+                break
+            received += 1
+            last_line = line
+            if device:
+                if kind == 'status':
+                    statuses[device].append(payload)
+                else:
+                    self.process_device_event(device, kind, line, payload)
+            elif kind == 'status':
+                if self.history is not None:
+                    self.history.append(received_at, payload)
+                latency.on_dequeued(payload, dequeued_at)
+                latest_status = payload
+                statuses[0].append(payload)
+            elif kind == 'invalid':
+                continue
+            elif kind == 'state':
+                received -= 1
+                self.update_connection_display(line, payload)
+            elif line == "PONG":
+                # Reported by on_ping_reply() with its round-trip time
+                continue
+            elif line == "SYSTEM_READY":
+                self.add_log("ESP32 system ready!")
+            else:
+                self.add_log(f"ESP32: {line}")
+                
+        if received:
+            self.data_counter += received
+            malformed = self.engine.decoder.malformed
+            if malformed:
+                self.data_count.config(text=f"Data: {self.data_counter} ({malformed} bad)")
+            else:
+                self.data_count.config(text=f"Data: {self.data_counter}")
+            self.raw_data_label.config(text=f"Raw: {last_line[:20]}...")
+        # Everything a device sent this frame goes through its filters at once
+        distance = None
+        for device, records in statuses.items():
+            distances = self.filter_distances(device, records)
+            if device:
+                self.process_device_statuses(device, records, distances)
+            else:
+                distance = distances[-1]
+        if latest_status is not None:
+            self.process_status_data(latest_status, distance)
+            if self.ping_on_status:
+                self.ping_on_status = False
+                self.send_ping(timeout=NEGOTIATE_TIMEOUT)
+            self.pending_draw = (latest_status, dequeued_at)
             
-        self.connect_btn.config(text="Connect", bg=self.colors['primary'])
-        self.conn_status.config(text="● DISCONNECTED", fg=self.colors['warning'])
-        self.add_log("Koneksi terputus")
-        
-    def start_data_thread(self):
-        def read_data():
-            data_counter = 0
-            while self.is_connected and not self.stop_thread and self.serial_port:
-                try:
-                    if self.serial_port.in_waiting > 0:
-                        line = self.serial_port.readline().decode('utf-8').strip()
-                        if line:
-                            data_counter += 1
-                            self.root.after_idle(lambda: self.data_count.config(text=f"Data: {data_counter}"))
-                            self.root.after_idle(lambda l=line: self.raw_data_label.config(text=f"Raw: {l[:20]}..."))
-                            
-                            # Process different types of messages
-                            if line.startswith("STATUS:"):
-                                self.process_status_data(line)
-                            elif line == "PONG":
-                                self.add_log("PING response: PONG")
-                            elif line == "SYSTEM_READY":
-                                self.add_log("ESP32 system ready!")
-                            else:
-                                self.add_log(f"ESP32: {line}")
-                    else:
-                        time.sleep(0.01)  # Small delay when no data
-                        
-                except Exception as e:
-                    if self.is_connected and not self.stop_thread:
-                        self.add_log(f"Error reading data: {e}")
-                        break
-                        
-            self.add_log("Data thread stopped")
-                    
-        self.serial_thread = threading.Thread(target=read_data, daemon=True)
-        self.serial_thread.start()
-        
-    def process_status_data(self, line):
-        try:
-            # Parse STATUS:pir,ultrasonic,distance,timestamp
-            data_part = line.replace("STATUS:", "")
-            data = data_part.split(",")
+    def filter_distances(self, device, records):
+        # Filtered distance per record, None where there is no estimate
+        if self.filters is None:
+            # Filters not loaded yet, only drop the no-echo readings
+            return [record.distance if 0 < record.distance < 200 else None
+                    for record in records]
+        return [None if math.isnan(distance) else distance
+                for distance in self.filters[device].process_records(records).tolist()]
+        
+    def process_device_statuses(self, device, records, distances):
+        # The extra devices only add blips
+        self.device_status[device] = records[-1]
+        self.device_distance[device] = distances[-1]
+        for record, distance in zip(records, distances):
+            if record.pir or record.ultrasonic:
+                self.add_radar_blip(device, distance, record.pir, record.ultrasonic)
+        
+    def process_device_event(self, device, kind, line, payload):
+        # Other events from the extra devices only add log lines
+        name = self.device_names[device]
+        if kind == 'state':
+            self.add_log(f"[{name}] {line}")
+        elif kind == 'message':
+            self.add_log(f"[{name}] ESP32: {line}")
             
-            if len(data) >= 4:
-                prev_pir = self.pir_active
-                prev_ultrasonic = self.ultrasonic_active
-                
-                self.pir_active = data[0] == '1'
-                self.ultrasonic_active = data[1] == '1'
-                self.distance = int(data[2]) if data[2].isdigit() else 0
-                self.last_update = datetime.now()
-                
-                # Update UI in main thread
-                self.root.after_idle(self.update_status_display)
-                
-                # Log changes
-                if prev_pir != self.pir_active or prev_ultrasonic != self.ultrasonic_active:
-                    self.root.after_idle(self.log_detection_change)
-                    
-                # Add radar blip if detected
-                if self.pir_active or self.ultrasonic_active:
-                    self.root.after_idle(self.add_radar_blip)
-                    
-        except Exception as e:
-            self.add_log(f"Error parsing data: {e}")
+    def process_status_data(self, record, distance):
+        prev_pir = self.pir_active
+        prev_ultrasonic = self.ultrasonic_active
+        
+        self.pir_active = record.pir
+        self.ultrasonic_active = record.ultrasonic
+        self.distance = distance
+        self.device_millis = record.device_millis
+        self.pir_trigger_count = record.pir_trigger_count
+        self.confidence = record.confidence
+        self.baseline_distance = record.baseline
+        self.last_update = datetime.now()
+        self.device_status[0] = record
+        self.device_distance[0] = distance
+        
+        self.update_status_display()
+        
+        # Log changes
+        if prev_pir != self.pir_active or prev_ultrasonic != self.ultrasonic_active:
+            self.log_detection_change()
+            
+        # Add radar blip if detected
+        if self.pir_active or self.ultrasonic_active:
+            self.add_radar_blip(0, self.distance, self.pir_active, self.ultrasonic_active)
             
     def test_connection(self):
-        if self.is_connected and self.serial_port:
+        if self.engine.offline:
+            self.add_log("Replay - no device to test")
+        elif self.is_connected:
             self.send_ping()
         else:
             self.add_log("Not connected - cannot test")
             
-    def send_ping(self):
-        if self.is_connected and self.serial_port:
-            try:
-                self.serial_port.write(b"PING\n")
-                self.serial_port.flush()
-                self.add_log("Sent PING command")
-            except Exception as e:
-                self.add_log(f"Error sending PING: {e}")
+    def send_ping(self, timeout=None):
+        if self.is_connected and not self.engine.offline:
+            self.add_log("Sent PING command")
+            self.engine.commands.ping(timeout=timeout).add_done_callback(self.on_ping_reply)
+            
+    def on_ping_reply(self, future):
+        # Reader or command thread; add_log is safe from any thread
+        error = future.exception()
+        if error is not None:
+            self.add_log(f"Error sending PING: {error}")
+            return
+        reply = future.result()
+        srtt = self.engine.commands.srtt
+        message = f"PING response: PONG in {reply.rtt * 1000:.1f} ms"
+        if srtt is not None:
+            message += f" (avg {srtt * 1000:.1f} ms)"
+        self.add_log(message)
                 
     def update_status_display(self):
         # Update status labels
@@ -376,13 +1022,17 @@ class RadarDetectionGUI:
         self.ultrasonic_status.config(text=f"US: {'ON' if self.ultrasonic_active else 'OFF'}", fg=us_color)
         
         # Update distance
-        if self.distance < 200 and self.distance > 0:
-            self.distance_label.config(text=f"Jarak: {self.distance} cm")
+        if self.distance is not None:
+            self.distance_label.config(text=f"Jarak: {self.distance:.0f} cm")
         else:
             self.distance_label.config(text="Jarak: -- cm")
             
         # Update timestamp
-        self.timestamp_label.config(text=f"Update: {self.last_update.strftime('%H:%M:%S')}")
+        self.timestamp_label.config(text=f"Update: {self.last_update.strftime('%H:%M:%S')} "
+                                         f"(ESP32 {self.device_millis / 1000:.1f}s)")
+        self.sensor_info_label.config(text=f"Confidence: {self.confidence} | "
+                                           f"Baseline: {self.baseline_distance} cm | "
+                                           f"PIR x{self.pir_trigger_count}")
         
         # Update detection info
         if self.pir_active and self.ultrasonic_active:
@@ -412,156 +1062,278 @@ class RadarDetectionGUI:
             
         self.add_log(f"[{timestamp}] {status}")
         
-    def add_radar_blip(self):
-        # Add detection blip to radar
+    def add_radar_blip(self, device, distance, pir, ultrasonic):
+        # Add detection blip to radar, in the device's own sector when
+        # several devices are attached
+        distance_ratio = min(distance / 100.0, 1.0) if distance is not None else 0.8
         angle = self.radar_angle
-        distance_ratio = min(self.distance / 100.0, 1.0) if self.distance < 200 and self.distance > 0 else 0.8
-        
-        blip = {
-            'angle': angle,
-            'distance': distance_ratio,
-            'pir': self.pir_active,
-            'ultrasonic': self.ultrasonic_active,
-            'timestamp': time.time(),
-            'fade': 1.0
-        }
-        
-        self.radar_blips.append(blip)
-        
-        # Keep only recent blips
-        current_time = time.time()
-        self.radar_blips = [b for b in self.radar_blips if (current_time - b['timestamp']) < 5]
+        if len(self.device_names) > 1:
+            sector = 360.0 / len(self.device_names)
+            angle = device * sector + self.radar_angle % sector
+        self.radar_blips.add(angle, distance_ratio, pir, ultrasonic, time.monotonic())
         
     def add_log(self, message):
-        def update_log():
-            # Check if log_text widget exists and is valid
-            if self.log_text is not None:
-                try:
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-                    self.log_text.see(tk.END)
-                except tk.TclError:
-                    # Widget has been destroyed
-                    pass
-            
-        if threading.current_thread() == threading.main_thread():
-            update_log()
-        else:
-            self.root.after_idle(update_log)
+        # Safe from any thread, written out on the next frame
+        self.perf.count('log_added')
+        self.log.add(message)
             
     def clear_log(self):
-        if self.log_text is not None:
-            self.log_text.delete(1.0, tk.END)
+        self.log.clear()
         
     def draw_radar(self):
         try:
-            canvas = self.radar_canvas
-            canvas.delete("all")
-            
-            # Canvas dimensions
-            width = 500
-            height = 500
-            center_x = width // 2
-            center_y = height // 2
-            max_radius = min(width, height) // 2 - 20
-            
-            # Draw radar circles
-            for i in range(1, 5):
-                radius = (max_radius * i) // 4
-                canvas.create_oval(center_x - radius, center_y - radius,
-                                 center_x + radius, center_y + radius,
-                                 outline=self.colors['grid'], width=1)
-                                 
-            # Draw radar lines
-            for angle in range(0, 360, 30):
-                rad = math.radians(angle)
-                end_x = center_x + max_radius * math.cos(rad)
-                end_y = center_y + max_radius * math.sin(rad)
-                canvas.create_line(center_x, center_y, end_x, end_y,
-                                 fill=self.colors['grid'], width=1)
-                                 
-            # Draw sweep line
-            sweep_rad = math.radians(self.sweep_angle)
-            sweep_end_x = center_x + max_radius * math.cos(sweep_rad)
-            sweep_end_y = center_y + max_radius * math.sin(sweep_rad)
-            canvas.create_line(center_x, center_y, sweep_end_x, sweep_end_y,
-                             fill=self.colors['primary'], width=2)
-                             
-            # Draw detection blips
-            for blip in self.radar_blips:
-                blip_radius = max_radius * blip['distance']
-                blip_rad = math.radians(blip['angle'])
-                blip_x = center_x + blip_radius * math.cos(blip_rad)
-                blip_y = center_y + blip_radius * math.sin(blip_rad)
-                
-                # Fade out over time
-                fade = max(0, 1.0 - (time.time() - blip['timestamp']) / 5.0)
-                
-                # Color based on sensor type
-                if blip['pir'] and blip['ultrasonic']:
-                    color = self.colors['warning']
-                    size = 8
-                elif blip['pir']:
-                    color = self.colors['primary']
-                    size = 6
-                elif blip['ultrasonic']:
-                    color = self.colors['secondary']
-                    size = 6
-                else:
-                    color = self.colors['text']
-                    size = 4
-                    
-                # Draw blip with fade effect
-                if fade > 0:
-                    canvas.create_oval(blip_x - size, blip_y - size,
-                                     blip_x + size, blip_y + size,
-                                     fill=color, outline=color)
-                                     
-            # Draw center point
-            canvas.create_oval(center_x - 3, center_y - 3,
-                             center_x + 3, center_y + 3,
-                             fill=self.colors['primary'], outline=self.colors['primary'])
-                             
-            # Draw labels
-            canvas.create_text(center_x, 20, text="0°", fill=self.colors['text'])
-            canvas.create_text(center_x, height - 20, text="180°", fill=self.colors['text'])
-            canvas.create_text(20, center_y, text="270°", fill=self.colors['text'])
-            canvas.create_text(width - 20, center_y, text="90°", fill=self.colors['text'])
-            
-            # Connection status indicator
-            if self.is_connected:
-                canvas.create_text(50, height - 30, text="● ONLINE", fill=self.colors['primary'])
-            else:
-                canvas.create_text(50, height - 30, text="● OFFLINE", fill=self.colors['warning'])
+            self.renderer.draw(self.sweep_angle, self.radar_blips, self.is_connected)
+            if self.trend is not None:
+                self.trend.draw(time.monotonic())
         except tk.TclError:
             # Canvas has been destroyed, stop drawing
             pass
         
+    def change_trend_window(self):
+        if self.trend is not None:
+            self.trend.set_window(self.trend_window_var.get())
+        
     def start_animation(self):
-        def animate():
-            while True:
-                try:
-                    # Update sweep angle
-                    self.sweep_angle = (self.sweep_angle + 2) % 360
-                    self.radar_angle = (self.radar_angle + 1) % 360
-                    
-                    # Update radar display
-                    self.root.after_idle(self.draw_radar)
-                    
-                    time.sleep(0.05)  # 20 FPS
-                except:
-                    break
-                
-        thread = threading.Thread(target=animate, daemon=True)
-        thread.start()
+        self.frame_scheduler = FrameScheduler(self.root, self.animate_frame)
+        self.last_frame_stats = time.perf_counter()
+        self.frame_scheduler.start()
+        
+    def animate_frame(self, dt):
+        perf = self.perf
+        if self.pending_ports is not None:
+            self.apply_ports()
+        perf.gauge('data_queue', self.data_queue.qsize())
+        began = time.perf_counter()
+        self.process_data_queue()
+        perf.add('gui_queue', time.perf_counter() - began)
+        began = time.perf_counter()
+        self.log.flush()
+        perf.add('log_flush', time.perf_counter() - began)
+        
+        # Sweep at a constant angular speed regardless of the frame rate
+        self.sweep_angle = (self.sweep_angle + 40 * dt) % 360
+        self.radar_angle = (self.radar_angle + 20 * dt) % 360
+        
+        began = time.perf_counter()
+        self.draw_radar()
+        perf.add('draw', time.perf_counter() - began)
+        
+        # The record applied this frame is now on screen
+        if self.pending_draw is not None:
+            record, dequeued_at = self.pending_draw
+            self.engine.latency.on_drawn(record, dequeued_at, time.monotonic())
+            self.pending_draw = None
+        if 'first_frame_ms' not in self.startup:
+            self.root.update_idletasks()
+            self.on_first_frame()
+        
+        # Slow down while nothing is being detected
+        idle = not (self.pir_active or self.ultrasonic_active or self.radar_blips)
+        self.frame_scheduler.set_idle(idle)
+        
+        now = time.perf_counter()
+        if now - self.last_frame_stats >= 1.0:
+            self.last_frame_stats = now
+            self.update_frame_stats()
+            self.update_history_stats()
+            self.update_episodes_stats()
+            self.update_filter_stats()
+            self.update_log_stats()
+            self.update_perf()
+            if len(self.device_names) > 1:
+                self.update_devices_stats()
+            if self.show_latency:
+                self.renderer.set_overlay(self.engine.latency.overlay_text())
+            
+    def update_history_stats(self):
+        if self.history is None:
+            return
+        stats = self.history.stats(60, time.monotonic())
+        if stats['distance_mean'] is None:
+            distance = "--"
+        else:
+            distance = (f"{stats['distance_mean']:.0f} "
+                        f"({stats['distance_min']}-{stats['distance_max']})")
+        self.history_label.config(
+            text=f"1 menit: jarak {distance} cm | aktif {stats['duty_cycle'] * 100:.0f}% | "
+                 f"{stats['events_per_minute']:.1f} deteksi/menit")
+        
+    def update_episodes_stats(self):
+        tracker = self.engine.episodes
+        if tracker is None:
+            return
+        text = f"Episode hari ini: {tracker.today()}"
+        current = tracker.detector.current
+        if current is not None:
+            text += f" (aktif {current.duration:.0f} s)"
+        self.episodes_label.config(text=text)
+        
+    def toggle_phosphor(self, event=None):
+        self.show_phosphor = not self.show_phosphor
+        self.renderer.set_phosphor(self.show_phosphor)
+        self.add_log(f"Phosphor display {'on' if self.show_phosphor else 'off'}")
+        
+    def toggle_latency_overlay(self, event=None):
+        self.show_latency = not self.show_latency
+        self.renderer.set_overlay(self.engine.latency.overlay_text() if self.show_latency else None)
+        
+    def export_latency_stats(self, event=None):
+        path = f"latency_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        try:
+            self.engine.latency.export(path)
+            self.add_log(f"Latency stats saved to {path}")
+        except OSError as e:
+            self.add_log(f"Error saving latency stats: {e}")
+            
+    def perf_snapshot(self):
+        return {
+            'time': time.time(),
+            'perf': self.perf.snapshot(),
+            'frame': self.frame_scheduler.stats(),
+            'log': self.log.stats(),
+            'profiling': self.sampler is not None and self.sampler.running,
+        }
+        
+    def update_perf(self):
+        if self.perf_panel is not None:
+            self.perf_label.config(text=self.perf.text())
+        now = time.perf_counter()
+        if self.perf_dump and now - self.last_perf_dump >= self.perf_dump_interval:
+            self.last_perf_dump = now
+            try:
+                write_json(self.perf_dump, self.perf_snapshot())
+            except OSError as e:
+                self.add_log(f"Error writing {self.perf_dump}: {e}")
+                self.perf_dump = None
+        
+    def toggle_perf_panel(self, event=None):
+        # Separate window so the main layout never changes
+        if self.perf_panel is not None:
+            self.perf_panel.destroy()
+            self.perf_panel = None
+            return
+        self.perf_panel = tk.Toplevel(self.root, bg=self.colors['bg'])
+        self.perf_panel.title("Performance")
+        self.perf_panel.protocol("WM_DELETE_WINDOW", self.toggle_perf_panel)
+        self.perf_label = tk.Label(self.perf_panel, text=self.perf.text(), font=('Courier', 9),
+                                   justify=tk.LEFT, anchor='nw',
+                                   fg=self.colors['primary'], bg=self.colors['bg'])
+        self.perf_label.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+    def toggle_profiler(self, event=None):
+        if self.sampler is None or not self.sampler.running:
+            self.sampler = StackSampler().start()
+            self.add_log("Profiler on (Ctrl+Shift+P to stop and save)")
+            return
+        path = self.profile_path or f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+        try:
+            samples = self.sampler.write(path)
+            self.add_log(f"Profile: {samples} samples saved to {path}")
+        except OSError as e:
+            self.add_log(f"Error saving profile: {e}")
+        
+    def update_devices_stats(self):
+        lines = []
+        for device, name in enumerate(self.device_names):
+            record = self.device_status.get(device)
+            distance = self.device_distance.get(device)
+            if record is None:
+                lines.append(f"{name}: --")
+            else:
+                distance = "--" if distance is None else f"{distance:.0f}"
+                lines.append(f"{name}: {distance} cm "
+                             f"PIR {'ON' if record.pir else 'OFF'} "
+                             f"US {'ON' if record.ultrasonic else 'OFF'}")
+        self.devices_label.config(text="\n".join(lines))
+        
+    def update_filter_stats(self):
+        if not self.filters:
+            return
+        from radar_filters import combined_stats
+        stats = combined_stats(self.filters.values())
+        costs = " ".join(f"{f['name']} {f['ns_per_sample'] / 1000:.1f}us"
+                         for f in stats['filters'] if f['ns_per_sample'] is not None)
+        rejected = sum(f.get('rejected', 0) for f in stats['filters'])
+        self.filter_stats_label.config(
+            text=f"Filter: {costs or self.filter_spec} /sampel, {rejected} ditolak")
+        
+    def update_log_stats(self):
+        stats = self.log.stats()
+        self.log_stats_label.config(text=f"{stats['coalesced']} merged, "
+                                         f"{stats['dropped'] + stats['trimmed']} dropped")
+        
+    def update_frame_stats(self):
+        stats = self.frame_scheduler.stats()
+        self.frame_stats_label.config(
+            text=f"Frame: p50 {stats['p50_ms']:.1f}ms p99 {stats['p99_ms']:.1f}ms "
+                 f"drop {stats['dropped']} @{stats['target_fps']}fps")
 
-def main():
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.headless:
+        # No Tk window at all, just the ingestion engine
+        return radar_engine.main(argv)
+        
     root = tk.Tk()
     app = RadarDetectionGUI(root)
+    if args.startup_report:
+        # Print the startup metrics once the views are loaded, then quit
+        def report():
+            if 'views_ready_ms' not in app.startup:
+                root.after(10, report)
+                return
+            app.startup['port_enumeration_ms'] = (
+                None if app.port_watcher.last_duration is None
+                else app.port_watcher.last_duration * 1000)
+            print(json.dumps(app.startup), flush=True)
+            app.frame_scheduler.stop()
+            app.tk_probe.stop()
+            app.port_watcher.stop()
+            root.destroy()
+        root.after(10, report)
+    app.engine.baudrate = args.baud
+    app.filter_spec = args.filters
+    app.perf_dump = args.perf_dump
+    app.perf_dump_interval = args.stats_interval
+    if args.profile:
+        app.profile_path = args.profile
+        app.toggle_profiler()
+    if args.phosphor:
+        app.toggle_phosphor()
+    if args.port:
+        app.port_var.set(args.port)
+    if args.record:
+        app.engine.start_recording(args.record)
+    # Episodes are always tracked for the counter, on disk with --episodes
+    app.engine.start_episodes(args.episodes)
+    if args.ports:
+        app.attach_devices([port.strip() for port in args.ports.split(",") if port.strip()],
+                           args.baud)
+    elif args.replay:
+        app.engine.start_replay(args.replay, args.speed, args.replay_from)
+    elif args.port and "://" in args.port:
+        # A viewer of another process's hub, nothing to choose
+        app.connect_serial()
+    if args.binary or args.report_interval:
+        app.engine.request_telemetry(args.binary, args.report_interval)
+    if args.ping_interval:
+        app.engine.commands.start_probe(args.ping_interval)
+    
+    # Share this window's serial reader with other viewers
+    hub = serve_hub(app.engine, args)
     
     def on_closing():
-        if app.is_connected:
+        app.frame_scheduler.stop()
+        app.tk_probe.stop()
+        app.port_watcher.stop()
+        if app.sampler is not None and app.sampler.running:
+            app.toggle_profiler()
+        if app.engine.running or app.manager is not None:
             app.disconnect_serial()
+        app.engine.stop_recording()
+        app.engine.stop_episodes()
+        if hub is not None:
+            hub.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -573,4 +1345,4 @@ def main():
         on_closing()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,132 @@
+import numpy as np
+
+# Fixed-capacity telemetry history.
+#
+# Every column is stored twice back to back (a "mirrored" ring), so the most
+# recent N samples are always one contiguous slice and windows can be
+# returned as NumPy views without copying or re-ordering.
+
+HISTORY_COLUMNS = (
+    ('host_time', np.float64),
+    ('device_millis', np.int64),
+    ('distance', np.int32),
+    ('pir', np.bool_),
+    ('ultrasonic', np.bool_),
+    ('confidence', np.int16),
+)
+
+class TelemetryWindow:
+    # Zero-copy views over a span of the history
+    __slots__ = tuple(name for name, _ in HISTORY_COLUMNS)
+
+    def __init__(self, columns, start, stop):
+        for name, _ in HISTORY_COLUMNS:
+            setattr(self, name, columns[name][start:stop])
+
+    def __len__(self):
+        return len(self.host_time)
+
+class TelemetryHistory:
+    def __init__(self, capacity=36000):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity * 2, dtype=dtype)
+                        for name, dtype in HISTORY_COLUMNS}
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, host_time, record):
+        pos = self.total % self.capacity
+        mirror = pos + self.capacity
+        columns = self.columns
+        for index in (pos, mirror):
+            columns['host_time'][index] = host_time
+            columns['device_millis'][index] = record.device_millis
+            columns['distance'][index] = record.distance
+            columns['pir'][index] = record.pir
+            columns['ultrasonic'][index] = record.ultrasonic
+            columns['confidence'][index] = record.confidence
+        self.total += 1
+
+    def clear(self):
+        self.total = 0
+
+    def latest(self, count):
+        # The newest `count` samples, oldest first
+        count = min(count, len(self))
+        if count == 0:
+            return TelemetryWindow(self.columns, 0, 0)
+        end = (self.total - 1) % self.capacity + self.capacity + 1
+        return TelemetryWindow(self.columns, end - count, end)
+
+    def window(self, seconds, now):
+        # Samples whose host_time falls within the last `seconds` before now
+        recent = self.latest(len(self))
+        start = int(np.searchsorted(recent.host_time, now - seconds, side='left'))
+        if start == 0:
+            return recent
+        end = (self.total - 1) % self.capacity + self.capacity + 1
+        return TelemetryWindow(self.columns, end - len(recent) + start, end)
+
+    def stats(self, seconds, now):
+        window = self.window(seconds, now)
+        samples = len(window)
+        result = {
+            'samples': samples,
+            'distance_mean': None,
+            'distance_min': None,
+            'distance_max': None,
+            'duty_cycle': 0.0,
+            'events_per_minute': 0.0,
+        }
+        if samples == 0:
+            return result
+
+        distance = window.distance
+        valid = distance[(distance > 0) & (distance < 200)]
+        if len(valid):
+            result['distance_mean'] = float(valid.mean())
+            result['distance_min'] = int(valid.min())
+            result['distance_max'] = int(valid.max())
+
+        detected = window.pir | window.ultrasonic
+        result['duty_cycle'] = float(np.count_nonzero(detected)) / samples
+
+        # Rising edges of the combined detection state
+        events = int(np.count_nonzero(detected[1:] & ~detected[:-1]))
+        if detected[0]:
+            events += 1
+        span = max(float(window.host_time[-1] - window.host_time[0]), 1.0)
+        result['events_per_minute'] = events * 60.0 / min(span, seconds)
+        return result
+
+def bucket_minmax(window, start, width, columns):
+    # Decimate a window to `columns` time buckets of `width` seconds from
+    # `start`: per-column min/max of the valid distances and the OR of the
+    # detection flags (1 = PIR, 2 = ultrasonic). Empty columns are NaN / 0.
+    # Cost is O(samples + columns), with no Python loop over either.
+    mins = np.full(columns, np.nan, dtype=np.float32)
+    maxs = np.full(columns, np.nan, dtype=np.float32)
+    flags = np.zeros(columns, dtype=np.uint8)
+    if len(window) == 0:
+        return mins, maxs, flags
+
+    edges = start + width * np.arange(columns + 1)
+    bounds = np.searchsorted(window.host_time, edges, side='left')
+    first, last = int(bounds[0]), int(bounds[-1])
+    if first == last:
+        return mins, maxs, flags
+
+    distance = window.distance[first:last].astype(np.float32)
+    distance[(distance <= 0) | (distance >= 200)] = np.nan
+    detected = (window.pir[first:last].astype(np.uint8) |
+                (window.ultrasonic[first:last].astype(np.uint8) << 1))
+
+    occupied = bounds[1:] > bounds[:-1]
+    starts = bounds[:-1][occupied] - first
+    # fmin/fmax skip the NaNs of out-of-range readings
+    mins[occupied] = np.fmin.reduceat(distance, starts)
+    maxs[occupied] = np.fmax.reduceat(distance, starts)
+    flags[occupied] = np.bitwise_or.reduceat(detected, starts)
+    return mins, maxs, flags
@@ -0,0 +1,389 @@
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from serial import SerialException
+from serial.urlhandler import protocol_socket
+
+from radar_engine import HUB_POLICIES, HUB_QUEUE_SIZE
+from radar_protocol import STATUS_FIELDS
+
+# Local fan-out hub: one process owns the serial port and republishes what
+# its RadarEngine receives to any number of viewers.
+#
+# TCP and Unix socket subscribers get the ESP32's own line protocol
+# (STATUS:..., SYSTEM_READY, PONG, ...), so a viewer is just another
+# RadarEngine whose port is socket://host:port or unix:///path. WebSocket
+# subscribers get one JSON object per line with the STATUS fields decoded.
+#
+# Every subscriber has its own bounded queue and writer thread, so a slow
+# client only ever delays itself (HUB_POLICIES, in radar_engine with the
+# rest of the command line):
+#   'drop-oldest' - keep the newest queue_size lines
+#   'latest-only' - keep only the newest STATUS (other lines still queue)
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+# Longest frame taken from a WebSocket client: commands and control frames
+# are a few bytes, and the length in the header is the client's word. A
+# longer one is refused with close status 1009 (message too big).
+WS_MAX_PAYLOAD = 64 * 1024
+WS_MESSAGE_TOO_BIG = 1009
+# How long a refused client's close frame may take to go out
+WS_CLOSE_TIMEOUT = 1.0
+
+def websocket_frame(payload, opcode=WS_TEXT):
+    # Unmasked single-frame server message
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+def recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+class Subscriber:
+    def __init__(self, hub, sock, address, websocket):
+        self.hub = hub
+        self.sock = sock
+        self.address = address
+        self.websocket = websocket
+        self.policy = hub.policy
+        self.pending = deque(maxlen=hub.queue_size)
+        self.latest = None
+        self.cond = threading.Condition()
+        self.closed = False
+        self.sending = False
+        self.sent = 0
+        self.dropped = 0
+        self.connected_at = time.monotonic()
+
+    def start(self):
+        threading.Thread(target=self.run_reader, daemon=True).start()
+
+    def push(self, data, is_status):
+        # Called on the engine's reader thread, never blocks on the socket
+        with self.cond:
+            if self.policy == 'latest-only' and is_status:
+                if self.latest is not None:
+                    self.dropped += 1
+                self.latest = data
+            else:
+                if len(self.pending) == self.pending.maxlen:
+                    self.dropped += 1
+                self.pending.append(data)
+            self.cond.notify_all()
+
+    def run_writer(self):
+        while True:
+            with self.cond:
+                while not self.pending and self.latest is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                chunks = list(self.pending)
+                self.pending.clear()
+                if self.latest is not None:
+                    chunks.append(self.latest)
+                    self.latest = None
+                self.sending = True
+            try:
+                self.sock.sendall(b"".join(chunks))
+            except OSError:
+                self.close()
+                return
+            finally:
+                with self.cond:
+                    self.sending = False
+                    self.cond.notify_all()
+            self.sent += len(chunks)
+
+    def run_reader(self):
+        # Handshake, then lines (or WebSocket frames) from the client: any
+        # command is forwarded to the ESP32 when the hub allows it
+        try:
+            if self.websocket:
+                self.accept_websocket()
+            threading.Thread(target=self.run_writer, daemon=True).start()
+            if self.websocket:
+                self.read_websocket()
+            else:
+                self.read_lines()
+        except (OSError, ValueError, ConnectionError):
+            pass
+        finally:
+            self.close()
+
+    def read_lines(self):
+        buffer = bytearray()
+        while not self.closed:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                return
+            buffer += chunk
+            while True:
+                end = buffer.find(b'\n')
+                if end < 0:
+                    break
+                self.hub.on_command(self, buffer[:end].decode('ascii', 'replace').strip())
+                del buffer[:end + 1]
+            if len(buffer) > 4096:
+                buffer.clear()
+
+    def accept_websocket(self):
+        request = bytearray()
+        while b"\r\n\r\n" not in request:
+            chunk = self.sock.recv(4096)
+            if not chunk or len(request) > 16384:
+                raise ConnectionError("bad handshake")
+            request += chunk
+        key = None
+        for line in request.decode('latin-1').split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip().encode('ascii')
+        if key is None:
+            self.sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            raise ConnectionError("not a websocket request")
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        self.sock.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                          b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+    def read_websocket(self):
+        while not self.closed:
+            first, second = recv_exactly(self.sock, 2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', recv_exactly(self.sock, 2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', recv_exactly(self.sock, 8))[0]
+            if length > WS_MAX_PAYLOAD:
+                self.close_websocket(WS_MESSAGE_TOO_BIG)
+                return
+            mask = recv_exactly(self.sock, 4) if second & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(recv_exactly(self.sock, length)))
+            if opcode == WS_CLOSE:
+                return
+            if opcode == WS_PING:
+                self.push(websocket_frame(payload, WS_PONG), False)
+            elif opcode == WS_TEXT:
+                self.hub.on_command(self, payload.decode('utf-8', 'replace').strip())
+
+    def close_websocket(self, status):
+        # Queue a close frame and let the writer send it before close()
+        self.push(websocket_frame(struct.pack('!H', status), WS_CLOSE), False)
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or not (self.pending or self.sending),
+                               WS_CLOSE_TIMEOUT)
+
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.hub.remove(self)
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'websocket': self.websocket,
+            'queued': len(self.pending) + (self.latest is not None),
+            'sent': self.sent,
+            'dropped': self.dropped,
+        }
+
+class FanoutHub:
+    def __init__(self, engine, policy='drop-oldest', queue_size=HUB_QUEUE_SIZE,
+                 allow_commands=False):
+        if policy not in HUB_POLICIES:
+            raise ValueError(f"unknown hub policy {policy}")
+        self.engine = engine
+        self.policy = policy
+        self.queue_size = queue_size
+        self.allow_commands = allow_commands
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.listeners = []
+        self.unix_paths = []
+        self.published = 0
+        self.total_subscribers = 0
+        engine.subscribe(self.on_event)
+
+    def listen_tcp(self, host, port, websocket=False):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen()
+        self.start_listener(sock, websocket)
+        return sock.getsockname()
+
+    def listen_unix(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen()
+        self.unix_paths.append(path)
+        self.start_listener(sock, False)
+        return path
+
+    def start_listener(self, sock, websocket):
+        self.listeners.append(sock)
+        threading.Thread(target=self.accept_loop, args=(sock, websocket), daemon=True).start()
+
+    def accept_loop(self, sock, websocket):
+        while True:
+            try:
+                client, address = sock.accept()
+            except OSError:
+                return
+            if client.family != getattr(socket, 'AF_UNIX', None):
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = Subscriber(self, client, str(address or "unix"), websocket)
+            with self.lock:
+                self.subscribers.append(subscriber)
+                self.total_subscribers += 1
+            subscriber.start()
+            self.engine.log(f"Hub: subscriber {subscriber.address} connected")
+
+    def remove(self, subscriber):
+        with self.lock:
+            if subscriber not in self.subscribers:
+                return
+            self.subscribers.remove(subscriber)
+        self.engine.log(f"Hub: subscriber {subscriber.address} left "
+                        f"({subscriber.sent} sent, {subscriber.dropped} dropped)")
+
+    def on_event(self, kind, line, payload, received_at):
+        # Engine subscriber: encode once per format, queue for everyone
+        if kind not in ('status', 'message') or not self.subscribers:
+            return
+        self.published += 1
+        is_status = kind == 'status'
+        raw = None
+        frame = None
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            if subscriber.websocket:
+                if frame is None:
+                    frame = websocket_frame(self.encode_json(kind, line, payload))
+                subscriber.push(frame, is_status)
+            else:
+                if raw is None:
+                    raw = line.encode('utf-8', 'replace') + b"\r\n"
+                subscriber.push(raw, is_status)
+
+    def encode_json(self, kind, line, record):
+        message = {'kind': kind, 'line': line}
+        if record is not None:
+            message['status'] = dict(zip(STATUS_FIELDS, record.as_tuple()))
+        return json.dumps(message).encode('utf-8')
+
+    def on_command(self, subscriber, command):
+        if not command:
+            return
+        if not self.allow_commands:
+            subscriber.push(b"HUB_READ_ONLY\r\n", False)
+            return
+        try:
+            self.engine.send(command)
+        except Exception as e:
+            self.engine.log(f"Hub: command {command} from {subscriber.address} failed: {e}")
+
+    def close(self):
+        self.engine.unsubscribe(self.on_event)
+        for sock in self.listeners:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        for path in self.unix_paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def stats(self):
+        with self.lock:
+            subscribers = [subscriber.stats() for subscriber in self.subscribers]
+        return {
+            'policy': self.policy,
+            'published': self.published,
+            'subscribers': len(subscribers),
+            'total_subscribers': self.total_subscribers,
+            'dropped': sum(subscriber['dropped'] for subscriber in subscribers),
+            'clients': subscribers,
+        }
+
+def parse_address(value, default_host="127.0.0.1"):
+    # "7000" or "0.0.0.0:7000"
+    host, _, port = value.rpartition(":")
+    return host or default_host, int(port)
+
+def start_hub(engine, args):
+    # Start the listeners given on the command line, None if there are none
+    if not (args.serve_tcp or args.serve_unix or args.serve_ws):
+        return None
+    hub = FanoutHub(engine, args.hub_policy, args.hub_queue, args.hub_commands)
+    if args.serve_tcp:
+        host, port = hub.listen_tcp(*parse_address(args.serve_tcp))
+        engine.log(f"Hub: viewers can connect to socket://{host}:{port}")
+    if args.serve_unix:
+        engine.log(f"Hub: viewers can connect to unix://{hub.listen_unix(args.serve_unix)}")
+    if args.serve_ws:
+        host, port = hub.listen_tcp(*parse_address(args.serve_ws), websocket=True)
+        engine.log(f"Hub: WebSocket on ws://{host}:{port}/")
+    return hub
+
+class UnixSocketSerial(protocol_socket.Serial):
+    # pyserial's socket:// port over a Unix domain socket, unix:///path
+    def open(self):
+        self.logger = None
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        path = self.portstr[len("unix://"):]
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(protocol_socket.POLL_TIMEOUT)
+            self._socket.connect(path)
+        except Exception as e:
+            self._socket.close()
+            self._socket = None
+            raise SerialException(f"Could not open port {self.portstr}: {e}")
+        self._socket.setblocking(False)
+        self.is_open = True
+        self.reset_input_buffer()
+        self.reset_output_buffer()
\ No newline at end of file
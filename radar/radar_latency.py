@@ -0,0 +1,181 @@
+import json
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+
+# End-to-end latency instrumentation, from the ESP32's millis() stamp to the
+# frame that first shows a STATUS record.
+#
+# Each StatusRecord carries its stage timestamps (device_at, received_at,
+# decoded_at, all on the host's time.monotonic() clock). device_at is the
+# device's millis() mapped to host time by ClockSync, which tracks the
+# offset between the two clocks as the minimum observed (host - device)
+# difference and fits the drift of that minimum over time. Absolute one-way
+# latency cannot be known without a shared clock, so device_to_read is the
+# latency above the fastest transfer seen, which is what grows under load.
+
+LATENCY_STAGES = ('device_to_read', 'read_to_decode', 'decode_to_dequeue',
+                  'dequeue_to_draw', 'device_to_draw')
+
+class LatencyHistogram:
+    # Log-spaced buckets from 10 us to 100 s, O(log buckets) per sample
+    def __init__(self, low=1e-5, high=100.0, buckets=140):
+        step = (math.log10(high) - math.log10(low)) / buckets
+        self.edges = [10 ** (math.log10(low) + step * (i + 1)) for i in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        if seconds < 0:
+            seconds = 0.0
+        self.counts[bisect_left(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, fraction):
+        # Upper edge of the bucket holding the given fraction of samples
+        if self.count == 0:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.edges[index] if index < len(self.edges) else self.maximum
+        return self.maximum
+
+    def summary(self):
+        def ms(value):
+            return None if value is None else value * 1000
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.total / self.count) if self.count else None,
+            'p50_ms': ms(self.percentile(0.50)),
+            'p95_ms': ms(self.percentile(0.95)),
+            'p99_ms': ms(self.percentile(0.99)),
+            'max_ms': ms(self.maximum) if self.count else None,
+        }
+
+class ClockSync:
+    # Running estimate of host_time - device_time and of its drift
+    def __init__(self, window=10.0, points=60):
+        self.window = window
+        self.points = deque(maxlen=points)
+        self.resets = 0
+        self.clear()
+
+    def clear(self):
+        self.points.clear()
+        self.window_start = None
+        self.window_min = None
+        self.best = None
+        self.last_device = None
+        self.intercept = None
+        self.reference = None
+        self.drift = 0.0
+
+    def update(self, device_seconds, host_seconds):
+        # millis() going backwards means the ESP32 rebooted or wrapped
+        if self.last_device is not None and device_seconds < self.last_device:
+            self.resets += 1
+            self.clear()
+        self.last_device = device_seconds
+
+        sample = host_seconds - device_seconds
+        if self.best is None or sample < self.best:
+            self.best = sample
+        if self.window_min is None or sample < self.window_min:
+            self.window_min = sample
+        if self.window_start is None:
+            self.window_start = host_seconds
+        elif host_seconds - self.window_start >= self.window:
+            self.points.append((host_seconds, self.window_min))
+            self.window_start = host_seconds
+            self.window_min = None
+            self.fit()
+
+    def fit(self):
+        # Least-squares line through the per-window minimum offsets
+        count = len(self.points)
+        if count < 2:
+            self.intercept = None
+            return
+        mean_t = sum(t for t, _ in self.points) / count
+        mean_o = sum(o for _, o in self.points) / count
+        var = sum((t - mean_t) ** 2 for t, _ in self.points)
+        if var <= 0:
+            return
+        self.drift = sum((t - mean_t) * (o - mean_o) for t, o in self.points) / var
+        # Shift the line down so no observed minimum lies below it
+        self.intercept = min(o - self.drift * (t - mean_t) for t, o in self.points)
+        self.reference = mean_t
+
+    def offset(self, host_seconds):
+        if self.intercept is not None:
+            estimate = self.intercept + self.drift * (host_seconds - self.reference)
+            if self.window_min is not None and self.window_min < estimate:
+                return self.window_min
+            return estimate
+        return self.best
+
+    def device_to_host(self, device_seconds, host_seconds):
+        offset = self.offset(host_seconds)
+        if offset is None:
+            return None
+        return device_seconds + offset
+
+    def summary(self):
+        return {
+            'offset_s': self.offset(time.monotonic()),
+            'drift_ppm': self.drift * 1e6,
+            'windows': len(self.points),
+            'resets': self.resets,
+        }
+
+class LatencyTracker:
+    def __init__(self):
+        self.clock = ClockSync()
+        self.histograms = {stage: LatencyHistogram() for stage in LATENCY_STAGES}
+
+    def on_decoded(self, record):
+        # Reader thread, right after decoding
+        device_seconds = record.device_millis / 1000.0
+        self.clock.update(device_seconds, record.received_at)
+        record.device_at = self.clock.device_to_host(device_seconds, record.received_at)
+        if record.device_at is not None:
+            self.histograms['device_to_read'].record(record.received_at - record.device_at)
+        self.histograms['read_to_decode'].record(record.decoded_at - record.received_at)
+
+    def on_dequeued(self, record, dequeued_at):
+        if record.decoded_at is not None:
+            self.histograms['decode_to_dequeue'].record(dequeued_at - record.decoded_at)
+
+    def on_drawn(self, record, dequeued_at, drawn_at):
+        self.histograms['dequeue_to_draw'].record(drawn_at - dequeued_at)
+        if record.device_at is not None:
+            self.histograms['device_to_draw'].record(drawn_at - record.device_at)
+
+    def stats(self):
+        stats = {stage: self.histograms[stage].summary() for stage in LATENCY_STAGES}
+        stats['clock'] = self.clock.summary()
+        return stats
+
+    def overlay_text(self):
+        lines = ["latency p50/p95/p99 ms"]
+        for stage in LATENCY_STAGES:
+            summary = self.histograms[stage].summary()
+            if summary['count']:
+                lines.append(f"{stage:<17} {summary['p50_ms']:6.1f} {summary['p95_ms']:6.1f} "
+                             f"{summary['p99_ms']:6.1f}")
+        clock = self.clock.summary()
+        lines.append(f"drift {clock['drift_ppm']:.0f} ppm")
+        return "\n".join(lines)
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump({'time': time.time(), 'latency': self.stats()}, f, indent=2)
\ No newline at end of file
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from radar_engine import RadarEngine, BAUDRATE
+
+# Several ESP32 sensor nodes in one process.
+#
+# DeviceManager runs one asyncio event loop that multiplexes every port. On
+# POSIX each port's file descriptor is put in non-blocking mode and watched
+# with loop.add_reader(), so an idle device costs nothing and a busy one
+# only costs the bytes it sends. Each device is a RadarEngine used without
+# its reader thread: bytes go straight into RadarEngine.feed(), so every
+# device keeps its own decoder, latest state, latency tracker and stats.
+# Elsewhere a short-timeout read is polled in the loop's default executor.
+
+POLL_INTERVAL = 0.01
+READ_SIZE = 65536
+
+class DeviceManager:
+    def __init__(self, baudrate=BAUDRATE):
+        self.baudrate = baudrate
+        self.loop = None
+        self.thread = None
+        self.devices = {}
+        self.subscribers = []
+        self.polls = {}
+
+    def subscribe(self, callback):
+        # callback(device_name, kind, line, payload, received_at), called on
+        # the event loop thread
+        self.subscribers.append(callback)
+
+    def start_in_thread(self):
+        # Run the event loop on a background thread, e.g. next to Tk
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def submit(self, coroutine):
+        # Schedule a coroutine from another thread
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        if self.loop is None:
+            return
+        future = self.submit(self.close_all())
+        try:
+            future.result(timeout=2.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def make_engine(self, name, engine=None):
+        # engine lets a caller keep its own RadarEngine, e.g. the GUI's
+        if engine is None:
+            engine = RadarEngine(self.baudrate)
+        engine.name = name
+
+        def forward(kind, line, payload, received_at):
+            for callback in self.subscribers:
+                callback(name, kind, line, payload, received_at)
+
+        engine.subscribe(forward)
+        return engine
+
+    async def add_device(self, port, name=None, engine=None):
+        name = name or port
+        if name in self.devices:
+            raise ValueError(f"device {name} already added")
+        loop = asyncio.get_event_loop()
+        engine = self.make_engine(name, engine)
+        serial_port = engine.open_port(port, timeout=0)
+        self.devices[name] = engine
+        try:
+            # The ESP32 resets on open; RadarEngine reports 'connected' once
+            # it hears SYSTEM_READY or a valid STATUS
+            serial_port.reset_input_buffer()
+            serial_port.reset_output_buffer()
+        except Exception:
+            del self.devices[name]
+            engine.close_port()
+            raise
+        engine.mark_connected(port)
+
+        fd = serial_port.fileno() if hasattr(serial_port, 'fileno') and os.name == 'posix' else None
+        if fd is not None:
+            os.set_blocking(fd, False)
+            loop.add_reader(fd, self.on_readable, engine, fd)
+        else:
+            self.polls[name] = loop.create_task(self.poll(engine))
+        return engine
+
+    def on_readable(self, engine, fd):
+        try:
+            chunk = os.read(fd, READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.drop_device(engine, f"Error reading data: {e}")
+            return
+        if not chunk:
+            self.drop_device(engine, "Port closed")
+            return
+        engine.feed(chunk, time.monotonic())
+
+    async def poll(self, engine):
+        loop = asyncio.get_event_loop()
+        port = engine.serial_port
+        while engine.is_connected:
+            try:
+                chunk = await loop.run_in_executor(None, port.read, READ_SIZE)
+            except Exception as e:
+                self.drop_device(engine, f"Error reading data: {e}")
+                return
+            if chunk:
+                engine.feed(chunk, time.monotonic())
+            else:
+                await asyncio.sleep(POLL_INTERVAL)
+
+    def drop_device(self, engine, reason):
+        if engine.serial_port is not None and engine.name not in self.polls:
+            try:
+                self.loop.remove_reader(engine.serial_port.fileno())
+            except Exception:
+                pass
+        task = self.polls.pop(engine.name, None)
+        if task is not None:
+            task.cancel()
+        if engine.is_connected:
+            engine.log(reason)
+        engine.disconnect()
+
+    async def remove_device(self, name):
+        engine = self.devices.pop(name, None)
+        if engine is not None:
+            self.drop_device(engine, "Removed")
+
+    async def close_all(self):
+        for name in list(self.devices):
+            await self.remove_device(name)
+
+    def send(self, name, command):
+        self.devices[name].send(command)
+
+    def stats(self):
+        return {name: engine.stats() for name, engine in self.devices.items()}
+
+async def run_devices(ports, args):
+    manager = DeviceManager(args.baud)
+    manager.loop = asyncio.get_event_loop()
+
+    # With --filters every device's STATUS records are collected and run
+    # through its own FilterChain once per statistics interval
+    chains = {}
+    pending = {}
+    filtered = {}
+    if args.filters:
+        from radar_filters import FilterChain
+        try:
+            chains = {port: FilterChain(args.filters) for port in ports}
+        except ValueError as e:
+            print(f"--filters: {e}", file=sys.stderr)
+            return 2
+        pending = {port: [] for port in ports}
+
+    def on_event(name, kind, line, payload, received_at):
+        if kind == 'status':
+            if chains:
+                pending[name].append(payload)
+            return
+        if kind in ('log', 'state') or line == "SYSTEM_READY":
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {name} {kind}: {line}", flush=True)
+
+    manager.subscribe(on_event)
+    results = await asyncio.gather(*(manager.add_device(port) for port in ports),
+                                   return_exceptions=True)
+    for port, result in zip(ports, results):
+        if isinstance(result, Exception):
+            print(f"Gagal terhubung ke {port}: {result}", file=sys.stderr)
+    if not manager.devices:
+        return 1
+    if args.binary or args.report_interval:
+        for engine in manager.devices.values():
+            engine.request_telemetry(args.binary, args.report_interval)
+
+    try:
+        while any(engine.is_connected for engine in manager.devices.values()):
+            await asyncio.sleep(args.stats_interval)
+            for name, chain in chains.items():
+                records, pending[name] = pending[name], []
+                if records:
+                    filtered[name] = chain.process_records(records)[-1]
+            if args.json:
+                stats = manager.stats()
+                for name, chain in chains.items():
+                    if name in stats:
+                        stats[name]['filters'] = chain.stats()
+                print(json.dumps(stats), flush=True)
+                continue
+            for name, engine in manager.devices.items():
+                stats = engine.stats()
+                record = engine.latest_status
+                state = "--"
+                if record is not None:
+                    state = (f"pir={int(record.pir)} us={int(record.ultrasonic)} "
+                             f"dist={record.distance}")
+                    if name in filtered:
+                        # NaN: every recent reading was gated out
+                        value = filtered[name]
+                        state += " filt=-" if math.isnan(value) else f" filt={value:.0f}"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {name} lines={stats['lines']} "
+                      f"bad={stats['malformed']} rate={stats['lines_per_second']:.1f}/s {state}",
+                      flush=True)
+    finally:
+        await manager.close_all()
+    return 0
+
+def run_multi_headless(args):
+    ports = [port.strip() for port in args.ports.split(",") if port.strip()]
+    try:
+        return asyncio.run(run_devices(ports, args))
+    except KeyboardInterrupt:
+        return 0
\ No newline at end of file
@@ -0,0 +1,226 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Always-on performance instrumentation, for telling whether a stutter comes
+# from the reader thread, decoding, the GUI's log or drawing, or the Tk
+# event loop itself.
+#
+# PerfMonitor holds named timers (count, total, max and the most recent
+# samples for percentiles) for work done, the same for lags (time spent
+# waiting to run), and plain counters. Recording is a couple of
+# attribute updates and a deque append, cheap enough to stay on for every
+# chunk and every frame; it is not locked, so a timer fed from several
+# threads can lose the odd increment, which the statistics can live with.
+#
+# TkProbe measures the Tk event loop from inside: how late a periodic
+# after() callback runs, how long an after_idle() callback waits, and how
+# many after/after_idle callbacks are pending.
+#
+# StackSampler is an on-demand profiler for every thread at once: it walks
+# sys._current_frames() every few milliseconds and writes the collapsed
+# stacks ("folded" format, one "thread;outer;...;inner count" line per
+# stack) that flamegraph.pl and speedscope read.
+
+PERF_RECENT = 1000
+TK_PROBE_INTERVAL = 0.25
+SAMPLE_INTERVAL = 0.005
+
+class PerfTimer:
+    __slots__ = ('count', 'total', 'maximum', 'recent')
+
+    def __init__(self, recent=PERF_RECENT):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        def pick(fraction):
+            if not recent:
+                return None
+            return recent[min(len(recent) - 1, int(len(recent) * fraction))] * 1000
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else None,
+            'p50_ms': pick(0.50),
+            'p99_ms': pick(0.99),
+            'max_ms': self.maximum * 1000,
+        }
+
+class PerfMonitor:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.timers = {}
+        self.lags = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def timer(self, name):
+        # For hot paths: keep the PerfTimer and call its add() directly
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers.setdefault(name, PerfTimer())
+        return timer
+
+    def add(self, name, seconds):
+        self.timer(name).add(seconds)
+
+    def lag(self, name, seconds):
+        timer = self.lags.get(name)
+        if timer is None:
+            timer = self.lags.setdefault(name, PerfTimer())
+        timer.add(seconds)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        # Latest value and peak, e.g. a queue depth
+        _, peak = self.gauges.get(name, (0, value))
+        self.gauges[name] = (value, max(peak, value))
+
+    def snapshot(self):
+        uptime = time.monotonic() - self.started
+        return {
+            'uptime_s': uptime,
+            'timers': {name: timer.summary() for name, timer in list(self.timers.items())},
+            'busy': {name: timer.total / uptime if uptime > 0 else 0.0
+                     for name, timer in list(self.timers.items())},
+            'lags': {name: timer.summary() for name, timer in list(self.lags.items())},
+            'counters': dict(self.counters),
+            'gauges': {name: {'value': value, 'peak': peak}
+                       for name, (value, peak) in list(self.gauges.items())},
+        }
+
+    def text(self):
+        # Fixed-width table for the performance panel
+        snapshot = self.snapshot()
+        lines = [f"{'timer':<14}{'count':>9}{'mean':>8}{'p99':>8}{'max':>8}{'busy':>7}",
+                 f"{'':<14}{'':>9}{'ms':>8}{'ms':>8}{'ms':>8}{'%':>7}"]
+        for name in sorted(snapshot['timers']):
+            timer = snapshot['timers'][name]
+            lines.append(f"{name:<14}{timer['count']:>9}{timer['mean_ms'] or 0:>8.3f}"
+                         f"{timer['p99_ms'] or 0:>8.2f}{timer['max_ms']:>8.1f}"
+                         f"{snapshot['busy'][name] * 100:>7.1f}")
+        for name in sorted(snapshot['lags']):
+            lag = snapshot['lags'][name]
+            lines.append(f"{name:<14}{lag['count']:>9}{lag['mean_ms'] or 0:>8.3f}"
+                         f"{lag['p99_ms'] or 0:>8.2f}{lag['max_ms']:>8.1f}")
+        for name in sorted(snapshot['gauges']):
+            gauge = snapshot['gauges'][name]
+            lines.append(f"{name:<14}{gauge['value']:>9} (peak {gauge['peak']})")
+        for name in sorted(snapshot['counters']):
+            lines.append(f"{name:<14}{snapshot['counters'][name]:>9}")
+        return "\n".join(lines)
+
+def write_json(path, data):
+    # Replace path in one step, so a reader never sees half a file
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temporary, path)
+
+class TkProbe:
+    def __init__(self, root, monitor, interval=TK_PROBE_INTERVAL):
+        self.root = root
+        self.monitor = monitor
+        self.interval = interval
+        self.after_id = None
+        self.due = None
+        self.idle_since = None
+
+    def start(self):
+        self.due = time.perf_counter() + self.interval
+        self.after_id = self.root.after(int(self.interval * 1000), self.tick)
+        return self
+
+    def stop(self):
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+
+    def tick(self):
+        now = time.perf_counter()
+        self.monitor.lag('tk_timer', max(0.0, now - self.due))
+        pending = self.root.tk.splitlist(self.root.tk.call('after', 'info'))
+        self.monitor.gauge('tk_pending', len(pending))
+        if self.idle_since is None:
+            self.idle_since = now
+            self.root.after_idle(self.on_idle)
+        self.due = now + self.interval
+        self.after_id = self.root.after(int(self.interval * 1000), self.tick)
+
+    def on_idle(self):
+        self.monitor.lag('tk_idle', time.perf_counter() - self.idle_since)
+        self.idle_since = None
+
+class StackSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.stacks = {}
+        self.samples = 0
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="StackSampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                calls = []
+                while frame is not None:
+                    code = frame.f_code
+                    calls.append(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                                 f":{code.co_firstlineno})")
+                    frame = frame.f_back
+                calls.append(names.get(ident, str(ident)))
+                stack = ";".join(reversed(calls))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        # Stops the sampler first; returns the number of samples written
+        self.stop()
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        return self.samples
\ No newline at end of file
@@ -0,0 +1,264 @@
+import struct
+import warnings
+
+# Decoding of the serial protocol spoken by "radar beta.ino".
+#
+# sendStatus() emits
+#   STATUS:pir,ultrasonic,distance,millis,pir_trigger_count,confidence,baseline
+# while older firmware only sent the first four fields; the missing ones
+# decode as 0.
+#
+# After MODE:BIN the same record is sent as a binary frame instead: the
+# COBS encoding of
+#   type 0x01, flags (bit 0 PIR, bit 1 ultrasonic), distance u16, millis u32,
+#   pir_trigger_count u16, confidence u8, baseline u16, seq u8, CRC16 u16
+# (little-endian, CRC16-CCITT over everything before it) between two 0x00
+# bytes. Text lines never contain 0x00, so replies and messages stay text
+# and both can share the port.
+#
+# NumPy is only needed by decode_batch(), so it is imported there and the
+# per-line path (and startup) does not pay for it.
+
+STATUS_PREFIX = "STATUS:"
+STATUS_FIELDS = ('pir', 'ultrasonic', 'distance', 'device_millis',
+                 'pir_trigger_count', 'confidence', 'baseline')
+MIN_STATUS_FIELDS = 4
+# Valid range of each field: millis is the firmware's unsigned long, every
+# other field has to fit the int32 columns of a StatusBatch. Lines with a
+# field outside it are malformed, for decode() and decode_batch() alike.
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+FIELD_RANGES = tuple((0, 2 ** 32 - 1) if name == 'device_millis' else (INT32_MIN, INT32_MAX)
+                     for name in STATUS_FIELDS)
+
+FRAME_DELIMITER = b"\0"
+FRAME_STATUS = 0x01
+STATUS_FRAME = struct.Struct('<BBHIHBHB')
+# Longest encoded frame; anything longer between two delimiters is noise
+MAX_FRAME_LENGTH = 64
+
+def crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return table
+
+CRC16_TABLE = crc16_table()
+
+def crc16_ccitt(data, crc=0xFFFF):
+    table = CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+def cobs_encode(data):
+    out = bytearray([0])
+    code_index = 0
+    code = 1
+    for byte in data:
+        if byte:
+            out.append(byte)
+            code += 1
+        if not byte or code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out)
+
+def cobs_decode(data):
+    # None when data is not valid COBS
+    out = bytearray()
+    index = 0
+    length = len(data)
+    while index < length:
+        code = data[index]
+        if code == 0 or index + code > length:
+            return None
+        out += data[index + 1:index + code]
+        index += code
+        if code < 0xFF and index < length:
+            out.append(0)
+    return bytes(out)
+
+def encode_status_frame(record, seq):
+    # Host side of sendStatusFrame(), for the emulator and tests
+    payload = STATUS_FRAME.pack(FRAME_STATUS, record.pir | record.ultrasonic << 1,
+                                record.distance, record.device_millis & 0xFFFFFFFF,
+                                record.pir_trigger_count, record.confidence,
+                                record.baseline, seq & 0xFF)
+    payload += struct.pack('<H', crc16_ccitt(payload))
+    return FRAME_DELIMITER + cobs_encode(payload) + FRAME_DELIMITER
+
+# Host-side stage timestamps carried along with a record for latency
+# accounting (time.monotonic() seconds, None until set)
+TIMING_FIELDS = ('device_at', 'received_at', 'decoded_at')
+
+class StatusRecord:
+    # One decoded STATUS line
+    __slots__ = STATUS_FIELDS + TIMING_FIELDS
+
+    def __init__(self, pir, ultrasonic, distance, device_millis,
+                 pir_trigger_count=0, confidence=0, baseline=0):
+        self.pir = pir
+        self.ultrasonic = ultrasonic
+        self.distance = distance
+        self.device_millis = device_millis
+        self.pir_trigger_count = pir_trigger_count
+        self.confidence = confidence
+        self.baseline = baseline
+        self.device_at = None
+        self.received_at = None
+        self.decoded_at = None
+
+    def as_tuple(self):
+        return (self.pir, self.ultrasonic, self.distance, self.device_millis,
+                self.pir_trigger_count, self.confidence, self.baseline)
+
+    def as_line(self):
+        # The text protocol's STATUS line for this record
+        return "STATUS:%d,%d,%d,%d,%d,%d,%d" % self.as_tuple()
+
+    def __eq__(self, other):
+        return isinstance(other, StatusRecord) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return ("StatusRecord(pir=%r, ultrasonic=%r, distance=%r, device_millis=%r, "
+                "pir_trigger_count=%r, confidence=%r, baseline=%r)" % self.as_tuple())
+
+class StatusBatch:
+    # Columnar view of many STATUS lines, one NumPy array per field
+    __slots__ = STATUS_FIELDS + ('count',)
+
+    def __init__(self, columns):
+        import numpy as np
+        self.count = len(columns[0])
+        self.pir = columns[0] == 1
+        self.ultrasonic = columns[1] == 1
+        self.distance = columns[2].astype(np.int32)
+        self.device_millis = columns[3].astype(np.int64)
+        self.pir_trigger_count = columns[4].astype(np.int32)
+        self.confidence = columns[5].astype(np.int32)
+        self.baseline = columns[6].astype(np.int32)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        return StatusRecord(bool(self.pir[index]), bool(self.ultrasonic[index]),
+                            int(self.distance[index]), int(self.device_millis[index]),
+                            int(self.pir_trigger_count[index]), int(self.confidence[index]),
+                            int(self.baseline[index]))
+
+class StatusDecoder:
+    # Parses STATUS lines and keeps count of what it saw. Malformed lines
+    # are counted instead of raising so a noisy link cannot stop ingestion.
+    def __init__(self):
+        self.decoded = 0
+        self.malformed = 0
+        self.frames = 0
+        self.crc_errors = 0
+        self.frames_lost = 0
+        self.last_seq = None
+
+    def split_fields(self, line):
+        # Returns the seven integer fields of a STATUS line, or None
+        if not line.startswith(STATUS_PREFIX):
+            return None
+        fields = line[7:].split(',')
+        count = len(fields)
+        if count < MIN_STATUS_FIELDS or count > len(STATUS_FIELDS):
+            return None
+        try:
+            values = [int(field) for field in fields]
+        except ValueError:
+            return None
+        if count < len(STATUS_FIELDS):
+            values.extend([0] * (len(STATUS_FIELDS) - count))
+        if min(values) < INT32_MIN or max(values) > INT32_MAX or values[3] < 0:
+            # Rare enough to check field by field
+            for value, (low, high) in zip(values, FIELD_RANGES):
+                if not low <= value <= high:
+                    return None
+        return values
+
+    def decode(self, line):
+        values = self.split_fields(line)
+        if values is None:
+            self.malformed += 1
+            return None
+        self.decoded += 1
+        return StatusRecord(values[0] == 1, values[1] == 1, values[2], values[3],
+                            values[4], values[5], values[6])
+
+    def decode_frame(self, encoded):
+        # One COBS frame without its delimiters, None when it is damaged
+        payload = cobs_decode(encoded) if len(encoded) <= MAX_FRAME_LENGTH else None
+        if (payload is None or len(payload) != STATUS_FRAME.size + 2
+                or payload[0] != FRAME_STATUS):
+            self.malformed += 1
+            return None
+        if crc16_ccitt(payload[:-2]) != payload[-2] | payload[-1] << 8:
+            self.crc_errors += 1
+            self.malformed += 1
+            return None
+        _, flags, distance, millis, triggers, confidence, baseline, seq = \
+            STATUS_FRAME.unpack_from(payload)
+        if self.last_seq is not None:
+            self.frames_lost += (seq - self.last_seq - 1) & 0xFF
+        self.last_seq = seq
+        self.frames += 1
+        self.decoded += 1
+        return StatusRecord(bool(flags & 1), bool(flags & 2), distance, millis,
+                            triggers, confidence, baseline)
+
+    def decode_batch(self, lines):
+        # Decode many lines into a StatusBatch. Lines with all seven fields
+        # are joined and parsed by NumPy in one call; the rest (short, bad,
+        # damaged or out of range lines) go through split_fields() one by one.
+        # Every row is in FIELD_RANGES before StatusBatch narrows it.
+        import numpy as np
+        width = len(STATUS_FIELDS)
+        status = [line for line in lines if line.startswith(STATUS_PREFIX)]
+        self.malformed += len(lines) - len(status)
+        rows = np.zeros((len(status), width), dtype=np.int64)
+        valid = np.zeros(len(status), dtype=bool)
+        full = [index for index, line in enumerate(status) if line.count(',') == width - 1]
+        if full:
+            skip = len(STATUS_PREFIX)
+            text = ",".join([status[index][skip:] for index in full])
+            try:
+                # A field NumPy cannot parse is an error in NumPy 2.x and a
+                # warning plus a short array before
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', DeprecationWarning)
+                    values = np.fromstring(text, dtype=np.int64, sep=',')
+            except (ValueError, DeprecationWarning):
+                values = ()
+            if len(values) == len(full) * width:
+                # Fields past int64 come back saturated, which is out of
+                # range too; those lines are left to split_fields()
+                table = values.reshape(-1, width)
+                low, high = np.array(FIELD_RANGES).T
+                ok = ((table >= low) & (table <= high)).all(axis=1)
+                full = np.array(full)[ok]
+                rows[full] = table[ok]
+                valid[full] = True
+        for index in np.flatnonzero(~valid):
+            values = self.split_fields(status[index])
+            if values is None:
+                self.malformed += 1
+            else:
+                rows[index] = values
+                valid[index] = True
+        rows = rows[valid]
+        self.decoded += len(rows)
+        return StatusBatch(rows.T)
+
+    def stats(self):
+        return {'decoded': self.decoded, 'malformed': self.malformed, 'frames': self.frames,
+                'crc_errors': self.crc_errors, 'frames_lost': self.frames_lost}
\ No newline at end of file
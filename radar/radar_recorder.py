@@ -0,0 +1,194 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+from radar_protocol import StatusRecord
+
+# Session recording and replay.
+#
+# A recording is a 32 byte header followed by fixed-width 80 byte slots. Most
+# slots hold one line received from the ESP32 (decoded STATUS fields plus the
+# raw line, truncated to LINE_SIZE bytes). Every INDEX_INTERVAL-th slot is an
+# index slot carrying the host time and sequence number of the record that
+# follows it, so a replay can binary-search the index slots by time instead
+# of scanning the file.
+
+MAGIC = b'RDRREC01'
+VERSION = 1
+HEADER = struct.Struct('<8sHHId8x')
+LINE_SIZE = 48
+RECORD = struct.Struct('<BBHdqiIhh%ds' % LINE_SIZE)
+INDEX_INTERVAL = 256
+
+# Longest a replay sleeps before checking whether it should stop
+PLAY_POLL_INTERVAL = 0.05
+
+KIND_INDEX = 0
+KIND_STATUS = 1
+KIND_INVALID = 2
+KIND_MESSAGE = 3
+EVENT_KINDS = {'status': KIND_STATUS, 'invalid': KIND_INVALID, 'message': KIND_MESSAGE}
+
+FLAG_PIR = 1
+FLAG_ULTRASONIC = 2
+FLAG_TRUNCATED = 4
+
+class RecorderError(Exception):
+    pass
+
+class SessionRecorder:
+    # Engine subscriber that appends every received line to a recording
+    def __init__(self, path, index_interval=INDEX_INTERVAL, flush_interval=1.0):
+        self.path = path
+        self.index_interval = index_interval
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        # Host times are stored as wall-clock seconds so incidents can be
+        # located later; events carry time.monotonic() stamps
+        self.wall_offset = time.time() - time.monotonic()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, index_interval, time.time()))
+        self.slots = 0
+        self.records = 0
+        self.last_flush = time.monotonic()
+
+    def on_event(self, kind, line, payload, received_at):
+        code = EVENT_KINDS.get(kind)
+        if code is None:
+            return
+        self.write(code, line, payload, received_at + self.wall_offset)
+
+    def write(self, kind, line, record, host_time):
+        raw = line.encode('utf-8', 'replace')
+        flags = 0
+        if len(raw) > LINE_SIZE:
+            raw = raw[:LINE_SIZE]
+            flags |= FLAG_TRUNCATED
+        if record is not None:
+            if record.pir:
+                flags |= FLAG_PIR
+            if record.ultrasonic:
+                flags |= FLAG_ULTRASONIC
+            fields = (record.device_millis, record.distance, record.pir_trigger_count,
+                      record.confidence, record.baseline)
+        else:
+            fields = (0, 0, 0, 0, 0)
+
+        with self.lock:
+            if self.file is None:
+                return
+            if self.slots % self.index_interval == 0:
+                self.file.write(RECORD.pack(KIND_INDEX, 0, 0, host_time, self.records,
+                                            0, 0, 0, 0, b''))
+                self.slots += 1
+            self.file.write(RECORD.pack(kind, flags, len(raw), host_time, *fields, raw))
+            self.slots += 1
+            self.records += 1
+
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_interval:
+                self.file.flush()
+                self.last_flush = now
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+class SessionReplay:
+    # Memory-mapped reader for a recording
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < HEADER.size:
+            self.file.close()
+            raise RecorderError(f"{path}: not a radar recording")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, index_interval, created = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise RecorderError(f"{path}: not a radar recording")
+        self.version = version
+        self.index_interval = index_interval
+        self.created = created
+        # A partially written trailing slot is ignored
+        self.slots = (size - HEADER.size) // RECORD.size
+        self.played = 0
+        # Recorded host time of the line being played
+        self.current_time = None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def slot(self, index):
+        return RECORD.unpack_from(self.map, HEADER.size + index * RECORD.size)
+
+    def slot_time(self, index):
+        return struct.unpack_from('<d', self.map, HEADER.size + index * RECORD.size + 4)[0]
+
+    def read(self, index):
+        # Returns (kind, host_time, line, record) for a data slot
+        kind, flags, length, host_time, millis, distance, triggers, confidence, baseline, raw = self.slot(index)
+        line = raw[:length].decode('utf-8', 'replace')
+        record = None
+        if kind == KIND_STATUS:
+            record = StatusRecord(bool(flags & FLAG_PIR), bool(flags & FLAG_ULTRASONIC),
+                                  distance, millis, triggers, confidence, baseline)
+        return kind, host_time, line, record
+
+    def __iter__(self):
+        for index in range(self.slots):
+            if index % self.index_interval:
+                yield self.read(index)
+
+    def start_time(self):
+        return self.slot_time(0) if self.slots else None
+
+    def end_time(self):
+        return self.slot_time(self.slots - 1) if self.slots else None
+
+    def seek(self, timestamp):
+        # First slot whose host time is >= timestamp, via the index slots
+        low, high = 0, (self.slots - 1) // self.index_interval if self.slots else -1
+        start = 0
+        while low <= high:
+            middle = (low + high) // 2
+            if self.slot_time(middle * self.index_interval) <= timestamp:
+                start = middle * self.index_interval
+                low = middle + 1
+            else:
+                high = middle - 1
+        for index in range(start, self.slots):
+            if index % self.index_interval and self.slot_time(index) >= timestamp:
+                return index
+        return self.slots
+
+    def play(self, sink, speed=1.0, start=0, should_stop=None):
+        # Feeds each recorded line to sink(line, received_at). speed is a
+        # multiple of real time; 0 or None replays as fast as possible.
+        first_time = None
+        started = time.monotonic()
+        for index in range(start, self.slots):
+            if should_stop is not None and should_stop():
+                break
+            if index % self.index_interval == 0:
+                continue
+            kind, flags, length, host_time, *_, raw = self.slot(index)
+            if speed:
+                if first_time is None:
+                    first_time = host_time
+                due = started + (host_time - first_time) / speed
+                while time.monotonic() < due:
+                    if should_stop is not None and should_stop():
+                        return
+                    time.sleep(max(0.0, min(PLAY_POLL_INTERVAL, due - time.monotonic())))
+            self.current_time = host_time
+            sink(raw[:length].decode('utf-8', 'replace'), time.monotonic())
+            self.played += 1
\ No newline at end of file
@@ -0,0 +1,313 @@
+import math
+import tkinter as tk
+
+import numpy as np
+
+from radar_history import bucket_minmax
+
+# NumPy-backed views for the GUI: the distance trend chart and the raster
+# phosphor layer. Kept apart from radar_gui so that NumPy is only imported
+# once the window is already on screen.
+
+# Trend chart distance scale and redraw rate
+TREND_MAX_DISTANCE = 200
+TREND_REDRAW_INTERVAL = 0.25
+
+# Raster phosphor mode: afterglow time constant and raster downscale factor
+PHOSPHOR_PERSISTENCE = 1.5
+PHOSPHOR_SCALE = 1
+
+def window_label(seconds):
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+def hex_rgb(color):
+    return np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)], dtype=np.float32)
+
+class PhosphorLayer:
+    # Optional raster layer under the vector grid: NumPy RGB intensity
+    # buffers covering the radar disc are decayed with one multiply per
+    # frame, the swept wedge and newly arrived blips are stamped in, and the
+    # result is pushed to the canvas as a single PhotoImage update. Blips
+    # are stamped once and fade with their own slower decay, so the cost per
+    # frame depends on the raster size, not on how much is on screen.
+    def __init__(self, canvas, colors, blip_sizes, persistence=PHOSPHOR_PERSISTENCE,
+                 scale=PHOSPHOR_SCALE):
+        self.canvas = canvas
+        self.blip_sizes = blip_sizes
+        self.persistence = persistence
+        self.scale = scale
+        # Intensities are kept in 0-255 units so the output is one add
+        self.background = hex_rgb(colors['bg'])
+        self.sweep_color = hex_rgb(colors['primary'])
+        kinds = (colors['text'], colors['primary'], colors['secondary'], colors['warning'])
+        self.blip_colors = np.array([hex_rgb(color) for color in kinds])
+
+        # With scale > 1 the raster is rendered small and zoomed by Tk
+        self.photo = tk.PhotoImage(master=canvas, width=1, height=1)
+        self.source = tk.PhotoImage(master=canvas, width=1, height=1) if scale > 1 else self.photo
+        self.image_item = canvas.create_image(0, 0, anchor='nw', image=self.photo,
+                                              state='hidden', tags=("phosphor",))
+        self.last_sweep = None
+        self.last_time = None
+        self.last_stamped = None
+        self.visible = False
+
+    def resize(self, cx, cy, max_radius):
+        side = (2 * max_radius) // self.scale + 1
+        offset = (np.arange(side, dtype=np.float32) + 0.5) * self.scale - max_radius
+        dx = offset[np.newaxis, :]
+        dy = offset[:, np.newaxis]
+        self.max_radius = max_radius
+        self.side = side
+        # Angle of every pixel in degrees, NaN outside the disc so the
+        # sweep test never matches there
+        angle = np.degrees(np.arctan2(dy, dx)).astype(np.float32) % 360
+        angle[np.hypot(dx, dy) > max_radius] = np.nan
+        self.pixel_angle = angle
+        self.wedge = np.empty((side, side), dtype=np.bool_)
+        self.wedge_part = np.empty((side, side), dtype=np.bool_)
+        self.buffer = np.zeros((side, side, 3), dtype=np.float32)
+        self.blip_buffer = np.zeros((side, side, 3), dtype=np.float32)
+        self.scratch = np.empty((side, side, 3), dtype=np.float32)
+        self.base = np.empty((side, side, 3), dtype=np.float32)
+        self.base[:] = self.background
+        self.pixels = np.empty((side, side, 3), dtype=np.uint8)
+
+        # Pixel offsets of the disc stamped for each blip kind
+        self.discs = []
+        for size in self.blip_sizes:
+            size = max(size // self.scale, 1)
+            ys, xs = np.mgrid[-size:size + 1, -size:size + 1]
+            inside = xs * xs + ys * ys <= size * size
+            self.discs.append((ys[inside], xs[inside]))
+        self.header = b"P6 %d %d 255\n" % (side, side)
+        self.canvas.coords(self.image_item, cx - max_radius, cy - max_radius)
+        self.last_sweep = None
+        self.last_stamped = None
+
+    def show(self, visible):
+        self.visible = visible
+        self.canvas.itemconfig(self.image_item, state='normal' if visible else 'hidden')
+        if not visible:
+            self.buffer[:] = 0
+            self.blip_buffer[:] = 0
+            self.last_sweep = None
+            self.last_stamped = None
+
+    def draw(self, sweep_angle, blips, now):
+        buffer = self.buffer
+        if self.last_time is not None:
+            dt = now - self.last_time
+            buffer *= math.exp(-dt / self.persistence)
+            # Blips are down to 5% at the end of their lifetime
+            self.blip_buffer *= math.exp(-3.0 * dt / blips.lifetime)
+        self.last_time = now
+
+        # Light every pixel the sweep passed over since the last frame
+        if self.last_sweep is not None:
+            start = sweep_angle - max((sweep_angle - self.last_sweep) % 360, 1.0)
+            wedge = self.wedge
+            if start >= 0:
+                np.greater_equal(self.pixel_angle, start, out=wedge)
+                np.less_equal(self.pixel_angle, sweep_angle, out=self.wedge_part)
+                wedge &= self.wedge_part
+            else:
+                np.greater_equal(self.pixel_angle, start + 360, out=wedge)
+                np.less_equal(self.pixel_angle, sweep_angle, out=self.wedge_part)
+                wedge |= self.wedge_part
+            buffer[wedge] = np.maximum(buffer[wedge], self.sweep_color)
+        self.last_sweep = sweep_angle
+
+        self.stamp_blips(blips, now)
+
+        # Background plus glow, as 8-bit PPM for one image update
+        np.add(buffer, self.blip_buffer, out=self.scratch)
+        self.scratch += self.base
+        np.minimum(self.scratch, np.float32(255), out=self.scratch)
+        np.copyto(self.pixels, self.scratch, casting='unsafe')
+        self.source.configure(data=self.header + self.pixels.tobytes(), format='PPM')
+        if self.source is not self.photo:
+            self.canvas.tk.call(self.photo, 'copy', self.source, '-zoom', self.scale, self.scale)
+
+    def stamp_blips(self, blips, now):
+        # Blips added since the last frame (all live ones after a reset) as
+        # small discs, dimmed by their age; one vectorized stamp per kind.
+        # The store is in arrival order, so new blips are at the end.
+        fresh = []
+        for blip in reversed(blips.blips):
+            if self.last_stamped is not None and blip.timestamp <= self.last_stamped:
+                break
+            fresh.append((blip.dx, blip.dy, blip.kind, blip.timestamp))
+        if not fresh:
+            return
+        self.last_stamped = fresh[0][3]
+
+        table = np.array(fresh)
+        radius = self.max_radius / self.scale
+        x = (radius + table[:, 0] * radius).astype(np.intp)
+        y = (radius + table[:, 1] * radius).astype(np.intp)
+        kinds = table[:, 2].astype(np.intp)
+        intensity = np.exp(-3.0 * np.maximum(now - table[:, 3], 0.0) / blips.lifetime)
+        buffer = self.blip_buffer.reshape(-1, 3)
+        for kind, (disc_y, disc_x) in enumerate(self.discs):
+            selected = kinds == kind
+            if not selected.any():
+                continue
+            ys = (y[selected, np.newaxis] + disc_y).ravel()
+            xs = (x[selected, np.newaxis] + disc_x).ravel()
+            values = np.repeat(intensity[selected], len(disc_y))[:, np.newaxis] * self.blip_colors[kind]
+            valid = (ys >= 0) & (ys < self.side) & (xs >= 0) & (xs < self.side)
+            index = ys[valid] * self.side + xs[valid]
+            buffer[index] = np.maximum(buffer[index], values[valid])
+
+class TrendChart:
+    # Distance over time with one min/max pair per pixel column, so a
+    # redraw costs O(chart width) however many samples the window holds.
+    # New samples are folded into the column arrays as they arrive and the
+    # columns shift left as time passes; the whole window is only
+    # re-decimated on resize, on a window change or when samples were
+    # missed. Canvas items are retained like in RadarRenderer.
+    def __init__(self, canvas, colors, history, window=60):
+        self.canvas = canvas
+        self.colors = colors
+        self.history = history
+        self.window = window
+        self.width = int(canvas['width'])
+        self.height = int(canvas['height'])
+
+        self.envelope_item = None
+        self.run_pools = {1: [], 2: []}
+        self.visible_runs = {1: 0, 2: 0}
+        self.last_draw = 0.0
+
+        self.update_geometry()
+        self.build_scene()
+        canvas.bind('<Configure>', self.on_resize)
+
+    def update_geometry(self):
+        self.left = 30
+        self.right = max(self.width - 5, self.left + 1)
+        self.top = 5
+        self.bottom = max(self.height - 18, self.top + 1)
+        self.columns = self.right - self.left
+        self.bucket = self.window / self.columns
+        # Re-decimate on the next update
+        self.start = None
+
+    def build_scene(self):
+        canvas = self.canvas
+        canvas.delete("trend_axis")
+        scale = (self.bottom - self.top) / TREND_MAX_DISTANCE
+        for distance in range(0, TREND_MAX_DISTANCE + 1, 50):
+            y = self.bottom - distance * scale
+            canvas.create_line(self.left, y, self.right, y, fill=self.colors['grid'],
+                               tags=("trend_axis",))
+            canvas.create_text(self.left - 4, y, text=str(distance), anchor='e',
+                               font=('Courier', 7), fill=self.colors['text'],
+                               tags=("trend_axis",))
+        canvas.create_text(self.right, self.top,
+                           text=f"jarak (cm), {window_label(self.window)}", anchor='ne',
+                           font=('Courier', 7), fill=self.colors['text'], tags=("trend_axis",))
+        canvas.tag_lower("trend_axis")
+
+        if self.envelope_item is None:
+            self.envelope_item = canvas.create_line(0, 0, 0, 0, fill=self.colors['primary'],
+                                                    state='hidden')
+
+    def on_resize(self, event):
+        if event.width == self.width and event.height == self.height:
+            return
+        self.width = event.width
+        self.height = event.height
+        self.update_geometry()
+        self.build_scene()
+
+    def set_window(self, seconds):
+        self.window = seconds
+        self.update_geometry()
+        self.build_scene()
+
+    def column_start(self, now):
+        # Start time of column 0, so that the last column holds `now`
+        return (math.floor(now / self.bucket) + 1 - self.columns) * self.bucket
+
+    def rebuild(self, now):
+        self.start = self.column_start(now)
+        window = self.history.window(now - self.start, now)
+        self.mins, self.maxs, self.flags = bucket_minmax(window, self.start, self.bucket,
+                                                         self.columns)
+        self.consumed = self.history.total
+        self.dirty = True
+
+    def update(self, now):
+        new = self.history.total - self.consumed if self.start is not None else -1
+        if new < 0 or new > len(self.history):
+            self.rebuild(now)
+            return
+
+        # Scroll whole columns as time passes
+        start = self.column_start(now)
+        shift = int(round((start - self.start) / self.bucket))
+        if shift > 0:
+            for column, empty in ((self.mins, np.nan), (self.maxs, np.nan), (self.flags, 0)):
+                if shift < self.columns:
+                    column[:-shift] = column[shift:]
+                    column[-shift:] = empty
+                else:
+                    column[:] = empty
+            self.start = start
+            self.dirty = True
+
+        if new:
+            mins, maxs, flags = bucket_minmax(self.history.latest(new), self.start,
+                                              self.bucket, self.columns)
+            np.fmin(self.mins, mins, out=self.mins)
+            np.fmax(self.maxs, maxs, out=self.maxs)
+            self.flags |= flags
+            self.consumed = self.history.total
+            self.dirty = True
+
+    def draw(self, now):
+        self.update(now)
+        if not self.dirty or now - self.last_draw < TREND_REDRAW_INTERVAL:
+            return
+        self.dirty = False
+        self.last_draw = now
+        canvas = self.canvas
+
+        # Envelope: a vertical min-max stroke per occupied column, as one line
+        occupied = np.flatnonzero(~np.isnan(self.maxs))
+        if len(occupied):
+            scale = (self.bottom - self.top) / TREND_MAX_DISTANCE
+            coords = np.empty(len(occupied) * 4)
+            coords[0::4] = self.left + occupied
+            coords[1::4] = self.bottom - self.maxs[occupied] * scale
+            coords[2::4] = coords[0::4]
+            coords[3::4] = self.bottom - self.mins[occupied] * scale
+            canvas.coords(self.envelope_item, *coords.tolist())
+            canvas.itemconfig(self.envelope_item, state='normal')
+        else:
+            canvas.itemconfig(self.envelope_item, state='hidden')
+
+        # Detection strips under the plot, one rectangle per run of columns
+        for bit, row, color in ((1, 0, self.colors['primary']), (2, 1, self.colors['secondary'])):
+            active = np.concatenate(([0], (self.flags & bit) != 0, [0])).astype(np.int8)
+            edges = np.diff(active)
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1)
+            pool = self.run_pools[bit]
+            y = self.bottom + 4 + row * 6
+            for index in range(len(starts)):
+                if index == len(pool):
+                    pool.append(canvas.create_rectangle(0, 0, 0, 0, fill=color, width=0))
+                canvas.coords(pool[index], self.left + starts[index], y,
+                              self.left + ends[index], y + 4)
+                if index >= self.visible_runs[bit]:
+                    canvas.itemconfig(pool[index], state='normal')
+            for index in range(len(starts), self.visible_runs[bit]):
+                canvas.itemconfig(pool[index], state='hidden')
+            self.visible_runs[bit] = len(starts)
\ No newline at end of file
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The radar modules import each other as top-level modules, the way they
+# run from the radar directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
\ No newline at end of file
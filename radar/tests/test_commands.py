@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from radar_commands import CommandChannel, CommandError, CommandTimeout
+
+class FakeEngine:
+    # Stands in for RadarEngine: send() hands each command to answer(), whose
+    # reply lines are fed back to the channel as the reader thread would
+    def __init__(self, answer=None):
+        self.answer = answer
+        self.subscribers = []
+        self.sent = []
+        self.listening = True
+        self.offline = False
+        self.logs = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def send(self, command):
+        with self.lock:
+            self.sent.append(command)
+        replies = self.answer(command) if self.answer is not None else None
+        for line in replies or ():
+            self.feed(line)
+
+    def feed(self, line, kind='message', payload=None):
+        for callback in self.subscribers:
+            callback(kind, line, payload, time.monotonic())
+
+    def log(self, message):
+        self.logs.append(message)
+
+def firmware(command):
+    # Replies as handleSerialCommand() does
+    name, _, value = command.partition(':')
+    if name == 'PING':
+        return ["PONG"]
+    if name == 'RESET':
+        return ["RESET_OK"]
+    if name == 'SET_THRESHOLD':
+        return [f"THRESHOLD_SET:{value}" if 10 <= int(value) <= 200 else "INVALID_THRESHOLD"]
+    if name == 'MODE':
+        return [f"MODE_OK:{value}"]
+    return [f"UNKNOWN_COMMAND:{command}"]
+
+def test_replies_are_matched_to_requests():
+    channel = CommandChannel(FakeEngine(firmware), timeout=1.0)
+    ping = channel.ping()
+    threshold = channel.set_threshold(50)
+    mode = channel.set_mode(True)
+    assert ping.result(2).line == "PONG"
+    assert threshold.result(2).line == "THRESHOLD_SET:50"
+    reply = mode.result(2)
+    assert (reply.command, reply.line, reply.attempts) == ("MODE:BIN", "MODE_OK:BIN", 1)
+    assert channel.stats()['replied'] == 3
+
+def test_error_replies():
+    channel = CommandChannel(FakeEngine(firmware), timeout=1.0)
+    with pytest.raises(CommandError, match="INVALID_THRESHOLD"):
+        channel.set_threshold(5).result(2)
+    with pytest.raises(CommandError, match="UNKNOWN_COMMAND:BOGUS"):
+        channel.request("BOGUS").result(2)
+    assert channel.stats()['errors'] == 2
+
+def test_replies_follow_the_firmware_order():
+    # Replies carry no id: with two PINGs in flight the first PONG goes to
+    # the oldest one
+    engine = FakeEngine()
+    channel = CommandChannel(engine, timeout=1.0)
+    first, second = channel.ping(), channel.ping()
+    while len(engine.sent) < 2:
+        time.sleep(0.001)
+    engine.feed("PONG")
+    assert first.result(1).line == "PONG"
+    assert not second.done()
+    engine.feed("PONG")
+    assert second.result(1).line == "PONG"
+
+def test_status_request_takes_the_next_status_line():
+    engine = FakeEngine()
+    channel = CommandChannel(engine, timeout=1.0)
+    future = channel.status()
+    while not engine.sent:
+        time.sleep(0.001)
+    engine.feed("PONG")
+    engine.feed("STATUS:1,0,42,1000,1,0,120", kind='status', payload='record')
+    reply = future.result(1)
+    assert reply.payload == 'record'
+    assert channel.stats()['unmatched'] == 1
+
+def test_timeout_after_retries():
+    engine = FakeEngine()
+    channel = CommandChannel(engine, timeout=0.05, retries=2)
+    began = time.monotonic()
+    with pytest.raises(CommandTimeout):
+        channel.ping().result(2)
+    assert time.monotonic() - began >= 0.15
+    assert engine.sent == ["PING"] * 3
+    stats = channel.stats()
+    assert (stats['retransmits'], stats['timeouts'], stats['in_flight']) == (2, 1, 0)
+
+def test_retransmitted_request_is_answered():
+    # The first write is lost; the retry is answered and its RTT not sampled
+    engine = FakeEngine(lambda command: ["PONG"] if len(engine.sent) > 1 else None)
+    channel = CommandChannel(engine, timeout=0.05, retries=2)
+    reply = channel.ping().result(2)
+    assert reply.attempts == 2
+    assert channel.stats()['last_rtt_ms'] is None
+
+def test_send_failure():
+    def unplugged(command):
+        raise OSError("port closed")
+    channel = CommandChannel(FakeEngine(unplugged), timeout=1.0)
+    with pytest.raises(CommandError, match="port closed"):
+        channel.ping().result(2)
+
+def test_disconnect_fails_pending_requests():
+    engine = FakeEngine()
+    channel = CommandChannel(engine, timeout=10.0)
+    future = channel.ping()
+    while not engine.sent:
+        time.sleep(0.001)
+    engine.feed("disconnected", kind='state')
+    with pytest.raises(CommandError, match="connection disconnected"):
+        future.result(1)
\ No newline at end of file
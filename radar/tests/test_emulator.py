@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('serial')
+if not hasattr(os, 'openpty'):
+    pytest.skip("radar_emulator needs a pseudo-terminal", allow_module_level=True)
+
+from radar_commands import CommandError
+from radar_emulator import VirtualESP32
+from radar_engine import RadarEngine
+
+# End-to-end through a pty: VirtualESP32 runs the firmware's protocol, the
+# engine connects to it as it would to the ESP32
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+@pytest.fixture
+def emulator():
+    esp32 = VirtualESP32(rate=100, calibration_time=0.2, seed=1,
+                         boot_delay=0.2, settle_delay=0.2).start()
+    yield esp32
+    esp32.stop()
+
+@pytest.fixture
+def engine():
+    engine = RadarEngine()
+    yield engine
+    engine.disconnect(notify=False)
+
+def test_connect_and_stream(emulator, engine):
+    statuses = []
+    engine.subscribe(lambda kind, line, payload, received_at:
+                     statuses.append(payload) if kind == 'status' else None)
+    engine.connect(emulator.port_name, timeout=5.0)
+    assert wait_for(lambda: len(statuses) >= 20, 5.0)
+    assert all(record is not None for record in statuses)
+    assert engine.stats()['malformed'] == 0
+
+def test_commands(emulator, engine):
+    engine.connect(emulator.port_name, timeout=5.0)
+    assert wait_for(lambda: engine.listening, 5.0)
+    assert engine.commands.ping().result(2).line == "PONG"
+    assert engine.commands.set_threshold(80).result(2).line == "THRESHOLD_SET:80"
+    with pytest.raises(CommandError, match="INVALID_THRESHOLD"):
+        engine.commands.set_threshold(5).result(2)
+
+def test_binary_telemetry(emulator, engine):
+    statuses = []
+    engine.subscribe(lambda kind, line, payload, received_at:
+                     statuses.append(payload) if kind == 'status' else None)
+    engine.request_telemetry(True, 20)
+    engine.connect(emulator.port_name, timeout=5.0)
+    assert wait_for(lambda: engine.binary, 5.0)
+    count = len(statuses)
+    assert wait_for(lambda: len(statuses) >= count + 20, 5.0)
+    assert engine.command_channel.stats()['retransmits'] == 0
+
+def test_firmware_boot_timing(engine):
+    # The real boot: SYSTEM_READY about 5 s after the port opens, the first
+    # STATUS after calibration and the settle delay
+    esp32 = VirtualESP32(seed=1).start()
+    try:
+        engine.request_telemetry(False, 50)
+        began = time.monotonic()
+        engine.connect(esp32.port_name)
+        assert wait_for(lambda: engine.listening, 15.0)
+        assert time.monotonic() - began >= 5.0
+        assert engine.commands.ping().result(2).line == "PONG"
+        assert engine.stats()['reconnects'] == 0
+    finally:
+        esp32.stop()
\ No newline at end of file
@@ -0,0 +1,48 @@
+import pytest
+
+from radar_episodes import MAX_DISTANCE, Episode, EpisodeDetector, EpisodeStore
+from radar_protocol import StatusRecord
+
+def detect(samples, step=0.1):
+    # samples of (pir, ultrasonic, distance), step seconds apart
+    episodes = []
+    detector = EpisodeDetector(episodes.append, open_after=0.5, close_after=1.0)
+    timestamp = 1000.0
+    for pir, ultrasonic, distance in samples:
+        detector.feed(StatusRecord(pir, ultrasonic, distance, 0, confidence=50), timestamp)
+        timestamp += step
+    detector.flush()
+    return episodes
+
+def test_short_detections_are_not_episodes():
+    assert detect([(1, 0, 0)] * 3 + [(0, 0, 200)] * 30) == []
+
+def test_episode_opens_and_closes():
+    episodes = detect([(1, 1, 80)] * 10 + [(0, 0, 200)] * 5 + [(1, 1, 60)] * 3
+                      + [(0, 0, 200)] * 20 + [(0, 1, 90)] * 10)
+    assert len(episodes) == 2
+    assert episodes[0].start == pytest.approx(1000.0)
+    assert episodes[0].samples == 13
+    assert episodes[0].min_distance == 60
+
+def test_min_distance_ignores_no_echo():
+    # PIR alone reports 0 or the 200 cm no-echo distance
+    episodes = detect([(1, 0, 0)] * 5 + [(1, 0, 200)] * 5 + [(1, 1, 150)] * 2)
+    assert episodes[0].min_distance == 150
+    episodes = detect([(1, 0, 0)] * 5 + [(1, 0, 200)] * 5)
+    assert episodes[0].min_distance == MAX_DISTANCE
+
+def test_store_queries(tmp_path):
+    path = str(tmp_path / "episodes.repi")
+    store = EpisodeStore(path)
+    for start in range(0, 1000, 100):
+        store.append(Episode(float(start), start + 10.0, 5, 100, 50, pir=True))
+    store.close()
+    store = EpisodeStore(path)
+    try:
+        assert len(store) == 10
+        assert store.count(150, 450) == 3
+        assert store.total_duration(0, 1000) == pytest.approx(100.0)
+        assert [episode.start for episode in store.query(150, 450)] == [200.0, 300.0, 400.0]
+    finally:
+        store.close()
\ No newline at end of file
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from radar_filters import MAX_DISTANCE, FilterChain, parse_filters
+
+SPECS = ["gate", "median", "median:4", "ewma:0.3", "kalman:4:25", "gate,median:5,kalman:4:25",
+         "gate,ewma:0.5", "none"]
+
+def readings(count=3000, seed=1):
+    # A target walking in and out, with no-echo readings and the odd stray echo
+    rng = np.random.default_rng(seed)
+    distance = 100 + 60 * np.sin(np.arange(count) / 50.0) + rng.normal(0, 3, count)
+    distance = np.round(distance)
+    distance[rng.random(count) < 0.05] = 0
+    distance[rng.random(count) < 0.03] = MAX_DISTANCE
+    distance[rng.random(count) < 0.02] = 190
+    # A long dropout that outlasts the hold
+    distance[1000:1040] = 0
+    return distance, np.full(count, 150.0)
+
+def run_in_batches(spec, distance, baseline, size):
+    chain = FilterChain(spec)
+    out = [chain.process(distance[begin:begin + size], baseline[begin:begin + size])
+           for begin in range(0, len(distance), size)]
+    return np.concatenate(out), chain
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_same_output_for_any_batch_size(spec):
+    distance, baseline = readings()
+    whole, _ = run_in_batches(spec, distance, baseline, len(distance))
+    for size in (1, 7, 50, 333):
+        batched, chain = run_in_batches(spec, distance, baseline, size)
+        np.testing.assert_allclose(batched, whole, rtol=1e-9, atol=1e-9, equal_nan=True)
+        assert chain.records == len(distance)
+
+def test_gate_rejects_no_echo_and_beyond_baseline():
+    chain = FilterChain("gate", hold=0)
+    out = chain.process([0, 50, MAX_DISTANCE, 130, 171, 169], [150] * 6)
+    assert np.isnan(out[[0, 2, 4]]).all()
+    assert list(out[[1, 3, 5]]) == [50, 130, 169]
+    assert chain.stats()['filters'][0]['rejected'] == 3
+
+def test_hold_bridges_short_gaps_only():
+    chain = FilterChain("gate", hold=2)
+    out = chain.process([80, 0, 0, 0, 90], [0] * 5)
+    assert list(out[:3]) == [80, 80, 80]
+    assert np.isnan(out[3])
+    assert out[4] == 90
+
+def test_median_removes_a_single_spike():
+    out = FilterChain("median:3").process([50, 50, 150, 50, 50], [0] * 5)
+    assert list(out) == [50, 50, 50, 50, 50]
+
+def test_parse_filters():
+    assert [stage.name for stage in parse_filters("gate, median:5 ,kalman")] == ['gate', 'median', 'kalman']
+    assert parse_filters("") == [] and parse_filters("none") == []
+    with pytest.raises(ValueError):
+        parse_filters("bogus")
+    with pytest.raises(ValueError):
+        parse_filters("ewma:2")
+    with pytest.raises(ValueError):
+        parse_filters("gate:1:2:3")
\ No newline at end of file
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from radar_bench import status_corpus
+from radar_protocol import (FRAME_DELIMITER, StatusDecoder, StatusRecord, cobs_decode,
+                            cobs_encode, crc16_ccitt, encode_status_frame)
+
+MALFORMED = [
+    "STATUS:1,0,x,4,5,6,7", "STATUS:1,0,1.5,4,5,6,7", "STATUS:,0,1,4,5,6,7",
+    "STATUS:1,0,1,4,5,6,", "STATUS:1,0,1", "STATUS:1,0,1,4,5,6,7,8", "STATUS:1,,0,1,4,5,6",
+    "STATUS:1,0,1e3,4,5,6,7", "STATUS:1,0,0x10,4,5,6,7", "STATUS:1,0,1,4,5,6,nan",
+    "PONG", "", "garbage",
+]
+
+EDGES = [
+    "STATUS:1,0,1,4", "STATUS:1,0,1,4,5", "STATUS:1,0, 7,4,5,6,7", "STATUS:+1,0,1,4,5,6,7",
+    "STATUS:-1,0,1,4,5,6,7", "STATUS:1,0,2147483647,4294967295,5,6,7",
+    "STATUS:1,0,2147483648,4,5,6,7", "STATUS:1,0,5,4294967296,5,6,7",
+    "STATUS:1,0,5,-1,5,6,7", "STATUS:-2147483649,0,5,4,5,6,7",
+    "STATUS:1,0,99999999999999999999,4,5,6,7", "STATUS:1,0,5,4,5,6,-99999999999999999999",
+]
+
+def decode_lines(lines):
+    decoder = StatusDecoder()
+    records = [record for record in map(decoder.decode, lines) if record is not None]
+    return [record.as_tuple() for record in records], decoder.stats()
+
+def batch_lines(lines):
+    decoder = StatusDecoder()
+    batch = decoder.decode_batch(lines)
+    return [batch.record(index).as_tuple() for index in range(len(batch))], decoder.stats()
+
+def test_decode_full_and_short_lines():
+    decoder = StatusDecoder()
+    assert decoder.decode("STATUS:1,0,42,1000,3,5,120") == StatusRecord(True, False, 42, 1000, 3, 5, 120)
+    # Older firmware sends only the first four fields
+    assert decoder.decode("STATUS:0,1,42,1000") == StatusRecord(False, True, 42, 1000, 0, 0, 0)
+    assert decoder.stats()['decoded'] == 2
+
+@pytest.mark.parametrize('line', MALFORMED)
+def test_malformed_lines_are_counted(line):
+    decoder = StatusDecoder()
+    assert decoder.decode(line) is None
+    assert decoder.stats()['malformed'] == 1
+
+def test_out_of_range_fields_are_malformed():
+    decoder = StatusDecoder()
+    assert decoder.decode("STATUS:1,0,5,4294967295,5,6,7").device_millis == 4294967295
+    assert decoder.decode("STATUS:1,0,2147483648,4,5,6,7") is None
+    assert decoder.decode("STATUS:1,0,5,-1,5,6,7") is None
+
+def test_batch_matches_per_line_decode():
+    rng = random.Random(3)
+    corpus = status_corpus(2000, garbage=0.02)
+    for _ in range(200):
+        lines = [rng.choice(corpus) if rng.random() < 0.8 else rng.choice(MALFORMED + EDGES)
+                 for _ in range(rng.randint(0, 60))]
+        assert batch_lines(lines) == decode_lines(lines)
+
+def test_batch_of_good_lines():
+    lines = status_corpus(5000)
+    records, stats = batch_lines(lines)
+    assert (records, stats) == decode_lines(lines)
+    assert stats['decoded'] == 5000 and stats['malformed'] == 0
+
+def test_empty_batch():
+    decoder = StatusDecoder()
+    assert len(decoder.decode_batch([])) == 0
+    assert decoder.stats()['decoded'] == 0
+
+def test_crc16_ccitt_check_value():
+    assert crc16_ccitt(b"123456789") == 0x29B1
+
+@pytest.mark.parametrize('data', [b"", b"\0", b"\0\0", b"abc", b"a\0b\0", bytes(range(256)),
+                                  b"\xff" * 254, b"\xff" * 255, b"\x01" * 600])
+def test_cobs_round_trip(data):
+    encoded = cobs_encode(data)
+    assert b"\0" not in encoded
+    assert cobs_decode(encoded) == data
+
+def test_cobs_rejects_bad_input():
+    assert cobs_decode(b"\x05ab") is None
+    assert cobs_decode(b"\x02a\x00") is None
+
+def test_frame_round_trip_and_sequence_gaps():
+    decoder = StatusDecoder()
+    record = StatusRecord(True, True, 150, 123456789, 7, 8, 119)
+    for seq in (0, 1, 4, 255, 0):
+        frame = encode_status_frame(record, seq)
+        assert frame.startswith(FRAME_DELIMITER) and frame.endswith(FRAME_DELIMITER)
+        assert decoder.decode_frame(frame[1:-1]) == record
+    stats = decoder.stats()
+    assert stats['frames'] == 5
+    # 2 and 3 were missed; 255 -> 0 wraps around without a gap
+    assert stats['frames_lost'] == 2 + 250
+
+def test_corrupted_frames():
+    decoder = StatusDecoder()
+    frame = encode_status_frame(StatusRecord(False, True, 80, 5000, 1, 2, 120), 9)[1:-1]
+    # One bit of the distance flipped in transit, valid COBS around it
+    payload = bytearray(cobs_decode(frame))
+    payload[2] ^= 0x04
+    assert decoder.decode_frame(cobs_encode(bytes(payload))) is None
+    assert decoder.decode_frame(b"\x03ab") is None
+    assert decoder.decode_frame(b"\x01" * 100) is None
+    stats = decoder.stats()
+    assert stats['crc_errors'] == 1
+    assert stats['malformed'] == 3
+    assert stats['frames'] == 0
\ No newline at end of file
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from radar_protocol import StatusDecoder
+from radar_recorder import (KIND_MESSAGE, KIND_STATUS, RecorderError, SessionRecorder,
+                            SessionReplay)
+
+def record_session(path, count=1000, step=0.01, index_interval=16):
+    # count events, step seconds apart; returns the (kind, line) pairs and host times
+    recorder = SessionRecorder(path, index_interval=index_interval)
+    decoder = StatusDecoder()
+    events = []
+    start = time.monotonic()
+    for i in range(count):
+        if i % 100 == 0:
+            kind, line = 'message', "PONG"
+        else:
+            kind, line = 'status', f"STATUS:{i % 2},{i % 3 == 0:d},{i % 200},{i * 100},{i},{i % 9},120"
+        recorder.on_event(kind, line, decoder.decode(line) if kind == 'status' else None,
+                          start + i * step)
+        events.append((kind, line))
+    # Events the recorder does not keep
+    recorder.on_event('log', "not recorded", None, start)
+    recorder.on_event('state', "connected", None, start)
+    recorder.close()
+    return events, [start + recorder.wall_offset + i * step for i in range(count)]
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.rrec"
+    events, times = record_session(path)
+    replay = SessionReplay(str(path))
+    try:
+        played = list(replay)
+        assert [line for _, _, line, _ in played] == [line for _, line in events]
+        for (kind, host_time, line, record), (event_kind, _), expected in zip(played, events, times):
+            assert kind == (KIND_STATUS if event_kind == 'status' else KIND_MESSAGE)
+            assert host_time == pytest.approx(expected, abs=1e-6)
+            if kind == KIND_STATUS:
+                assert record == StatusDecoder().decode(line)
+        assert replay.start_time() == pytest.approx(times[0], abs=1e-6)
+        assert replay.end_time() == pytest.approx(times[-1], abs=1e-6)
+    finally:
+        replay.close()
+
+def test_long_lines_are_truncated(tmp_path):
+    path = tmp_path / "long.rrec"
+    recorder = SessionRecorder(str(path))
+    recorder.on_event('message', "X" * 100, None, time.monotonic())
+    recorder.close()
+    replay = SessionReplay(str(path))
+    assert [line for _, _, line, _ in replay] == ["X" * 48]
+    replay.close()
+
+def test_seek(tmp_path):
+    path = tmp_path / "session.rrec"
+    events, times = record_session(path, count=500, index_interval=16)
+    replay = SessionReplay(str(path))
+    try:
+        for target in (0, 1, 15, 16, 17, 250, 499):
+            index = replay.seek(times[target] - 1e-4)
+            lines = []
+            replay.play(lambda line, received_at: lines.append(line), 0, index)
+            assert lines == [line for _, line in events[target:]]
+        assert replay.seek(times[0] - 10) <= 1
+        assert replay.seek(times[-1] + 10) == replay.slots
+    finally:
+        replay.close()
+
+def test_play_is_paced_and_tracks_the_recording_time(tmp_path):
+    path = tmp_path / "session.rrec"
+    _, times = record_session(path, count=21, step=0.01)
+    replay = SessionReplay(str(path))
+    seen = []
+    began = time.monotonic()
+    replay.play(lambda line, received_at: seen.append(replay.current_time), 2.0)
+    elapsed = time.monotonic() - began
+    replay.close()
+    assert elapsed == pytest.approx(0.1, abs=0.05)
+    assert seen == pytest.approx(times, abs=1e-6)
+
+def test_stop_during_a_long_gap(tmp_path):
+    path = tmp_path / "gap.rrec"
+    recorder = SessionRecorder(str(path))
+    start = time.monotonic()
+    for offset in (0.0, 60.0):
+        recorder.on_event('message', "PONG", None, start + offset)
+    recorder.close()
+    replay = SessionReplay(str(path))
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    began = time.monotonic()
+    replay.play(lambda line, received_at: None, 1.0, 0, stop.is_set)
+    replay.close()
+    assert time.monotonic() - began < 1.0
+    assert replay.played == 1
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "bogus.rrec"
+    path.write_bytes(b"not a recording at all, just some bytes")
+    with pytest.raises(RecorderError):
+        SessionReplay(str(path))
\ No newline at end of file